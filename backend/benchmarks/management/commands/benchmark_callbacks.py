@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks.stress import benchmark_callbacks
+
+
+class Command(BaseCommand):
+    help = "Measure STK callbacks applied per second for one large landlord, with the single LandlordBalance row and with sharded, micro-batched rent credits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--callbacks", type=int, default=2000)
+        parser.add_argument("--units", type=int, default=500, help="Units (and leases) in the landlord's property.")
+        parser.add_argument("--threads", type=int, default=8, help="Worker threads per process.")
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=50, help="Callbacks per process_stk_callbacks batch.")
+        parser.add_argument("--shards", type=int, default=settings.LANDLORD_BALANCE_SHARDS or 8)
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ("single row, inline", 0, "inline"),
+            (f"{options['shards']} shards, inline", options["shards"], "inline"),
+            (f"{options['shards']} shards, batched", options["shards"], "batched"),
+        ]
+        baseline = None
+        for label, shards, mode in scenarios:
+            with override_settings(LANDLORD_BALANCE_SHARDS=shards):
+                result = benchmark_callbacks(
+                    callbacks=options["callbacks"],
+                    units=options["units"],
+                    threads=options["threads"],
+                    processes=options["processes"],
+                    mode=mode,
+                    batch_size=options["batch_size"],
+                )
+            if not result["consistent"]:
+                raise CommandError(f"{label}: landlord balance does not match the applied payments.")
+            baseline = baseline or result["per_second"]
+            speedup = result["per_second"] / baseline if baseline else 0
+            self.stdout.write(f"{label:<24} {result['callbacks']:>7} callbacks in {result['seconds']:>6.2f}s  {result['per_second']:>8.1f}/s  x{speedup:.2f}  ({result['retries']} lock retries)")
+        self.stdout.write(self.style.SUCCESS("Benchmark complete."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.stress import check_balance_invariants, create_balance_fixture, run_balance_stress
+
+
+class Command(BaseCommand):
+    help = "Hammer wallet withdrawals, payout requests, wallet rent debits and STK callbacks for one tenant and landlord from many threads and processes, then check balances against the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Worker threads per process.")
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--operations", type=int, default=50, help="Operations per thread.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="stress", help="Username prefix for the generated tenant and landlord.")
+
+    def handle(self, *args, **options):
+        lease = create_balance_fixture(prefix=options["prefix"])
+        totals = run_balance_stress(
+            lease,
+            threads=options["threads"],
+            processes=options["processes"],
+            operations=options["operations"],
+            seed=options["seed"],
+        )
+        self.stdout.write(", ".join(f"{name}={value}" for name, value in totals.items()))
+        problems = check_balance_invariants(lease)
+        if problems:
+            raise CommandError("Balance invariants violated: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS(f"Balances match the ledger for lease {lease.id}."))
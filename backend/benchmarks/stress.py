@@ -0,0 +1,296 @@
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import (
+    LandlordBalance,
+    LandlordPayout,
+    Lease,
+    LedgerTransaction,
+    PaymentTransaction,
+    Profile,
+    Property,
+    StkCallbackInbox,
+    Unit,
+    landlord_balance_totals,
+    period_range,
+)
+from core.payments import apply_stk_callback, apply_wallet_to_current_rent, process_stk_callbacks
+from core.views import LandlordPayoutRequestView, WalletWithdrawView
+
+OPERATIONS = ["withdraw", "payout", "wallet_rent", "callback"]
+OPENING_REFERENCE = "stress:opening"
+
+
+def create_balance_fixture(prefix="stress", wallet=Decimal("50000.00"), landlord_balance=Decimal("50000.00"), rent=Decimal("20000.00")):
+    suffix = uuid.uuid4().hex[:8]
+    landlord = User.objects.create_user(username=f"{prefix}_landlord_{suffix}")
+    tenant = User.objects.create_user(username=f"{prefix}_tenant_{suffix}")
+    Profile.objects.filter(user=landlord).update(role=Profile.ROLE_LANDLORD)
+    Profile.objects.filter(user=tenant).update(role=Profile.ROLE_TENANT, wallet_available=wallet)
+    LandlordBalance.objects.update_or_create(landlord=landlord, defaults={"available_balance": landlord_balance})
+    LedgerTransaction.objects.bulk_create(
+        [
+            LedgerTransaction(user=tenant, kind=LedgerTransaction.KIND_WALLET_CREDIT, amount=wallet, status=LedgerTransaction.STATUS_AVAILABLE, reference_text=OPENING_REFERENCE),
+            LedgerTransaction(user=landlord, kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT, amount=landlord_balance, status=LedgerTransaction.STATUS_AVAILABLE, reference_text=OPENING_REFERENCE),
+        ]
+    )
+    prop = Property.objects.create(landlord=landlord, name=f"{prefix.title()} Court {suffix}", location="Nairobi")
+    unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=rent)
+    return Lease.objects.create(unit=unit, tenant=tenant, rent_amount=rent, start_date=date(2024, 1, 1))
+
+
+def _post(view, user, payload):
+    request = APIRequestFactory().post("/", payload, format="json")
+    force_authenticate(request, user=user)
+    return view(request).status_code == 201
+
+
+def _callback(lease, amount):
+    checkout_request_id = f"stress-{uuid.uuid4().hex}"
+    PaymentTransaction.objects.create(
+        lease=lease,
+        tenant=lease.tenant,
+        period=timezone.localdate().strftime("%Y-%m"),
+        phone_number="254700000000",
+        amount=amount,
+        checkout_request_id=checkout_request_id,
+    )
+    payload = {"Body": {"stkCallback": {"CheckoutRequestID": checkout_request_id, "ResultCode": 0, "ResultDesc": "OK"}}}
+    # Every callback is delivered twice, like a Daraja retry.
+    apply_stk_callback(payload)
+    apply_stk_callback(payload)
+    return True
+
+
+def _worker(lease_id, operations, seed):
+    rng = random.Random(seed)
+    counts = {name: 0 for name in OPERATIONS}
+    counts["rejected"] = counts["errors"] = 0
+    withdraw = WalletWithdrawView.as_view()
+    payout = LandlordPayoutRequestView.as_view()
+    lease = Lease.objects.select_related("unit__property__landlord", "tenant").get(pk=lease_id)
+    landlord = lease.unit.property.landlord
+    for _ in range(operations):
+        operation = rng.choice(OPERATIONS)
+        amount = Decimal(rng.randint(1, 30) * 100)
+        try:
+            if operation == "withdraw":
+                done = _post(withdraw, lease.tenant, {"amount": str(amount)})
+            elif operation == "payout":
+                done = _post(payout, landlord, {"amount": str(amount), "method": LandlordPayout.METHOD_MPESA, "destination": "254700000000"})
+            elif operation == "wallet_rent":
+                done = apply_wallet_to_current_rent(lease) > 0
+            else:
+                done = _callback(lease, amount)
+        except DatabaseError:
+            counts["errors"] += 1
+            continue
+        counts[operation if done else "rejected"] += 1
+    return counts
+
+
+def _merge(totals, partial):
+    for name, value in partial.items():
+        totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def _run_threads(work, threads, first_index):
+    results, lock = {}, threading.Lock()
+
+    def run(index):
+        try:
+            partial = work(index)
+        finally:
+            connection.close()
+        with lock:
+            _merge(results, partial)
+
+    workers = [threading.Thread(target=run, args=(first_index + index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def _process_main(work, threads, first_index, queue):
+    queue.put(_run_threads(work, threads, first_index))
+
+
+def _run_parallel(work, threads, processes):
+    # work(index) runs once per worker, index in range(threads * processes), and returns counts to sum.
+    started = time.monotonic()
+    if processes > 1:
+        # Forked children must open their own connections.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        children = [context.Process(target=_process_main, args=(work, threads, index * threads, queue)) for index in range(processes)]
+        for child in children:
+            child.start()
+        partials = [queue.get() for _ in children]
+        for child in children:
+            child.join()
+    else:
+        partials = [_run_threads(work, threads, 0)]
+
+    totals = {}
+    for partial in partials:
+        _merge(totals, partial)
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    return totals
+
+
+def run_balance_stress(lease, threads=8, processes=1, operations=50, seed=0):
+    return _run_parallel(lambda index: _worker(lease.id, operations, seed * 1000 + index), threads, processes)
+
+
+def check_balance_invariants(lease):
+    lease = Lease.objects.select_related("unit__property").get(pk=lease.pk)
+    tenant_id, landlord_id = lease.tenant_id, lease.unit.property.landlord_id
+    profile = Profile.objects.get(user_id=tenant_id)
+    balance = landlord_balance_totals(landlord_id)
+
+    def ledger(user_id, kind, **filters):
+        rows = LedgerTransaction.objects.filter(user_id=user_id, kind=kind, **filters)
+        return rows.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+
+    credit, rent_credit = LedgerTransaction.KIND_WALLET_CREDIT, LedgerTransaction.KIND_LANDLORD_CREDIT_RENT
+    available, locked = LedgerTransaction.STATUS_AVAILABLE, LedgerTransaction.STATUS_LOCKED
+    expected = {
+        "wallet_available": ledger(tenant_id, credit, status=available)
+        - ledger(tenant_id, LedgerTransaction.KIND_WALLET_WITHDRAW_REQUEST)
+        - ledger(tenant_id, LedgerTransaction.KIND_WALLET_DEBIT_RENT),
+        "wallet_locked": ledger(tenant_id, credit, status=locked),
+        "available_balance": ledger(landlord_id, rent_credit, status=available) - ledger(landlord_id, LedgerTransaction.KIND_LANDLORD_PAYOUT_REQUEST),
+        "locked_balance": ledger(landlord_id, rent_credit, status=locked),
+    }
+    actual = {
+        "wallet_available": profile.wallet_available,
+        "wallet_locked": profile.wallet_locked,
+        "available_balance": balance["available_balance"],
+        "locked_balance": balance["locked_balance"],
+    }
+    problems = [f"{name} is {actual[name]}, ledger says {value}" for name, value in expected.items() if actual[name] != value]
+    problems += [f"{name} went negative ({value})" for name, value in actual.items() if value < 0]
+
+    collected = PaymentTransaction.objects.filter(lease=lease, status=PaymentTransaction.STATUS_SUCCESS).aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    allocated = (
+        LedgerTransaction.objects.filter(kind__in=[credit, rent_credit], user_id__in=[tenant_id, landlord_id])
+        .exclude(reference_text=OPENING_REFERENCE)
+        .aggregate(total=Sum("amount"))["total"]
+        or Decimal("0.00")
+    )
+    if collected != allocated:
+        problems.append(f"payments collected {collected} but {allocated} was allocated")
+
+    # Overpayments go to the wallet, so the rent applied to any period must stay within the rent due.
+    overpaid = {
+        reference.split(";")[0]: amount
+        for reference, amount in LedgerTransaction.objects.filter(user_id=tenant_id, kind=credit, reference_text__startswith="payment:").values_list("reference_text", "amount")
+    }
+    applied = {}
+    for payment_id, period, amount in PaymentTransaction.objects.filter(lease=lease, status=PaymentTransaction.STATUS_SUCCESS).values_list("id", "period", "amount"):
+        applied[period] = applied.get(period, Decimal("0.00")) + amount - overpaid.get(f"payment:{payment_id}", Decimal("0.00"))
+    problems += [f"rent applied to {period} is {total}, more than the {lease.rent_amount} due" for period, total in sorted(applied.items()) if total > lease.rent_amount]
+    return problems
+
+
+def create_callback_fixture(callbacks, units, prefix="bench"):
+    suffix = uuid.uuid4().hex[:8]
+    landlord = User.objects.create_user(username=f"{prefix}_landlord_{suffix}")
+    tenant = User.objects.create_user(username=f"{prefix}_tenant_{suffix}")
+    Profile.objects.filter(user=landlord).update(role=Profile.ROLE_LANDLORD)
+    prop = Property.objects.create(landlord=landlord, name=f"{prefix.title()} Towers {suffix}", location="Nairobi")
+    rent = Decimal("10000.00")
+    Unit.objects.bulk_create([Unit(property=prop, unit_number=f"U{index}", rent_amount=rent, status=Unit.STATUS_OCCUPIED) for index in range(units)])
+    Lease.objects.bulk_create([Lease(unit=unit, tenant=tenant, rent_amount=rent, start_date=date(2000, 1, 1)) for unit in prop.units.order_by("id")])
+    leases = list(Lease.objects.filter(unit__property=prop).order_by("id"))
+    # One payment per lease and month, so every callback is plain rent with no wallet overpayment.
+    periods = period_range("2000-01", "2099-12")
+    payments = PaymentTransaction.objects.bulk_create(
+        [
+            PaymentTransaction(
+                lease=leases[index % units],
+                tenant=tenant,
+                period=periods[index // units],
+                phone_number="254700000000",
+                amount=rent,
+                checkout_request_id=f"{prefix}-{suffix}-{index}",
+            )
+            for index in range(callbacks)
+        ]
+    )
+    payloads = [
+        {"Body": {"stkCallback": {"CheckoutRequestID": payment.checkout_request_id, "ResultCode": 0, "ResultDesc": "OK"}}}
+        for payment in payments
+    ]
+    return landlord, payloads
+
+
+def _apply_inline(payloads):
+    retries = 0
+    for payload in payloads:
+        # Callbacks are idempotent, so one that lost a lock race is simply delivered again.
+        while True:
+            try:
+                apply_stk_callback(payload)
+                break
+            except DatabaseError:
+                retries += 1
+                connection.close()
+    return {"callbacks": len(payloads), "retries": retries}
+
+
+def _drain_inbox(batch_size):
+    applied = retries = 0
+    while True:
+        try:
+            claimed = process_stk_callbacks(batch_size)
+        except DatabaseError:
+            retries += 1
+            connection.close()
+            continue
+        if not claimed:
+            return {"callbacks": applied, "retries": retries}
+        applied += claimed
+
+
+def benchmark_callbacks(callbacks=2000, units=500, threads=8, processes=1, mode="inline", batch_size=50):
+    landlord, payloads = create_callback_fixture(callbacks, units)
+    workers = threads * processes
+    if mode == "batched":
+        rows = StkCallbackInbox.objects.bulk_create(
+            [StkCallbackInbox(checkout_request_id=payload["Body"]["stkCallback"]["CheckoutRequestID"], payload=payload) for payload in payloads]
+        )
+        totals = _run_parallel(lambda index: _drain_inbox(batch_size), threads, processes)
+        started = time.monotonic()
+        # A batch that lost a lock race leaves its rows claimed; requeue them as the claim timeout would.
+        inbox = StkCallbackInbox.objects.filter(checkout_request_id__in=[row.checkout_request_id for row in rows])
+        orphaned = inbox.filter(status=StkCallbackInbox.STATUS_PROCESSING).update(status=StkCallbackInbox.STATUS_PENDING)
+        _merge(totals, {**_drain_inbox(batch_size), "retries": orphaned})
+        totals["seconds"] = round(totals["seconds"] + time.monotonic() - started, 2)
+    else:
+        totals = _run_parallel(lambda index: _apply_inline(payloads[index::workers]), threads, processes)
+
+    collected = PaymentTransaction.objects.filter(lease__unit__property__landlord=landlord, status=PaymentTransaction.STATUS_SUCCESS)
+    expected = collected.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    return {
+        "callbacks": totals.get("callbacks", 0),
+        "seconds": totals["seconds"],
+        "per_second": round(totals.get("callbacks", 0) / totals["seconds"], 1) if totals["seconds"] else 0,
+        "retries": totals.get("retries", 0),
+        "consistent": landlord_balance_totals(landlord.id)["locked_balance"] == expected and collected.count() == callbacks,
+    }
@@ -7,6 +7,9 @@ from .models import (
     PaymentTransaction,
     Profile,
     Property,
+    PropertyAccess,
+    RentPeriodBalance,
+    RevenueRollup,
     Tenant,
     TenantInvite,
     Unit,
@@ -21,3 +24,6 @@ admin.site.register(TenantInvite)
 admin.site.register(PaymentTransaction)
 admin.site.register(MaintenanceRequest)
 admin.site.register(Notification)
+admin.site.register(RentPeriodBalance)
+admin.site.register(RevenueRollup)
+admin.site.register(PropertyAccess)
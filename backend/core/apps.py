@@ -1,6 +1,17 @@
 
 from django.apps import AppConfig
+from django.core.checks import register
+from django.db.backends.signals import connection_created
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .authentication import connect_auth_signals
+        from .checks import shared_cache_check
+        from .db import tune_sqlite_connection
+
+        connection_created.connect(tune_sqlite_connection, dispatch_uid='core.tune_sqlite_connection')
+        connect_auth_signals()
+        register(shared_cache_check, deploy=True)
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Profile
+
+CLAIM_USER_FIELDS = ["username", "is_staff", "is_superuser"]
+AUTH_CLAIM_USER_FIELDS = {"username", "is_active", "is_staff", "is_superuser", "password"}
+
+
+def auth_changed_key(user_id):
+    return f"krib:auth-changed:{user_id}"
+
+
+def mark_auth_changed(user_id):
+    timeout = int(settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds())
+    cache.set(auth_changed_key(user_id), int(time.time()), timeout=timeout)
+
+
+def mark_user_auth_changed(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or AUTH_CLAIM_USER_FIELDS.intersection(update_fields)):
+        mark_auth_changed(instance.pk)
+
+
+def mark_profile_role_changed(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or "role" in update_fields):
+        mark_auth_changed(instance.user_id)
+
+
+def mark_account_deleted(sender, instance, **kwargs):
+    mark_auth_changed(instance.pk if sender is User else instance.user_id)
+
+
+def connect_auth_signals():
+    post_save.connect(mark_user_auth_changed, sender=User, dispatch_uid="core.mark_user_auth_changed")
+    post_save.connect(mark_profile_role_changed, sender=Profile, dispatch_uid="core.mark_profile_role_changed")
+    post_delete.connect(mark_account_deleted, sender=User, dispatch_uid="core.mark_user_deleted")
+    post_delete.connect(mark_account_deleted, sender=Profile, dispatch_uid="core.mark_profile_deleted")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        role = validated_token.get("role")
+        # The revocation marker is only seen by every worker when the cache is shared.
+        if not settings.SHARED_CACHE or user_id is None or role is None or any(field not in validated_token for field in CLAIM_USER_FIELDS):
+            return super().get_user(validated_token)
+
+        user_id = User._meta.pk.to_python(user_id)
+        changed_at = cache.get(auth_changed_key(user_id))
+        if changed_at is not None and changed_at >= validated_token.get("iat", 0):
+            return super().get_user(validated_token)
+
+        user = User.from_db(
+            DEFAULT_DB_ALIAS,
+            ["id", "is_active", *CLAIM_USER_FIELDS],
+            [user_id, True, *[validated_token[field] for field in CLAIM_USER_FIELDS]],
+        )
+        user.krib_role = role
+        return user
@@ -0,0 +1,76 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from .perf import record_cache
+
+_MISSING = object()
+COMPUTE_LOCK_SECONDS = 30
+COMPUTE_WAIT_SECONDS = 5
+COMPUTE_WAIT_INTERVAL = 0.05
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            record_cache(misses=1)
+            return default
+        record_cache(hits=1)
+        return value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+
+def get_or_compute(key, compute, timeout):
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=COMPUTE_LOCK_SECONDS):
+        try:
+            value = compute()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + COMPUTE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COMPUTE_WAIT_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return compute()
+
+
+def _revenue_generation_key(landlord_id):
+    return f"krib:revenue-generation:{landlord_id}"
+
+
+def landlord_revenue_key(landlord_id, period=None):
+    generation_key = _revenue_generation_key(landlord_id)
+    generation = cache.get(generation_key)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(generation_key, generation, timeout=None):
+            generation = cache.get(generation_key, generation)
+    return f"krib:revenue:{landlord_id}:{generation}:{period or 'lifetime'}"
+
+
+def invalidate_landlord_revenue(landlord_id):
+    # Old generations simply age out; a recompute racing this write lands under the old key.
+    cache.set(_revenue_generation_key(landlord_id), time.time_ns(), timeout=None)
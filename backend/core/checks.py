@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Warning
+
+
+def shared_cache_check(app_configs, **kwargs):
+    if settings.SHARED_CACHE:
+        return []
+    return [
+        Warning(
+            "REDIS_URL is not set, so every worker process keeps its own cache.",
+            hint="Daraja token refresh, the revenue cache lock and token revocation only work across gunicorn workers with a shared Redis cache.",
+            id="core.W001",
+        )
+    ]
@@ -0,0 +1,248 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from decimal import Decimal
+from urllib import request as urllib_request
+from urllib.error import HTTPError
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import metrics
+from .perf import track_external
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REFRESH_MARGIN_SECONDS = 120
+TOKEN_LOCK_SECONDS = 30
+TOKEN_WAIT_SECONDS = 5
+TOKEN_WAIT_INTERVAL = 0.1
+DARAJA_REQUESTS = metrics.counter("krib_daraja_requests_total", "Daraja HTTP calls by endpoint and outcome.", ["endpoint", "outcome"])
+DARAJA_LATENCY = metrics.histogram("krib_daraja_request_seconds", "Daraja HTTP call latency.", ["endpoint"])
+METRIC_KEYS = ["hits", "stale_hits", "misses", "refreshes", "refresh_failures", "refresh_ms_total", "refresh_ms_max"]
+
+
+def _endpoint(override_var, path):
+    base_url = os.getenv("MPESA_BASE_URL", "https://sandbox.safaricom.co.ke").rstrip("/")
+    return os.getenv(override_var) or f"{base_url}{path}"
+
+
+def _credentials():
+    return os.getenv("MPESA_CONSUMER_KEY", ""), os.getenv("MPESA_CONSUMER_SECRET", "")
+
+
+def _token_key(consumer_key):
+    return f"krib:daraja:token:{hashlib.sha256(consumer_key.encode()).hexdigest()[:16]}"
+
+
+def _metric_key(name):
+    return f"krib:daraja:token-metrics:{name}"
+
+
+def _bump(name, delta=1):
+    key = _metric_key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+
+
+def _record_max(name, value):
+    key = _metric_key(name)
+    if value > (cache.get(key) or 0):
+        cache.set(key, value, timeout=None)
+
+
+def _open_json(req, timeout, endpoint):
+    outcome = "error"
+    try:
+        with track_external("daraja"), DARAJA_LATENCY.time(endpoint=endpoint), urllib_request.urlopen(req, timeout=timeout) as resp:
+            payload = json.loads(resp.read().decode())
+        outcome = "ok"
+        return payload
+    except HTTPError as exc:
+        outcome = str(exc.code)
+        raise
+    finally:
+        DARAJA_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+
+
+def _fetch_access_token(consumer_key, consumer_secret):
+    auth = base64.b64encode(f"{consumer_key}:{consumer_secret}".encode()).decode()
+    req = urllib_request.Request(
+        _endpoint("MPESA_OAUTH_URL", "/oauth/v1/generate?grant_type=client_credentials"),
+        headers={"Authorization": f"Basic {auth}"},
+    )
+    payload = _open_json(req, 15, "oauth")
+    return payload.get("access_token"), int(payload.get("expires_in") or 3599)
+
+
+def _refresh_access_token(consumer_key, consumer_secret):
+    started = time.monotonic()
+    try:
+        token, expires_in = _fetch_access_token(consumer_key, consumer_secret)
+    except Exception:
+        _bump("refresh_failures")
+        raise
+    elapsed_ms = int((time.monotonic() - started) * 1000)
+    _bump("refreshes")
+    _bump("refresh_ms_total", elapsed_ms)
+    _record_max("refresh_ms_max", elapsed_ms)
+    logger.info("Daraja access token refreshed", extra={"refresh_ms": elapsed_ms, "expires_in": expires_in})
+    if not token:
+        _bump("refresh_failures")
+        return None
+
+    now = time.time()
+    entry = {
+        "token": token,
+        "expires_at": now + expires_in,
+        "refresh_at": now + max(expires_in - TOKEN_REFRESH_MARGIN_SECONDS, expires_in // 2),
+    }
+    cache.set(_token_key(consumer_key), entry, timeout=expires_in)
+    return token
+
+
+def get_access_token():
+    consumer_key, consumer_secret = _credentials()
+    if not consumer_key or not consumer_secret:
+        return None
+
+    token_key = _token_key(consumer_key)
+    entry = cache.get(token_key)
+    if entry and time.time() < entry["refresh_at"]:
+        _bump("hits")
+        return entry["token"]
+
+    lock_key = f"{token_key}:lock"
+    if cache.add(lock_key, 1, timeout=TOKEN_LOCK_SECONDS):
+        _bump("misses")
+        try:
+            return _refresh_access_token(consumer_key, consumer_secret)
+        finally:
+            cache.delete(lock_key)
+
+    if entry and time.time() < entry["expires_at"]:
+        _bump("stale_hits")
+        return entry["token"]
+
+    deadline = time.monotonic() + TOKEN_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(TOKEN_WAIT_INTERVAL)
+        entry = cache.get(token_key)
+        if entry and time.time() < entry["expires_at"]:
+            _bump("hits")
+            return entry["token"]
+
+    _bump("misses")
+    return _refresh_access_token(consumer_key, consumer_secret)
+
+
+def invalidate_access_token():
+    consumer_key, _ = _credentials()
+    cache.delete(_token_key(consumer_key))
+
+
+def token_metrics():
+    values = {name: cache.get(_metric_key(name)) or 0 for name in METRIC_KEYS}
+    lookups = values["hits"] + values["stale_hits"] + values["misses"]
+    values["hit_rate"] = round((values["hits"] + values["stale_hits"]) / lookups, 4) if lookups else None
+    values["refresh_ms_avg"] = round(values["refresh_ms_total"] / values["refreshes"], 1) if values["refreshes"] else None
+    return values
+
+
+@metrics.collector
+def _token_cache_metrics():
+    values = token_metrics()
+    return [
+        (f"krib_daraja_token_{name}", "gauge", f"Daraja OAuth token cache {name.replace('_', ' ')} (shared through the Django cache).", [({}, values[name])])
+        for name in ["hits", "stale_hits", "misses", "refreshes", "refresh_failures"]
+    ]
+
+
+def reset_token_metrics():
+    cache.delete_many([_metric_key(name) for name in METRIC_KEYS])
+
+
+def missing_env_vars():
+    required_vars = [
+        "MPESA_CONSUMER_KEY",
+        "MPESA_CONSUMER_SECRET",
+        "MPESA_SHORTCODE",
+        "MPESA_PASSKEY",
+        "MPESA_CALLBACK_URL",
+    ]
+    return [name for name in required_vars if not os.getenv(name)]
+
+
+def _stk_password(shortcode, passkey):
+    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
+    return base64.b64encode(f"{shortcode}{passkey}{timestamp}".encode()).decode(), timestamp
+
+
+def _post_json(url, payload, timeout, endpoint):
+    token = get_access_token()
+    if not token:
+        return None
+
+    for attempt in range(2):
+        req = urllib_request.Request(
+            url,
+            data=json.dumps(payload).encode(),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            return _open_json(req, timeout, endpoint)
+        except HTTPError as exc:
+            if exc.code == 401 and attempt == 0:
+                invalidate_access_token()
+                token = get_access_token()
+                if token:
+                    continue
+            logger.warning("Daraja request to %s failed: %s", url, exc.read().decode())
+            return None
+
+
+def stk_push(phone_number, amount, reference):
+    shortcode = os.getenv("MPESA_SHORTCODE", "")
+    passkey = os.getenv("MPESA_PASSKEY", "")
+    callback_url = os.getenv("MPESA_CALLBACK_URL", "")
+    if not shortcode or not passkey or not callback_url:
+        return None
+
+    password, timestamp = _stk_password(shortcode, passkey)
+    payload = {
+        "BusinessShortCode": shortcode,
+        "Password": password,
+        "Timestamp": timestamp,
+        "TransactionType": "CustomerPayBillOnline",
+        "Amount": int(Decimal(amount)),
+        "PartyA": phone_number,
+        "PartyB": shortcode,
+        "PhoneNumber": phone_number,
+        "CallBackURL": callback_url,
+        "AccountReference": reference,
+        "TransactionDesc": "KRIB rent payment",
+    }
+    return _post_json(_endpoint("MPESA_STK_PUSH_URL", "/mpesa/stkpush/v1/processrequest"), payload, timeout=20, endpoint="stkpush")
+
+
+def stk_query(checkout_request_id):
+    shortcode = os.getenv("MPESA_SHORTCODE", "")
+    passkey = os.getenv("MPESA_PASSKEY", "")
+    if not shortcode or not passkey:
+        return None
+
+    password, timestamp = _stk_password(shortcode, passkey)
+    payload = {
+        "BusinessShortCode": shortcode,
+        "Password": password,
+        "Timestamp": timestamp,
+        "CheckoutRequestID": checkout_request_id,
+    }
+    return _post_json(_endpoint("MPESA_STK_QUERY_URL", "/mpesa/stkpushquery/v1/query"), payload, timeout=20, endpoint="stkquery")
@@ -0,0 +1,16 @@
+from django.conf import settings
+
+SQLITE_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("busy_timeout", 5000),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 256 * 1024 * 1024),
+]
+
+
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_TUNING", False):
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,67 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _StreamRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVStreamRenderer(_StreamRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONStreamRenderer(_StreamRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+EXPORT_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVStreamRenderer, NDJSONStreamRenderer]
+EXPORT_FORMATS = [CSVStreamRenderer.format, NDJSONStreamRenderer.format]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _csv_rows(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow([_csv_value(row[lookup]) for _, lookup in columns])
+
+
+def _ndjson_rows(rows, columns):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode({header: row[lookup] for header, lookup in columns}) + "\n"
+
+
+def stream_export(queryset, columns, export_format, filename):
+    rows = queryset.values(*[lookup for _, lookup in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if export_format == CSVStreamRenderer.format:
+        response = StreamingHttpResponse(_csv_rows(rows, columns), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    else:
+        response = StreamingHttpResponse(_ndjson_rows(rows, columns), content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="{filename}.ndjson"'
+    return response
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.payments import apply_wallets_to_current_rent
+
+
+class Command(BaseCommand):
+    help = "Apply each tenant's available wallet balance to unpaid rent for the current month."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only apply the wallets of the given tenant id(s).")
+
+    def handle(self, *args, **options):
+        applied = apply_wallets_to_current_rent(user_ids=options["user_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Applied wallet credit to {applied} lease(s)."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import diff_property_access, sync_property_access
+
+
+class Command(BaseCommand):
+    help = "Verify the property access table against properties and active leases, optionally repairing drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--property", type=int, action="append", dest="property_ids", help="Only check the given property id(s).")
+        parser.add_argument("--fix", action="store_true", help="Insert missing rows and delete stale ones.")
+
+    def handle(self, *args, **options):
+        property_ids = options["property_ids"] or None
+        if options["fix"]:
+            missing, stale = sync_property_access(property_ids)
+            self.stdout.write(self.style.SUCCESS(f"Property access repaired: {missing} added, {stale} removed."))
+            return
+
+        missing, stale = diff_property_access(property_ids)
+        if missing or stale:
+            raise CommandError(f"Property access drift: {len(missing)} missing, {len(stale)} stale. Re-run with --fix.")
+        self.stdout.write(self.style.SUCCESS("Property access is consistent."))
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.simulator import DarajaSimulator
+
+
+class Command(BaseCommand):
+    help = "Run a local Daraja stand-in (OAuth, STK push, STK query) that fires callbacks back to KRIB."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8099)
+        parser.add_argument("--callback-url", help="Send callbacks here instead of the CallBackURL in each push.")
+        parser.add_argument("--push-latency-ms", type=int, default=0, help="Delay before answering each STK push.")
+        parser.add_argument("--callback-latency-ms", type=int, default=500, help="Delay between a push and its callback.")
+        parser.add_argument("--jitter-ms", type=int, default=0, help="Random +/- spread applied to the callback latency.")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of pushes answered with a cancelled callback.")
+        parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Share of callbacks delivered twice.")
+        parser.add_argument("--burst-size", type=int, default=1, help="Hold ready callbacks and release them in groups of this size.")
+        parser.add_argument("--burst-wait-ms", type=int, default=1000, help="Release a partial burst after waiting this long.")
+        parser.add_argument("--callback-concurrency", type=int, default=8, help="Maximum callbacks in flight to KRIB.")
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        simulator = DarajaSimulator(
+            host=options["host"],
+            port=options["port"],
+            callback_url=options["callback_url"],
+            push_latency_ms=options["push_latency_ms"],
+            callback_latency_ms=options["callback_latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            failure_rate=options["failure_rate"],
+            duplicate_rate=options["duplicate_rate"],
+            burst_size=options["burst_size"],
+            burst_wait_ms=options["burst_wait_ms"],
+            callback_concurrency=options["callback_concurrency"],
+            seed=options["seed"],
+        )
+        self.stdout.write(f"Daraja simulator listening on {simulator.base_url}")
+        self.stdout.write(f"Point KRIB at it with MPESA_BASE_URL={simulator.base_url} (any consumer key/secret/shortcode/passkey).")
+        self.stdout.write(f"Live stats: {simulator.base_url}/simulator/stats. Press Ctrl-C to stop.")
+        try:
+            simulator.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.stop()
+        self.stdout.write(json.dumps(simulator.summary(), indent=2))
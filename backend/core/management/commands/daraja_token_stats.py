@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.daraja import reset_token_metrics, token_metrics
+
+
+class Command(BaseCommand):
+    help = "Print Daraja OAuth token cache hit rate and refresh latency counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Clear the counters after printing them.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(token_metrics(), indent=2))
+        if options["reset"]:
+            reset_token_metrics()
+            self.stdout.write(self.style.SUCCESS("Daraja token metrics reset."))
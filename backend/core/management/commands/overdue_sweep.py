@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.models import sweep_overdue_notices
+
+
+class Command(BaseCommand):
+    help = "Create overdue rent notices for every active lease with an unpaid balance past its due day."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, help="Evaluate as of this date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        candidates = sweep_overdue_notices(today=options["date"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Checked {candidates} overdue lease(s); existing notices were left untouched."))
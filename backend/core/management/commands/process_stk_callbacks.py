@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.payments import process_stk_callbacks
+
+
+class Command(BaseCommand):
+    help = "Apply stored Daraja STK callbacks in micro-batches. Several copies may run at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds to sleep when the inbox is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the inbox once and exit.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            count = process_stk_callbacks(batch_size=options["batch_size"])
+            processed += count
+            if count:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} STK callback(s)."))
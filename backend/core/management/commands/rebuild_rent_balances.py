@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Lease, rebuild_rent_period_balances
+
+
+class Command(BaseCommand):
+    help = "Regenerate per-lease, per-period rent balances from successful payment history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lease", type=int, action="append", dest="lease_ids", help="Only rebuild the given lease id(s).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        leases = Lease.objects.all()
+        if options["lease_ids"]:
+            leases = leases.filter(pk__in=options["lease_ids"])
+        created = rebuild_rent_period_balances(leases, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} rent period balance rows."))
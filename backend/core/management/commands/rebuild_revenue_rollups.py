@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.models import rebuild_revenue_rollups
+
+
+class Command(BaseCommand):
+    help = "Regenerate per-landlord, per-property monthly revenue rollups from leases and successful payment history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--landlord", type=int, action="append", dest="landlord_ids", help="Only rebuild the given landlord id(s).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_revenue_rollups(options["landlord_ids"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} revenue rollup rows."))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.payments import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = "Re-check stale pending STK payments with Daraja's STK Push Query and apply the result."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=5, help="Only check payments pending for at least this many minutes.")
+        parser.add_argument("--limit", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--rate", type=float, default=5, help="Maximum STK query requests per second.")
+
+    def handle(self, *args, **options):
+        summary = reconcile_pending_payments(
+            min_age=timedelta(minutes=options["older_than"]),
+            limit=options["limit"],
+            concurrency=options["concurrency"],
+            rate_per_second=options["rate"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Checked {checked} pending payment(s): {success} success, {failed} failed, {still_pending} still pending.".format(**summary)
+            )
+        )
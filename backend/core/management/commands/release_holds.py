@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.models import release_matured_holds
+
+
+class Command(BaseCommand):
+    help = "Release every matured LOCKED wallet and landlord credit into the available balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only release holds for the given user id(s).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        released = release_matured_holds(batch_size=options["batch_size"], user_ids=options["user_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Released {released} matured hold(s)."))
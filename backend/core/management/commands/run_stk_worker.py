@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.payments import dispatch_stk_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued STK push requests to Daraja from a bounded thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8, help="Maximum Daraja requests in flight.")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the outbox once and exit.")
+
+    def handle(self, *args, **options):
+        sent = 0
+        while True:
+            count = dispatch_stk_outbox(batch_size=options["batch_size"], concurrency=options["concurrency"])
+            sent += count
+            if count:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+        self.stdout.write(self.style.SUCCESS(f"Dispatched {sent} STK push request(s)."))
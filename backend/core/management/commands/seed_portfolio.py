@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import SEED_PASSWORD, seed_portfolio
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic portfolio (landlords, properties, units, leases and months of payment history) for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--landlords", type=int, default=10)
+        parser.add_argument("--properties-per-landlord", type=int, default=2)
+        parser.add_argument("--units-per-property", type=int, default=20)
+        parser.add_argument("--occupancy", type=float, default=0.9, help="Share of units that get an active lease.")
+        parser.add_argument("--months", type=int, default=12, help="Months of rent history per lease, ending this month.")
+        parser.add_argument("--success-rate", type=float, default=0.9, help="Share of monthly payments that succeed.")
+        parser.add_argument("--overpayment-rate", type=float, default=0.05, help="Share of successful payments above the rent.")
+        parser.add_argument("--no-notifications", action="store_true", help="Skip overdue notices for missed months.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="seed", help="Username prefix for generated users.")
+        parser.add_argument("--password", default=SEED_PASSWORD, help="Password for every generated user.")
+        parser.add_argument("--seed", type=int, help="Random seed for a reproducible dataset.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            counts = seed_portfolio(
+                landlords=options["landlords"],
+                properties_per_landlord=options["properties_per_landlord"],
+                units_per_property=options["units_per_property"],
+                occupancy=options["occupancy"],
+                months=options["months"],
+                success_rate=options["success_rate"],
+                overpayment_rate=options["overpayment_rate"],
+                notifications=not options["no_notifications"],
+                batch_size=options["batch_size"],
+                prefix=options["prefix"],
+                password=options["password"],
+                seed=options["seed"],
+                progress=lambda message: self.stdout.write(message) if options["verbosity"] > 1 else None,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        summary = ", ".join(f"{value} {name.replace('_', ' ')}" for name, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.models import seed_revenue_rollups
+
+
+class Command(BaseCommand):
+    help = "Create or refresh this month's revenue rollup rows with the expected rent of every leased property."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, help="Seed the month containing this date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        seeded = seed_revenue_rollups(today=options["date"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Seeded {seeded} revenue rollup row(s)."))
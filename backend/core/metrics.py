@@ -0,0 +1,198 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FLUSH_INTERVAL_SECONDS = 5
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, help_text, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, help_text, labels, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [bucket_count + (1 if value <= bound else 0) for bucket_count, bound in zip(counts, self.buckets)]
+            self.values[key] = (counts, total + value, count + 1)
+        self.registry.maybe_flush()
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+        self.last_flush = 0.0
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(self, name, help_text, labels, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def collector(self, func):
+        self.collectors.append(func)
+        return func
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                metric.name: {
+                    "type": metric.type,
+                    "help": metric.help,
+                    "labels": list(metric.labels),
+                    "buckets": list(getattr(metric, "buckets", [])),
+                    "values": [[list(key), value] for key, value in metric.values.items()],
+                }
+                for metric in self.metrics.values()
+            }
+
+    def _snapshot_path(self, directory, pid=None):
+        return os.path.join(directory, f"metrics-{pid or os.getpid()}.json")
+
+    def maybe_flush(self, force=False):
+        directory = getattr(settings, "METRICS_DIR", "")
+        if not directory or (not force and time.monotonic() - self.last_flush < FLUSH_INTERVAL_SECONDS):
+            return
+        self.last_flush = time.monotonic()
+        path = self._snapshot_path(directory)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(tmp_path, path)
+
+    def _merged_snapshot(self):
+        merged = self.snapshot()
+        directory = getattr(settings, "METRICS_DIR", "")
+        if not directory:
+            return merged
+        own_path = self._snapshot_path(directory)
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            if path == own_path:
+                continue
+            try:
+                with open(path) as handle:
+                    other = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, data in other.items():
+                target = merged.setdefault(name, {**data, "values": []})
+                values = {tuple(key): value for key, value in target["values"]}
+                for key, value in data["values"]:
+                    key = tuple(key)
+                    if key not in values:
+                        values[key] = value
+                    elif data["type"] == "histogram":
+                        counts, total, count = values[key]
+                        values[key] = ([a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2])
+                    else:
+                        values[key] += value
+                target["values"] = [[list(key), value] for key, value in values.items()]
+        return merged
+
+    def exposition(self):
+        lines = []
+        for name, data in sorted(self._merged_snapshot().items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            for key, value in sorted(data["values"], key=lambda item: item[0]):
+                labels = dict(zip(data["labels"], key))
+                if data["type"] == "histogram":
+                    counts, total, count = value
+                    for bound, bucket_count in zip(data["buckets"], counts):
+                        lines.append(_sample(f"{name}_bucket", {**labels, "le": _format_value(bound)}, bucket_count))
+                    lines.append(_sample(f"{name}_bucket", {**labels, "le": "+Inf"}, count))
+                    lines.append(_sample(f"{name}_sum", labels, total))
+                    lines.append(_sample(f"{name}_count", labels, count))
+                else:
+                    lines.append(_sample(name, labels, value))
+        for collect in self.collectors:
+            for name, metric_type, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.extend(_sample(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name, labels, value):
+    if not labels:
+        return f"{name} {_format_value(value)}"
+    rendered = ",".join(f'{label}="{_escape(label_value)}"' for label, label_value in labels.items())
+    return f"{name}{{{rendered}}} {_format_value(value)}"
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+collector = REGISTRY.collector
+atexit.register(lambda: REGISTRY.maybe_flush(force=True))
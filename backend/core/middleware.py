@@ -0,0 +1,96 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .perf import collect_stats
+
+logger = logging.getLogger("core.perf")
+
+HTTP_REQUESTS = metrics.counter("krib_http_requests_total", "HTTP requests by view, method and status.", ["view", "method", "status"])
+HTTP_LATENCY = metrics.histogram("krib_http_request_seconds", "HTTP request latency by view.", ["view"])
+HTTP_QUERIES = metrics.histogram("krib_http_request_queries", "SQL statements per HTTP request by view.", ["view"], buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+
+
+class RequestPerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with self._measure() as stats:
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            # Streamed exports run their queries while the body is sent, so measure until it is done.
+            response.streaming_content = self._measure_stream(request, response, stats, started, response.streaming_content)
+            return response
+        self._report(request, response, stats, started)
+        return response
+
+    @contextmanager
+    def _measure(self, stats=None):
+        with collect_stats(stats) as stats, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats.sql_wrapper))
+            yield stats
+
+    def _measure_stream(self, request, response, stats, started, content):
+        try:
+            with self._measure(stats):
+                yield from content
+        finally:
+            self._report(request, response, stats, started)
+
+    def _report(self, request, response, stats, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        daraja_ms = stats.external_ms["daraja"]
+        view = request.resolver_match.view_name if request.resolver_match else "unmatched"
+        HTTP_REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        HTTP_LATENCY.observe(total_ms / 1000, view=view)
+        HTTP_QUERIES.observe(stats.sql_count, view=view)
+
+        if getattr(settings, "PERF_SERVER_TIMING", settings.DEBUG) and not response.streaming:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f"total;dur={total_ms:.1f}",
+                    f'db;dur={stats.sql_ms:.1f};desc="{stats.sql_count} queries"',
+                    f'cache;desc="{stats.cache_hits} hits {stats.cache_misses} misses"',
+                    f"daraja;dur={daraja_ms:.1f}",
+                ]
+            )
+
+        logger.info(
+            "%s %s %s %.1fms %s queries",
+            request.method,
+            request.path,
+            response.status_code,
+            total_ms,
+            stats.sql_count,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(total_ms, 1),
+                "sql_count": stats.sql_count,
+                "sql_ms": round(stats.sql_ms, 1),
+                "cache_hits": stats.cache_hits,
+                "cache_misses": stats.cache_misses,
+                "daraja_calls": stats.external_calls["daraja"],
+                "daraja_ms": round(daraja_ms, 1),
+            },
+        )
+
+        threshold = getattr(settings, "PERF_DUPLICATE_SQL_THRESHOLD", 5)
+        duplicated = stats.duplicated_sql(threshold) if threshold else []
+        if duplicated:
+            logger.warning(
+                "%s %s ran the same SQL up to %s times: %s",
+                request.method,
+                request.path,
+                duplicated[0][1],
+                " | ".join(f"{count}x {sql[:300]}" for sql, count in duplicated),
+                extra={"path": request.path, "duplicated_sql": [{"sql": sql, "count": count} for sql, count in duplicated]},
+            )
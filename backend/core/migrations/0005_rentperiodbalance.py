@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_rent_period_balances(apps, schema_editor):
+    PaymentTransaction = apps.get_model("core", "PaymentTransaction")
+    RentPeriodBalance = apps.get_model("core", "RentPeriodBalance")
+    totals = (
+        PaymentTransaction.objects.filter(status="success")
+        .order_by()
+        .values("lease_id", "lease__rent_amount", "period")
+        .annotate(total=Sum("amount"))
+    )
+    rows = []
+    for total in totals.iterator():
+        rent_due = total["lease__rent_amount"]
+        paid_sum = total["total"]
+        if rent_due - paid_sum <= 0:
+            status = "PAID"
+        elif paid_sum > 0:
+            status = "PARTIAL"
+        else:
+            status = "UNPAID"
+        rows.append(
+            RentPeriodBalance(
+                lease_id=total["lease_id"],
+                period=total["period"],
+                rent_due=rent_due,
+                paid_sum=paid_sum,
+                status=status,
+            )
+        )
+    RentPeriodBalance.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_landlordsettings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentPeriodBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period", models.CharField(max_length=7)),
+                ("rent_due", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "paid_sum",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=12
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PAID", "Paid"),
+                            ("PARTIAL", "Partial"),
+                            ("UNPAID", "Unpaid"),
+                        ],
+                        default="UNPAID",
+                        max_length=20,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "lease",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="period_balances",
+                        to="core.lease",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("lease", "period"),
+                        name="uniq_rent_balance_per_lease_period",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rent_period_balances, migrations.RunPython.noop),
+    ]
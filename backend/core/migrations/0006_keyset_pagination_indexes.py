@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_rentperiodbalance"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="landlordpayout",
+            index=models.Index(
+                fields=["landlord", "created_at", "id"],
+                name="payout_landlord_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ledgertransaction",
+            index=models.Index(
+                fields=["user", "kind", "status", "created_at", "id"],
+                name="ledger_user_kind_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["updated_at", "id"], name="maint_updated_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["tenant", "updated_at", "id"], name="maint_tenant_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="notif_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["created_at", "id"], name="payment_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["tenant", "created_at", "id"], name="payment_tenant_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_property_access(apps, schema_editor):
+    Property = apps.get_model("core", "Property")
+    Lease = apps.get_model("core", "Lease")
+    PropertyAccess = apps.get_model("core", "PropertyAccess")
+    rows = []
+    for property_id, landlord_id, manager_id in Property.objects.values_list(
+        "id", "landlord_id", "manager_id"
+    ):
+        rows.append(
+            PropertyAccess(
+                user_id=landlord_id, property_id=property_id, role="landlord"
+            )
+        )
+        if manager_id:
+            rows.append(
+                PropertyAccess(
+                    user_id=manager_id, property_id=property_id, role="manager"
+                )
+            )
+    tenants = (
+        Lease.objects.filter(status="active")
+        .values_list("tenant_id", "unit__property_id")
+        .distinct()
+    )
+    for tenant_id, property_id in tenants:
+        rows.append(
+            PropertyAccess(user_id=tenant_id, property_id=property_id, role="tenant")
+        )
+    PropertyAccess.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PropertyAccess",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("landlord", "Landlord"),
+                            ("manager", "Manager"),
+                            ("tenant", "Tenant"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="access",
+                        to="core.property",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="property_access",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "role", "property"),
+                        name="uniq_property_access_user_role",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_property_access, migrations.RunPython.noop),
+    ]
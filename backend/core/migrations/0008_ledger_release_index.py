@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_propertyaccess"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ledgertransaction",
+            index=models.Index(
+                fields=["kind", "status", "available_at", "id"],
+                name="ledger_release_idx",
+            ),
+        ),
+    ]
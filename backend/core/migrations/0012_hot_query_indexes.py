@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_payment_status_created_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="maintenancerequest",
+            name="lease",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="maintenance_requests",
+                to="core.lease",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="paymenttransaction",
+            name="lease",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payment_transactions",
+                to="core.lease",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ledgertransaction",
+            index=models.Index(
+                condition=models.Q(("status", "LOCKED")),
+                fields=["user", "kind", "available_at"],
+                name="ledger_user_locked_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["lease", "updated_at"], name="maint_lease_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["lease", "period", "status"], name="payment_lease_period_idx"
+            ),
+        ),
+    ]
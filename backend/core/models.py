@@ -1,15 +1,23 @@
+import threading
 import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import date
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from . import metrics
+from .cache import invalidate_landlord_revenue
+
 
 class Profile(models.Model):
     ROLE_LANDLORD = "landlord"
@@ -129,6 +137,20 @@ class Lease(models.Model):
         return f"Lease {self.unit} - {self.tenant.username}"
 
 
+class PropertyAccess(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="property_access", db_index=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="access")
+    role = models.CharField(max_length=20, choices=Profile.ROLE_CHOICES)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "role", "property"], name="uniq_property_access_user_role")
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} {self.property_id}"
+
+
 class TenantInvite(models.Model):
     STATUS_PENDING = "pending"
     STATUS_ACCEPTED = "accepted"
@@ -180,8 +202,9 @@ class PaymentTransaction(models.Model):
         (STATUS_SUCCESS, "SUCCESS"),
         (STATUS_FAILED, "FAILED"),
     ]
+    WALLET_RESULT_DESC = "Auto wallet rent debit"
 
-    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name="payment_transactions")
+    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name="payment_transactions", db_index=False)
     tenant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payment_transactions")
     period = models.CharField(max_length=7)
     phone_number = models.CharField(max_length=20)
@@ -195,12 +218,131 @@ class PaymentTransaction(models.Model):
     transaction_date = models.DateTimeField(blank=True, null=True)
     raw_callback = models.JSONField(blank=True, null=True)
     allocation_done = models.BooleanField(default=False)
+    receipt_pending = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="payment_created_id_idx"),
+            models.Index(fields=["tenant", "created_at", "id"], name="payment_tenant_created_idx"),
+            models.Index(fields=["status", "created_at"], name="payment_status_created_idx"),
+            models.Index(fields=["lease", "period", "status"], name="payment_lease_period_idx"),
+        ]
+
     def __str__(self):
         return f"{self.tenant.username} {self.period} {self.amount}"
 
 
+class StkPushOutbox(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_UNKNOWN = "unknown"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_UNKNOWN, "Unknown"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    payment = models.OneToOneField(PaymentTransaction, on_delete=models.CASCADE, related_name="stk_outbox")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at", "id"], name="stk_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"STK push {self.payment_id} ({self.status})"
+
+
+class StkCallbackInbox(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_UNMATCHED = "unmatched"
+    STATUS_ERROR = "error"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_PROCESSING, "Processing"),
+        (STATUS_DONE, "Done"),
+        (STATUS_UNMATCHED, "Unmatched"),
+        (STATUS_ERROR, "Error"),
+    ]
+
+    checkout_request_id = models.CharField(max_length=100, unique=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.CharField(max_length=255, blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at", "id"], name="stk_callback_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"STK callback {self.checkout_request_id} ({self.status})"
+
+
+class RentPeriodBalance(models.Model):
+    STATUS_PAID = "PAID"
+    STATUS_PARTIAL = "PARTIAL"
+    STATUS_UNPAID = "UNPAID"
+    STATUS_CHOICES = [
+        (STATUS_PAID, "Paid"),
+        (STATUS_PARTIAL, "Partial"),
+        (STATUS_UNPAID, "Unpaid"),
+    ]
+
+    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name="period_balances")
+    period = models.CharField(max_length=7)
+    rent_due = models.DecimalField(max_digits=12, decimal_places=2)
+    paid_sum = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UNPAID)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["lease", "period"], name="uniq_rent_balance_per_lease_period")
+        ]
+
+    def __str__(self):
+        return f"{self.lease_id} {self.period} {self.paid_sum}/{self.rent_due}"
+
+
+class RevenueRollup(models.Model):
+    landlord = models.ForeignKey(User, on_delete=models.CASCADE, related_name="revenue_rollups", db_index=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="revenue_rollups")
+    period = models.CharField(max_length=7)
+    gross_collected = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    wallet_applied = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    payment_count = models.PositiveIntegerField(default=0)
+    expected_rent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["landlord", "period", "property"], name="uniq_revenue_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} {self.period} {self.gross_collected}"
+
+
 class LandlordBalance(models.Model):
     landlord = models.OneToOneField(User, on_delete=models.CASCADE, related_name="landlord_balance")
     available_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
@@ -208,6 +350,18 @@ class LandlordBalance(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
 
+class LandlordBalanceShard(models.Model):
+    landlord = models.ForeignKey(User, on_delete=models.CASCADE, related_name="landlord_balance_shards", db_index=False)
+    slot = models.PositiveSmallIntegerField()
+    locked_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["landlord", "slot"], name="uniq_landlord_balance_shard"),
+        ]
+
+
 class LedgerTransaction(models.Model):
     KIND_WALLET_CREDIT = "WALLET_CREDIT"
     KIND_WALLET_DEBIT_RENT = "WALLET_DEBIT_RENT"
@@ -247,6 +401,17 @@ class LedgerTransaction(models.Model):
     reference_text = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "kind", "status", "created_at", "id"], name="ledger_user_kind_created_idx"),
+            models.Index(fields=["kind", "status", "available_at", "id"], name="ledger_release_idx"),
+            models.Index(
+                fields=["user", "kind", "available_at"],
+                condition=models.Q(status="LOCKED"),
+                name="ledger_user_locked_idx",
+            ),
+        ]
+
 
 class LandlordPayout(models.Model):
     METHOD_MPESA = "MPESA"
@@ -266,6 +431,11 @@ class LandlordPayout(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["landlord", "created_at", "id"], name="payout_landlord_created_idx"),
+        ]
+
 
 class MaintenanceRequest(models.Model):
     STATUS_OPEN = "open"
@@ -278,12 +448,19 @@ class MaintenanceRequest(models.Model):
     ]
 
     tenant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="maintenance_requests")
-    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name="maintenance_requests")
+    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name="maintenance_requests", db_index=False)
     issue = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="maint_updated_id_idx"),
+            models.Index(fields=["tenant", "updated_at", "id"], name="maint_tenant_updated_idx"),
+            models.Index(fields=["lease", "updated_at"], name="maint_lease_updated_idx"),
+        ]
+
 
 class Notification(models.Model):
     TYPE_GENERIC = "generic"
@@ -306,50 +483,565 @@ class Notification(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "type", "lease", "period"], name="uniq_overdue_notice_per_lease_period")
         ]
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="notif_user_created_idx"),
+        ]
+
+
+def _base_rent_status(rent_due, paid_sum):
+    if rent_due - paid_sum <= 0:
+        return RentPeriodBalance.STATUS_PAID
+    if paid_sum > 0:
+        return RentPeriodBalance.STATUS_PARTIAL
+    return RentPeriodBalance.STATUS_UNPAID
+
+
+def _rent_status_row(lease, paid_sum, period, today):
+    rent_due = lease.rent_amount
+    balance = rent_due - paid_sum
+    status = _base_rent_status(rent_due, paid_sum)
+
+    if today.day > lease.due_day and balance > 0:
+        status = "OVERDUE"
+
+    return {
+        "period": period,
+        "rent_due": rent_due,
+        "paid_sum": paid_sum,
+        "balance": balance,
+        "status": status,
+    }
+
+
+def _overdue_notice_defaults(today):
+    return {
+        "title": "Rent overdue",
+        "message": f"Your rent for {today.strftime('%B %Y')} is overdue. Please clear your balance to avoid eviction procedures.",
+    }
 
 
 def compute_lease_rent_status(lease, period=None, today=None):
     today = today or timezone.localdate()
     period = period or today.strftime("%Y-%m")
     paid_sum = (
-        PaymentTransaction.objects.filter(
-            lease=lease,
-            period=period,
-            status=PaymentTransaction.STATUS_SUCCESS,
-        ).aggregate(total=Coalesce(Sum("amount"), Decimal("0.00")))["total"]
+        RentPeriodBalance.objects.filter(lease=lease, period=period).values_list("paid_sum", flat=True).first()
+        or Decimal("0.00")
     )
-    rent_due = lease.rent_amount
-    balance = rent_due - paid_sum
+    return _rent_status_row(lease, paid_sum, period, today)
 
-    if balance <= 0:
-        status = "PAID"
-    elif paid_sum > 0:
-        status = "PARTIAL"
-    else:
-        status = "UNPAID"
 
-    if today.day > lease.due_day and balance > 0:
-        status = "OVERDUE"
-        Notification.objects.get_or_create(
-            user=lease.tenant,
+def annotate_rent_paid_sum(leases, period):
+    paid = RentPeriodBalance.objects.filter(lease=OuterRef("pk"), period=period).values("paid_sum")[:1]
+    return leases.annotate(
+        rent_paid_sum=Coalesce(
+            Subquery(paid),
+            Decimal("0.00"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        rent_paid_period=Value(period, output_field=models.CharField(max_length=7)),
+    )
+
+
+def rent_status_from_annotation(lease, today=None):
+    return _rent_status_row(lease, lease.rent_paid_sum, lease.rent_paid_period, today or timezone.localdate())
+
+
+def compute_lease_rent_statuses(leases, period=None, today=None):
+    today = today or timezone.localdate()
+    period = period or today.strftime("%Y-%m")
+    return [(lease, rent_status_from_annotation(lease, today)) for lease in annotate_rent_paid_sum(leases, period)]
+
+
+def sweep_overdue_notices(today=None, batch_size=1000):
+    today = today or timezone.localdate()
+    period = today.strftime("%Y-%m")
+    overdue = (
+        annotate_rent_paid_sum(Lease.objects.filter(status=Lease.STATUS_ACTIVE, due_day__lt=today.day), period)
+        .filter(rent_paid_sum__lt=F("rent_amount"))
+        .values_list("id", "tenant_id")
+    )
+    notices = [
+        Notification(
+            user_id=tenant_id,
             type=Notification.TYPE_OVERDUE,
+            lease_id=lease_id,
+            period=period,
+            **_overdue_notice_defaults(today),
+        )
+        for lease_id, tenant_id in overdue
+    ]
+    Notification.objects.bulk_create(notices, batch_size=batch_size, ignore_conflicts=True)
+    return len(notices)
+
+
+def record_rent_payment(lease, period, amount, wallet_applied=False):
+    landlord_id = lease.unit.property.landlord_id
+    with transaction.atomic():
+        record_revenue(lease.unit.property, period, amount, wallet_applied)
+        # Registered inside the block so it runs after this write commits, even without an outer transaction.
+        transaction.on_commit(lambda: invalidate_landlord_revenue(landlord_id))
+        balance, _ = RentPeriodBalance.objects.select_for_update().get_or_create(
             lease=lease,
             period=period,
-            defaults={
-                "title": "Rent overdue",
-                "message": f"Your rent for {today.strftime('%B %Y')} is overdue. Please clear your balance to avoid eviction procedures.",
-            },
+            defaults={"rent_due": lease.rent_amount},
+        )
+        balance.rent_due = lease.rent_amount
+        balance.paid_sum += amount
+        balance.status = _base_rent_status(balance.rent_due, balance.paid_sum)
+        balance.save(update_fields=["rent_due", "paid_sum", "status", "updated_at"])
+    return balance
+
+
+def rebuild_rent_period_balances(leases=None, batch_size=1000):
+    leases = Lease.objects.all() if leases is None else leases
+    totals = (
+        PaymentTransaction.objects.filter(lease__in=leases, status=PaymentTransaction.STATUS_SUCCESS)
+        .order_by()
+        .values("lease_id", "lease__rent_amount", "period")
+        .annotate(total=Sum("amount"))
+    )
+
+    rows = []
+    created = 0
+    with transaction.atomic():
+        RentPeriodBalance.objects.filter(lease__in=leases).delete()
+        for total in totals.iterator(chunk_size=batch_size):
+            created += 1
+            rows.append(
+                RentPeriodBalance(
+                    lease_id=total["lease_id"],
+                    period=total["period"],
+                    rent_due=total["lease__rent_amount"],
+                    paid_sum=total["total"],
+                    status=_base_rent_status(total["lease__rent_amount"], total["total"]),
+                )
+            )
+            if len(rows) >= batch_size:
+                RentPeriodBalance.objects.bulk_create(rows)
+                rows = []
+        if rows:
+            RentPeriodBalance.objects.bulk_create(rows)
+    return created
+
+
+def period_range(start, end):
+    year, month = map(int, start.split("-"))
+    end_year, end_month = map(int, end.split("-"))
+    periods = []
+    while (year, month) <= (end_year, end_month):
+        periods.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def _next_period_start(period):
+    year, month = map(int, period.split("-"))
+    return date(year + month // 12, month % 12 + 1, 1)
+
+
+def _expected_rent(property_id, period):
+    return (
+        Lease.objects.filter(unit__property_id=property_id, status=Lease.STATUS_ACTIVE, start_date__lt=_next_period_start(period))
+        .aggregate(total=Sum("rent_amount"))["total"]
+        or Decimal("0.00")
+    )
+
+
+def record_revenue(prop, period, amount, wallet_applied=False):
+    rollup, _ = RevenueRollup.objects.get_or_create(
+        landlord_id=prop.landlord_id,
+        property=prop,
+        period=period,
+        defaults={"expected_rent": lambda: _expected_rent(prop.id, period)},
+    )
+    RevenueRollup.objects.filter(pk=rollup.pk).update(
+        gross_collected=F("gross_collected") + amount,
+        wallet_applied=F("wallet_applied") + (amount if wallet_applied else Decimal("0.00")),
+        payment_count=F("payment_count") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def _upsert_expected_rent(rows, batch_size=1000):
+    RevenueRollup.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["landlord", "period", "property"],
+        update_fields=["expected_rent", "updated_at"],
+    )
+
+
+def _lease_rent_state(property_id, start_date, rent_amount, status):
+    return property_id, str(start_date)[:10], Decimal(str(rent_amount)), status
+
+
+def shift_expected_rent(previous, state, since=None, today=None):
+    # Applies the difference between two lease states; months before `since` keep the expected rent they were billed at.
+    current = (today or timezone.localdate()).strftime("%Y-%m")
+    since = since or current
+    deltas = {}
+    for lease_state, sign in [(previous, -1), (state, 1)]:
+        if lease_state is None or lease_state[3] != Lease.STATUS_ACTIVE:
+            continue
+        property_id, start_date, rent_amount, _ = lease_state
+        for period in period_range(max(since, start_date[:7]), current):
+            periods = deltas.setdefault(property_id, {})
+            periods[period] = periods.get(period, Decimal("0.00")) + sign * rent_amount
+
+    with transaction.atomic():
+        for property_id, periods in deltas.items():
+            periods = {period: amount for period, amount in periods.items() if amount}
+            landlord_id = Property.objects.filter(pk=property_id).values_list("landlord_id", flat=True).first()
+            if landlord_id is None or not periods:
+                continue
+            existing = set(RevenueRollup.objects.filter(property_id=property_id, period__in=periods).values_list("period", flat=True))
+            RevenueRollup.objects.bulk_create(
+                [
+                    RevenueRollup(landlord_id=landlord_id, property_id=property_id, period=period, expected_rent=_expected_rent(property_id, period))
+                    for period in periods
+                    if period not in existing
+                ],
+                ignore_conflicts=True,
+            )
+            by_amount = {}
+            for period in existing:
+                by_amount.setdefault(periods[period], []).append(period)
+            for amount, group in by_amount.items():
+                RevenueRollup.objects.filter(property_id=property_id, period__in=group).update(
+                    expected_rent=F("expected_rent") + amount,
+                    updated_at=timezone.now(),
+                )
+
+
+def seed_revenue_rollups(today=None, batch_size=1000):
+    period = (today or timezone.localdate()).strftime("%Y-%m")
+    totals = (
+        Lease.objects.filter(status=Lease.STATUS_ACTIVE, start_date__lt=_next_period_start(period))
+        .order_by()
+        .values("unit__property__landlord_id", "unit__property_id")
+        .annotate(total=Sum("rent_amount"))
+    )
+    rows = [
+        RevenueRollup(
+            landlord_id=total["unit__property__landlord_id"],
+            property_id=total["unit__property_id"],
+            period=period,
+            expected_rent=total["total"],
+        )
+        for total in totals.iterator(chunk_size=batch_size)
+    ]
+    _upsert_expected_rent(rows, batch_size)
+    return len(rows)
+
+
+def rebuild_revenue_rollups(landlord_ids=None, batch_size=1000, today=None):
+    current = (today or timezone.localdate()).strftime("%Y-%m")
+    properties = Property.objects.all() if landlord_ids is None else Property.objects.filter(landlord_id__in=landlord_ids)
+    rows = {}
+
+    def rollup(landlord_id, property_id, period):
+        if (property_id, period) not in rows:
+            rows[property_id, period] = RevenueRollup(landlord_id=landlord_id, property_id=property_id, period=period)
+        return rows[property_id, period]
+
+    leases = Lease.objects.filter(unit__property__in=properties, status=Lease.STATUS_ACTIVE).values_list(
+        "unit__property__landlord_id", "unit__property_id", "rent_amount", "start_date"
+    )
+    for landlord_id, property_id, rent_amount, start_date in leases.iterator(chunk_size=batch_size):
+        for period in period_range(start_date.strftime("%Y-%m"), current):
+            rollup(landlord_id, property_id, period).expected_rent += rent_amount
+    # Closed months keep the expected rent they were billed at, including leases that have since ended.
+    closed = RevenueRollup.objects.filter(property__in=properties, period__lt=current).values_list(
+        "landlord_id", "property_id", "period", "expected_rent"
+    )
+    for landlord_id, property_id, period, expected_rent in closed.iterator(chunk_size=batch_size):
+        rollup(landlord_id, property_id, period).expected_rent = expected_rent
+
+    totals = (
+        PaymentTransaction.objects.filter(lease__unit__property__in=properties, status=PaymentTransaction.STATUS_SUCCESS)
+        .order_by()
+        .values("lease__unit__property__landlord_id", "lease__unit__property_id", "period")
+        .annotate(
+            gross=Sum("amount"),
+            wallet=Sum("amount", filter=Q(result_desc=PaymentTransaction.WALLET_RESULT_DESC)),
+            count=Count("id"),
+        )
+    )
+    for total in totals.iterator(chunk_size=batch_size):
+        row = rollup(total["lease__unit__property__landlord_id"], total["lease__unit__property_id"], total["period"])
+        row.gross_collected = total["gross"]
+        row.wallet_applied = total["wallet"] or Decimal("0.00")
+        row.payment_count = total["count"]
+
+    with transaction.atomic():
+        RevenueRollup.objects.filter(property__in=properties).delete()
+        RevenueRollup.objects.bulk_create(rows.values(), batch_size=batch_size)
+    return len(rows)
+
+
+HOLDS_RELEASED = metrics.counter("krib_holds_released_total", "Matured ledger holds moved to available balances.", ["kind"])
+
+
+def _hold_targets():
+    return [
+        (LedgerTransaction.KIND_WALLET_CREDIT, Profile, "user_id", "wallet_locked", "wallet_available"),
+        (LedgerTransaction.KIND_LANDLORD_CREDIT_RENT, LandlordBalance, "landlord_id", "locked_balance", "available_balance"),
+    ]
+
+
+def _release_hold_batch(kind, balance_model, owner_field, locked_field, available_field, now, batch_size, user_ids):
+    with transaction.atomic():
+        matured = LedgerTransaction.objects.filter(
+            kind=kind,
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at__lte=now,
+        )
+        if user_ids is not None:
+            matured = matured.filter(user_id__in=user_ids)
+        ids = list(matured.select_for_update(skip_locked=True).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        matured_sum = Subquery(
+            LedgerTransaction.objects.filter(id__in=ids, user_id=OuterRef(owner_field))
+            .order_by()
+            .values("user_id")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        balance_model.objects.filter(**{f"{owner_field}__in": LedgerTransaction.objects.filter(id__in=ids).values("user_id")}).update(
+            **{
+                locked_field: Greatest(F(locked_field) - matured_sum, Value(Decimal("0.00"))),
+                available_field: F(available_field) + matured_sum,
+                "updated_at": now,
+            }
         )
+        LedgerTransaction.objects.filter(id__in=ids).update(status=LedgerTransaction.STATUS_AVAILABLE)
+    HOLDS_RELEASED.inc(len(ids), kind=kind)
+    return len(ids)
+
+
+def release_matured_holds(now=None, batch_size=1000, user_ids=None):
+    now = now or timezone.now()
+    released = 0
+    # Sharded rent credits must reach LandlordBalance before its locked total is drawn down.
+    fold_landlord_balance_shards(user_ids)
+    for target in _hold_targets():
+        while True:
+            count = _release_hold_batch(*target, now, batch_size, user_ids)
+            released += count
+            if count < batch_size:
+                break
+    return released
+
+
+def _adjust_balance(model, lookup, field, amount):
+    rows = model.objects.filter(**lookup)
+    if amount < 0:
+        rows = rows.filter(**{f"{field}__gte": -amount})
+    changes = {field: F(field) + amount, "updated_at": timezone.now()}
+    if rows.update(**changes):
+        return True
+    if amount < 0:
+        return False
+    _, created = model.objects.get_or_create(**lookup, defaults={field: amount})
+    return created or bool(rows.update(**changes))
+
+
+def adjust_wallet(user_id, field, amount):
+    return _adjust_balance(Profile, {"user_id": user_id}, field, amount)
+
+
+def adjust_landlord_balance(landlord_id, field, amount):
+    return _adjust_balance(LandlordBalance, {"landlord_id": landlord_id}, field, amount)
+
 
+_landlord_credit_batch = threading.local()
+
+
+def _credit_landlord_locked(landlord_id, amount, key):
+    shards = settings.LANDLORD_BALANCE_SHARDS
+    if shards <= 1:
+        return adjust_landlord_balance(landlord_id, "locked_balance", amount)
+    slot = zlib.crc32(str(key).encode()) % shards
+    return _adjust_balance(LandlordBalanceShard, {"landlord_id": landlord_id, "slot": slot}, "locked_balance", amount)
+
+
+def credit_landlord_locked(landlord_id, amount, key):
+    entries = getattr(_landlord_credit_batch, "entries", None)
+    if entries is not None:
+        entries.append((landlord_id, amount, key))
+        return True
+    return _credit_landlord_locked(landlord_id, amount, key)
+
+
+@contextmanager
+def batched_landlord_credits():
+    # Collects rent credits and writes one UPDATE per landlord on exit; use inside the batch's transaction.
+    entries = _landlord_credit_batch.entries = []
+    try:
+        yield entries
+        totals = {}
+        for landlord_id, amount, key in entries:
+            total, _ = totals.get(landlord_id, (Decimal("0.00"), key))
+            totals[landlord_id] = (total + amount, key)
+        for landlord_id, (amount, key) in totals.items():
+            _credit_landlord_locked(landlord_id, amount, key)
+    finally:
+        _landlord_credit_batch.entries = None
+
+
+def fold_landlord_balance_shards(landlord_ids=None):
+    shards = LandlordBalanceShard.objects.exclude(locked_balance=0)
+    if landlord_ids is not None:
+        shards = shards.filter(landlord_id__in=landlord_ids)
+    if not shards.exists():
+        return 0
+    with transaction.atomic():
+        rows = list(shards.select_for_update().values_list("id", "landlord_id", "locked_balance"))
+        totals = {}
+        for _, landlord_id, amount in rows:
+            totals[landlord_id] = totals.get(landlord_id, Decimal("0.00")) + amount
+        for landlord_id, amount in totals.items():
+            adjust_landlord_balance(landlord_id, "locked_balance", amount)
+        LandlordBalanceShard.objects.filter(id__in=[row[0] for row in rows]).update(locked_balance=Decimal("0.00"), updated_at=timezone.now())
+    return len(rows)
+
+
+def landlord_balance_totals(landlord_id):
+    sharded = (
+        LandlordBalanceShard.objects.filter(landlord_id=OuterRef("landlord_id"))
+        .values("landlord_id")
+        .annotate(total=Sum("locked_balance"))
+        .values("total")
+    )
+    balance = LandlordBalance.objects.filter(landlord_id=landlord_id).annotate(sharded=Subquery(sharded)).first()
+    if balance is None:
+        balance, _ = LandlordBalance.objects.get_or_create(landlord_id=landlord_id)
+        balance.sharded = LandlordBalanceShard.objects.filter(landlord_id=landlord_id).aggregate(total=Sum("locked_balance"))["total"]
     return {
-        "period": period,
-        "rent_due": rent_due,
-        "paid_sum": paid_sum,
-        "balance": balance,
-        "status": status,
+        "available_balance": balance.available_balance,
+        "locked_balance": balance.locked_balance + (balance.sharded or Decimal("0.00")),
     }
 
 
+def _expected_property_access(property_ids=None):
+    properties = Property.objects.all()
+    leases = Lease.objects.filter(status=Lease.STATUS_ACTIVE)
+    if property_ids is not None:
+        properties = properties.filter(id__in=property_ids)
+        leases = leases.filter(unit__property_id__in=property_ids)
+
+    expected = set()
+    for property_id, landlord_id, manager_id in properties.values_list("id", "landlord_id", "manager_id"):
+        expected.add((landlord_id, property_id, Profile.ROLE_LANDLORD))
+        if manager_id:
+            expected.add((manager_id, property_id, Profile.ROLE_MANAGER))
+    for tenant_id, property_id in leases.values_list("tenant_id", "unit__property_id").distinct():
+        expected.add((tenant_id, property_id, Profile.ROLE_TENANT))
+    return expected
+
+
+def diff_property_access(property_ids=None):
+    current = PropertyAccess.objects.all()
+    if property_ids is not None:
+        current = current.filter(property_id__in=property_ids)
+    existing = {(user_id, property_id, role): pk for pk, user_id, property_id, role in current.values_list("id", "user_id", "property_id", "role")}
+    expected = _expected_property_access(property_ids)
+    missing = expected - existing.keys()
+    stale = [pk for key, pk in existing.items() if key not in expected]
+    return missing, stale
+
+
+def sync_property_access(property_ids=None):
+    property_ids = None if property_ids is None else [pk for pk in set(property_ids) if pk]
+    if property_ids == []:
+        return 0, 0
+    missing, stale = diff_property_access(property_ids)
+    with transaction.atomic():
+        if stale:
+            PropertyAccess.objects.filter(id__in=stale).delete()
+        if missing:
+            PropertyAccess.objects.bulk_create(
+                [PropertyAccess(user_id=user_id, property_id=property_id, role=role) for user_id, property_id, role in missing],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+    return len(missing), len(stale)
+
+
+@receiver(post_save, sender=Property)
+def sync_property_owner_access(sender, instance, **kwargs):
+    sync_property_access([instance.pk])
+
+
+@receiver(pre_save, sender=Unit)
+def remember_unit_property(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or "property" in update_fields):
+        instance._previous_property_id = Unit.objects.filter(pk=instance.pk).values_list("property_id", flat=True).first()
+
+
+@receiver(post_save, sender=Unit)
+def sync_unit_access(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, "_previous_property_id", None)
+    if not created and previous is not None and previous != instance.property_id:
+        sync_property_access([previous, instance.property_id])
+
+
+@receiver(pre_save, sender=Lease)
+def remember_lease_property(sender, instance, **kwargs):
+    if instance.pk:
+        previous = Lease.objects.filter(pk=instance.pk).values_list("unit__property_id", "start_date", "rent_amount", "status").first()
+        instance._previous_property_id = previous[0] if previous else None
+        instance._previous_rent_state = _lease_rent_state(*previous) if previous else None
+
+
+@receiver(post_save, sender=Lease)
+def sync_lease_access(sender, instance, **kwargs):
+    sync_property_access([getattr(instance, "_previous_property_id", None), instance.unit.property_id])
+
+
+@receiver(post_save, sender=Lease)
+def refresh_lease_expected_rent(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_rent_state", None)
+    state = _lease_rent_state(instance.unit.property_id, instance.start_date, instance.rent_amount, instance.status)
+    if previous == state:
+        return
+    if previous is None:
+        shift_expected_rent(None, state, since=state[1][:7])
+    elif (previous[0], previous[2], previous[3]) == (state[0], state[2], state[3]):
+        shift_expected_rent(previous, state, since=min(previous[1], state[1])[:7])
+    else:
+        shift_expected_rent(previous, state)
+
+
+@receiver(pre_delete, sender=Lease)
+def remember_deleted_lease_property(sender, instance, **kwargs):
+    instance._previous_property_id = Unit.objects.filter(pk=instance.unit_id).values_list("property_id", flat=True).first()
+
+
+@receiver(post_delete, sender=Lease)
+def refresh_deleted_lease_expected_rent(sender, instance, **kwargs):
+    property_id = getattr(instance, "_previous_property_id", None)
+    # After commit, so a cascading property delete does not get fresh rollup rows inserted under it.
+    if property_id:
+        state = _lease_rent_state(property_id, instance.start_date, instance.rent_amount, instance.status)
+        transaction.on_commit(lambda: shift_expected_rent(state, None))
+
+
+@receiver(post_delete, sender=Lease)
+def revoke_lease_access(sender, instance, **kwargs):
+    property_id = getattr(instance, "_previous_property_id", None)
+    still_leased = Lease.objects.filter(
+        tenant_id=instance.tenant_id,
+        unit__property_id=property_id,
+        status=Lease.STATUS_ACTIVE,
+    ).exists()
+    if property_id and not still_leased:
+        PropertyAccess.objects.filter(user_id=instance.tenant_id, property_id=property_id, role=Profile.ROLE_TENANT).delete()
+
+
 @receiver(post_save, sender=User)
 def ensure_user_profiles(sender, instance, created, **kwargs):
     if created:
@@ -0,0 +1,534 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from decimal import Decimal
+from urllib.error import URLError
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+
+from . import daraja, metrics
+from .models import (
+    Lease,
+    LedgerTransaction,
+    PaymentTransaction,
+    Profile,
+    RentPeriodBalance,
+    StkCallbackInbox,
+    StkPushOutbox,
+    adjust_wallet,
+    annotate_rent_paid_sum,
+    batched_landlord_credits,
+    compute_lease_rent_status,
+    credit_landlord_locked,
+    record_rent_payment,
+    release_matured_holds,
+)
+
+logger = logging.getLogger(__name__)
+
+LANDLORD_HOLD_DAYS = 2
+WALLET_CREDIT_HOLD_DAYS = 7
+STK_PUSH_MAX_ATTEMPTS = 3
+STK_PUSH_RETRY_SECONDS = 15
+STK_PUSH_SEND_TIMEOUT = timedelta(minutes=5)
+STK_PUSH_UNKNOWN_WINDOW = timedelta(minutes=30)
+STK_CALLBACK_MAX_ATTEMPTS = 5
+STK_CALLBACK_RETRY_SECONDS = 30
+STK_CALLBACK_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+RECONCILE_MIN_AGE = timedelta(minutes=5)
+
+CALLBACK_APPLIED = "applied"
+CALLBACK_DUPLICATE = "duplicate"
+CALLBACK_UNMATCHED = "unmatched"
+
+STK_PUSHES = metrics.counter("krib_stk_push_dispatch_total", "STK push outbox dispatch results.", ["outcome"])
+STK_CALLBACKS = metrics.counter("krib_stk_callbacks_total", "STK callbacks by outcome and payment result.", ["outcome", "result"])
+ALLOCATION_LAG = metrics.histogram(
+    "krib_payment_allocation_lag_seconds",
+    "Time from payment creation to ledger allocation.",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400),
+)
+
+
+def _fail_payment(payment, reason):
+    payment.status = PaymentTransaction.STATUS_FAILED
+    payment.result_desc = reason[:255]
+    payment.save(update_fields=["status", "result_desc"])
+
+
+def expire_stuck_stk_pushes(now=None):
+    now = now or timezone.now()
+    stuck = StkPushOutbox.objects.filter(
+        status=StkPushOutbox.STATUS_SENDING,
+        claimed_at__lt=now - STK_PUSH_SEND_TIMEOUT,
+    )
+    expired = 0
+    for row in stuck:
+        # Daraja may have accepted the push before the worker stopped; fail_unresolved_stk_pushes settles it.
+        row.status = StkPushOutbox.STATUS_UNKNOWN
+        row.last_error = "STK push worker stopped before Daraja answered."
+        row.save(update_fields=["status", "last_error", "updated_at"])
+        logger.warning("STK push expired while sending", extra={"payment_id": row.payment_id})
+        expired += 1
+    return expired
+
+
+def _claim_stk_pushes(batch_size, now):
+    with transaction.atomic():
+        ids = list(
+            StkPushOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=StkPushOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        StkPushOutbox.objects.filter(id__in=ids).update(
+            status=StkPushOutbox.STATUS_SENDING,
+            claimed_at=now,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+    return list(StkPushOutbox.objects.filter(id__in=ids).select_related("payment").order_by("id"))
+
+
+def _send_stk_push(row):
+    payment = row.payment
+    try:
+        return daraja.stk_push(payment.phone_number, payment.amount, f"LEASE-{payment.lease_id}"), None, False
+    except URLError as exc:
+        # Raised before the request reached Daraja (DNS, refused, connect timeout), so pushing again is safe.
+        logger.warning("STK push could not reach Daraja", extra={"payment_id": payment.id, "error": str(exc)})
+        return None, str(exc) or exc.__class__.__name__, False
+    except Exception as exc:
+        logger.warning("STK push outcome unknown", extra={"payment_id": payment.id, "error": str(exc)})
+        return None, str(exc) or exc.__class__.__name__, True
+
+
+def _record_stk_push_result(row, result, error, outcome_unknown=False):
+    payment = row.payment
+    with transaction.atomic():
+        if outcome_unknown:
+            # Daraja may have accepted the push; another push could prompt the tenant twice.
+            row.status = StkPushOutbox.STATUS_UNKNOWN
+            row.last_error = (error or "Daraja did not answer the STK push.")[:255]
+        elif result and result.get("CheckoutRequestID"):
+            payment.merchant_request_id = result.get("MerchantRequestID")
+            payment.checkout_request_id = result.get("CheckoutRequestID")
+            payment.result_code = result.get("ResponseCode")
+            payment.result_desc = result.get("ResponseDescription")
+            payment.save(update_fields=["merchant_request_id", "checkout_request_id", "result_code", "result_desc"])
+            row.status = StkPushOutbox.STATUS_SENT
+            row.last_error = None
+        else:
+            error = (error or (result or {}).get("errorMessage") or "Daraja did not accept the STK push.")[:255]
+            row.last_error = error
+            if row.attempts >= STK_PUSH_MAX_ATTEMPTS:
+                _fail_payment(payment, error)
+                row.status = StkPushOutbox.STATUS_FAILED
+            else:
+                row.status = StkPushOutbox.STATUS_PENDING
+                row.next_attempt_at = timezone.now() + timedelta(seconds=STK_PUSH_RETRY_SECONDS * 2 ** (row.attempts - 1))
+        row.save(update_fields=["status", "last_error", "next_attempt_at", "updated_at"])
+    STK_PUSHES.inc(outcome={StkPushOutbox.STATUS_PENDING: "retry"}.get(row.status, row.status))
+    logger.info(
+        "STK push dispatched",
+        extra={"payment_id": payment.id, "outbox_status": row.status, "attempts": row.attempts},
+    )
+
+
+def dispatch_stk_outbox(batch_size=50, concurrency=8):
+    now = timezone.now()
+    expire_stuck_stk_pushes(now)
+    rows = _claim_stk_pushes(batch_size, now)
+    if not rows:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(rows)))) as pool:
+        # Record each push as Daraja answers it, not after the batch, so its callback can find the CheckoutRequestID.
+        futures = {pool.submit(_send_stk_push, row): row for row in rows}
+        for future in as_completed(futures):
+            _record_stk_push_result(futures[future], *future.result())
+    return len(rows)
+
+
+def allocate_success_payment(payment):
+    if payment.allocation_done or payment.status != PaymentTransaction.STATUS_SUCCESS:
+        return
+
+    lease = payment.lease
+    landlord_id = lease.unit.property.landlord_id
+    with transaction.atomic():
+        claimed = PaymentTransaction.objects.filter(
+            pk=payment.pk,
+            status=PaymentTransaction.STATUS_SUCCESS,
+            allocation_done=False,
+        ).update(allocation_done=True)
+        if not claimed:
+            return
+        payment.allocation_done = True
+
+        rent_status = compute_lease_rent_status(lease, period=payment.period)
+        due_before = max(rent_status["balance"] + payment.amount, Decimal("0.00"))
+        rent_applied = min(payment.amount, due_before)
+        overpayment = payment.amount - rent_applied
+
+        if rent_applied > 0:
+            credit_landlord_locked(landlord_id, rent_applied, payment.id)
+            LedgerTransaction.objects.create(
+                user_id=landlord_id,
+                kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+                amount=rent_applied,
+                status=LedgerTransaction.STATUS_LOCKED,
+                available_at=timezone.now() + timedelta(days=LANDLORD_HOLD_DAYS),
+                reference_text=f"payment:{payment.id};lease:{lease.id}",
+            )
+
+        if overpayment > 0:
+            adjust_wallet(payment.tenant_id, "wallet_locked", overpayment)
+            LedgerTransaction.objects.create(
+                user_id=payment.tenant_id,
+                kind=LedgerTransaction.KIND_WALLET_CREDIT,
+                amount=overpayment,
+                status=LedgerTransaction.STATUS_LOCKED,
+                available_at=timezone.now() + timedelta(days=WALLET_CREDIT_HOLD_DAYS),
+                reference_text=f"payment:{payment.id};lease:{lease.id}",
+            )
+    ALLOCATION_LAG.observe((timezone.now() - payment.created_at).total_seconds())
+
+
+def apply_wallet_to_current_rent(lease, release_holds=True):
+    if release_holds:
+        release_matured_holds(user_ids=[lease.tenant_id])
+    profile, _ = Profile.objects.get_or_create(user=lease.tenant)
+    if profile.wallet_available <= 0:
+        return Decimal("0.00")
+    if compute_lease_rent_status(lease)["balance"] <= 0:
+        return Decimal("0.00")
+
+    period = timezone.localdate().strftime("%Y-%m")
+    landlord_id = lease.unit.property.landlord_id
+    with transaction.atomic():
+        # The due amount is re-read under the period row lock, so concurrent debits cannot both pay it.
+        balance, _ = RentPeriodBalance.objects.select_for_update().get_or_create(
+            lease=lease,
+            period=period,
+            defaults={"rent_due": lease.rent_amount},
+        )
+        debit = min(profile.wallet_available, lease.rent_amount - balance.paid_sum)
+        if debit <= 0 or not adjust_wallet(lease.tenant_id, "wallet_available", -debit):
+            return Decimal("0.00")
+        payment = PaymentTransaction.objects.create(
+            lease=lease,
+            tenant=lease.tenant,
+            period=period,
+            phone_number=profile.phone_number or "WALLET",
+            amount=debit,
+            status=PaymentTransaction.STATUS_SUCCESS,
+            result_desc=PaymentTransaction.WALLET_RESULT_DESC,
+            transaction_date=timezone.now(),
+            allocation_done=True,
+        )
+        record_rent_payment(lease, period, debit, wallet_applied=True)
+        LedgerTransaction.objects.create(
+            user=lease.tenant,
+            kind=LedgerTransaction.KIND_WALLET_DEBIT_RENT,
+            amount=debit,
+            status=LedgerTransaction.STATUS_PAID,
+            reference_text=f"lease:{lease.id};period:{period}",
+        )
+        credit_landlord_locked(landlord_id, debit, payment.id)
+        LedgerTransaction.objects.create(
+            user_id=landlord_id,
+            kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+            amount=debit,
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at=timezone.now() + timedelta(days=LANDLORD_HOLD_DAYS),
+            reference_text=f"wallet_debit_lease:{lease.id}",
+        )
+    return debit
+
+
+def apply_wallets_to_current_rent(user_ids=None, today=None):
+    period = (today or timezone.localdate()).strftime("%Y-%m")
+    leases = Lease.objects.filter(status=Lease.STATUS_ACTIVE, tenant__profile__wallet_available__gt=0)
+    if user_ids is not None:
+        leases = leases.filter(tenant_id__in=user_ids)
+    leases = (
+        annotate_rent_paid_sum(leases, period)
+        .filter(rent_paid_sum__lt=F("rent_amount"))
+        .select_related("tenant", "unit__property")
+        .order_by("id")
+    )
+    # Matured holds are released by the release_holds job, so each lease skips its own release pass.
+    return sum(1 for lease in leases.iterator() if apply_wallet_to_current_rent(lease, release_holds=False) > 0)
+
+
+def _parse_transaction_date(value):
+    try:
+        parsed = datetime.strptime(str(value), "%Y%m%d%H%M%S")
+        return timezone.make_aware(parsed, timezone.get_current_timezone())
+    except ValueError:
+        return timezone.now()
+
+
+def _adopt_unknown_stk_push(checkout_request_id, merchant_request_id, metadata):
+    if not metadata.get("PhoneNumber") or metadata.get("Amount") is None:
+        return None
+    amount = Decimal(str(metadata["Amount"]))
+    payment = (
+        PaymentTransaction.objects.select_for_update(of=("self",))
+        .filter(
+            status=PaymentTransaction.STATUS_PENDING,
+            checkout_request_id__isnull=True,
+            stk_outbox__status=StkPushOutbox.STATUS_UNKNOWN,
+            phone_number=str(metadata["PhoneNumber"]),
+            amount__gte=amount,
+            amount__lt=amount + 1,
+        )
+        .order_by("created_at", "id")
+        .first()
+    )
+    if not payment:
+        return None
+    payment.checkout_request_id = checkout_request_id
+    payment.merchant_request_id = merchant_request_id
+    payment.save(update_fields=["checkout_request_id", "merchant_request_id"])
+    StkPushOutbox.objects.filter(payment=payment).update(status=StkPushOutbox.STATUS_SENT, last_error=None, updated_at=timezone.now())
+    logger.info("STK callback matched a push with unknown outcome", extra={"payment_id": payment.id, "checkout_request_id": checkout_request_id})
+    return payment
+
+
+def apply_stk_callback(data):
+    callback = data.get("Body", {}).get("stkCallback", {})
+    checkout_request_id = callback.get("CheckoutRequestID")
+    result_code = callback.get("ResultCode")
+    items = callback.get("CallbackMetadata", {}).get("Item", [])
+    metadata = {item.get("Name"): item.get("Value") for item in items if "Name" in item}
+
+    with transaction.atomic():
+        payment = None
+        if checkout_request_id:
+            payment = PaymentTransaction.objects.select_for_update().filter(checkout_request_id=checkout_request_id).first()
+        if not payment and checkout_request_id and result_code == 0:
+            payment = _adopt_unknown_stk_push(checkout_request_id, callback.get("MerchantRequestID"), metadata)
+        if not payment:
+            logger.warning("Unmatched STK callback received", extra={"checkout_request_id": checkout_request_id})
+            STK_CALLBACKS.inc(outcome=CALLBACK_UNMATCHED)
+            return CALLBACK_UNMATCHED, None
+
+        if payment.receipt_pending and result_code == 0 and metadata.get("MpesaReceiptNumber"):
+            payment.raw_callback = data
+            payment.mpesa_receipt = metadata["MpesaReceiptNumber"]
+            if metadata.get("TransactionDate"):
+                payment.transaction_date = _parse_transaction_date(metadata["TransactionDate"])
+            payment.receipt_pending = False
+            payment.save(update_fields=["raw_callback", "mpesa_receipt", "transaction_date", "receipt_pending"])
+            logger.info("STK receipt backfilled", extra={"payment_id": payment.id, "checkout_request_id": checkout_request_id})
+            STK_CALLBACKS.inc(outcome=CALLBACK_DUPLICATE, result=payment.status)
+            return CALLBACK_DUPLICATE, payment
+
+        if payment.status != PaymentTransaction.STATUS_PENDING:
+            logger.info(
+                "Duplicate STK callback ignored",
+                extra={
+                    "payment_id": payment.id,
+                    "checkout_request_id": checkout_request_id,
+                    "current_status": payment.status,
+                    "incoming_result_code": result_code,
+                },
+            )
+            STK_CALLBACKS.inc(outcome=CALLBACK_DUPLICATE, result=payment.status)
+            return CALLBACK_DUPLICATE, payment
+
+        payment.raw_callback = data
+        payment.result_code = result_code
+        payment.result_desc = callback.get("ResultDesc")
+        payment.mpesa_receipt = metadata.get("MpesaReceiptNumber")
+        if metadata.get("TransactionDate"):
+            payment.transaction_date = _parse_transaction_date(metadata["TransactionDate"])
+        payment.status = PaymentTransaction.STATUS_SUCCESS if result_code == 0 else PaymentTransaction.STATUS_FAILED
+        payment.receipt_pending = result_code == 0 and not payment.mpesa_receipt
+        payment.save(
+            update_fields=["raw_callback", "result_code", "result_desc", "mpesa_receipt", "transaction_date", "status", "receipt_pending"]
+        )
+        if payment.status == PaymentTransaction.STATUS_SUCCESS:
+            record_rent_payment(payment.lease, payment.period, payment.amount)
+            allocate_success_payment(payment)
+
+    logger.info(
+        "STK callback transition processed",
+        extra={
+            "payment_id": payment.id,
+            "checkout_request_id": checkout_request_id,
+            "status": payment.status,
+            "result_code": result_code,
+        },
+    )
+    STK_CALLBACKS.inc(outcome=CALLBACK_APPLIED, result=payment.status)
+    return CALLBACK_APPLIED, payment
+
+
+def _claim_stk_callbacks(batch_size, now):
+    with transaction.atomic():
+        due = StkCallbackInbox.objects.filter(status=StkCallbackInbox.STATUS_PENDING, next_attempt_at__lte=now)
+        stale = StkCallbackInbox.objects.filter(
+            status=StkCallbackInbox.STATUS_PROCESSING,
+            claimed_at__lt=now - STK_CALLBACK_CLAIM_TIMEOUT,
+        )
+        ids = list(
+            (due | stale).select_for_update(skip_locked=True).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        StkCallbackInbox.objects.filter(id__in=ids).update(
+            status=StkCallbackInbox.STATUS_PROCESSING,
+            claimed_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(StkCallbackInbox.objects.filter(id__in=ids).order_by("id"))
+
+
+def process_stk_callbacks(batch_size=100):
+    now = timezone.now()
+    rows = _claim_stk_callbacks(batch_size, now)
+    with transaction.atomic(), batched_landlord_credits() as credits:
+        for row in rows:
+            applied = len(credits)
+            try:
+                outcome, _ = apply_stk_callback(row.payload)
+            except Exception as exc:
+                logger.exception("STK callback processing failed", extra={"checkout_request_id": row.checkout_request_id})
+                outcome, row.last_error = None, (str(exc) or exc.__class__.__name__)[:255]
+                del credits[applied:]
+
+            if outcome in [CALLBACK_APPLIED, CALLBACK_DUPLICATE]:
+                row.status = StkCallbackInbox.STATUS_DONE
+                row.processed_at = timezone.now()
+            elif row.attempts >= STK_CALLBACK_MAX_ATTEMPTS:
+                row.status = StkCallbackInbox.STATUS_UNMATCHED if outcome == CALLBACK_UNMATCHED else StkCallbackInbox.STATUS_ERROR
+                row.processed_at = timezone.now()
+            else:
+                row.status = StkCallbackInbox.STATUS_PENDING
+                row.next_attempt_at = now + timedelta(seconds=STK_CALLBACK_RETRY_SECONDS * row.attempts)
+        StkCallbackInbox.objects.bulk_update(rows, ["status", "processed_at", "next_attempt_at", "last_error"])
+    return len(rows)
+
+
+class RateLimiter:
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _query_stk_status(payment, limiter):
+    limiter.wait()
+    try:
+        return daraja.stk_query(payment.checkout_request_id)
+    except Exception as exc:
+        logger.warning("STK query raised", extra={"payment_id": payment.id, "error": str(exc)})
+        return None
+
+
+def _callback_from_query(payment, result):
+    # STK Query returns no receipt number, so the payment is saved with receipt_pending until a late callback fills it in.
+    callback = {
+        "MerchantRequestID": result.get("MerchantRequestID") or payment.merchant_request_id,
+        "CheckoutRequestID": payment.checkout_request_id,
+        "ResultCode": int(result["ResultCode"]),
+        "ResultDesc": result.get("ResultDesc"),
+    }
+    if callback["ResultCode"] == 0:
+        transaction_date = timezone.localtime().strftime("%Y%m%d%H%M%S")
+        callback["CallbackMetadata"] = {"Item": [{"Name": "TransactionDate", "Value": transaction_date}]}
+    return {"Body": {"stkCallback": callback}, "source": "stk_query"}
+
+
+def stale_pending_payments(min_age=RECONCILE_MIN_AGE, now=None):
+    now = now or timezone.now()
+    return PaymentTransaction.objects.filter(
+        status=PaymentTransaction.STATUS_PENDING,
+        created_at__lte=now - min_age,
+        checkout_request_id__isnull=False,
+    ).order_by("created_at", "id")
+
+
+def fail_unresolved_stk_pushes(window=STK_PUSH_UNKNOWN_WINDOW, now=None):
+    # Pushes with an unknown outcome have no CheckoutRequestID to query; without a matching callback they are failed.
+    now = now or timezone.now()
+    rows = StkPushOutbox.objects.filter(
+        status=StkPushOutbox.STATUS_UNKNOWN,
+        updated_at__lte=now - window,
+        payment__status=PaymentTransaction.STATUS_PENDING,
+        payment__checkout_request_id__isnull=True,
+    ).values_list("id", flat=True)
+    failed = 0
+    for row_id in list(rows):
+        with transaction.atomic():
+            row = StkPushOutbox.objects.select_for_update().get(pk=row_id)
+            payment = PaymentTransaction.objects.select_for_update().get(pk=row.payment_id)
+            if row.status != StkPushOutbox.STATUS_UNKNOWN or payment.status != PaymentTransaction.STATUS_PENDING or payment.checkout_request_id:
+                continue
+            _fail_payment(payment, "M-Pesa never confirmed the STK push.")
+            row.status = StkPushOutbox.STATUS_FAILED
+            row.save(update_fields=["status", "updated_at"])
+        logger.warning("Unconfirmed STK push failed", extra={"payment_id": payment.id})
+        failed += 1
+    return failed
+
+
+def reconcile_pending_payments(min_age=RECONCILE_MIN_AGE, limit=500, concurrency=4, rate_per_second=5):
+    unresolved = fail_unresolved_stk_pushes()
+    payments = list(stale_pending_payments(min_age)[:limit])
+    summary = {"checked": len(payments) + unresolved, "success": 0, "failed": unresolved, "still_pending": 0}
+    if not payments:
+        return summary
+
+    limiter = RateLimiter(rate_per_second)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(payments)))) as pool:
+        results = list(pool.map(lambda payment: _query_stk_status(payment, limiter), payments))
+
+    for payment, result in zip(payments, results):
+        if not result or result.get("ResultCode") in [None, ""]:
+            summary["still_pending"] += 1
+            continue
+        outcome, updated = apply_stk_callback(_callback_from_query(payment, result))
+        if outcome == CALLBACK_APPLIED:
+            summary[updated.status] += 1
+    return summary
+
+
+@metrics.collector
+def _pipeline_backlog():
+    now = timezone.now()
+    pending = PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_PENDING).aggregate(count=Count("id"), oldest=Min("created_at"))
+    outbox = StkPushOutbox.objects.filter(status__in=[StkPushOutbox.STATUS_PENDING, StkPushOutbox.STATUS_SENDING]).count()
+    inbox = StkCallbackInbox.objects.filter(status__in=[StkCallbackInbox.STATUS_PENDING, StkCallbackInbox.STATUS_PROCESSING]).count()
+    holds = (
+        LedgerTransaction.objects.filter(status=LedgerTransaction.STATUS_LOCKED)
+        .order_by()
+        .values("kind")
+        .annotate(count=Count("id"), amount=Sum("amount"))
+    )
+    return [
+        ("krib_pending_payments", "gauge", "Payments still waiting for a Daraja result.", [({}, pending["count"])]),
+        (
+            "krib_pending_payment_oldest_age_seconds",
+            "gauge",
+            "Age of the oldest pending payment.",
+            [({}, round((now - pending["oldest"]).total_seconds(), 1) if pending["oldest"] else 0)],
+        ),
+        ("krib_stk_outbox_backlog", "gauge", "STK pushes queued or being sent.", [({}, outbox)]),
+        ("krib_stk_callback_inbox_backlog", "gauge", "Deferred STK callbacks not yet applied.", [({}, inbox)]),
+        ("krib_locked_holds", "gauge", "Ledger credits still on hold.", [({"kind": row["kind"]}, row["count"]) for row in holds]),
+        ("krib_locked_hold_amount", "gauge", "Amount of ledger credits still on hold.", [({"kind": row["kind"]}, row["amount"]) for row in holds]),
+    ]
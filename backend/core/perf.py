@@ -0,0 +1,62 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_stats = ContextVar("krib_request_stats", default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.sql_statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.external_ms = Counter()
+        self.external_calls = Counter()
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.sql_count += 1
+            self.sql_statements[sql] += 1
+
+    def duplicated_sql(self, threshold, limit=3):
+        return [(sql, count) for sql, count in self.sql_statements.most_common(limit) if count >= threshold]
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+@contextmanager
+def collect_stats(stats=None):
+    stats = stats or RequestStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_cache(hits=0, misses=0):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def track_external(name):
+    stats = _current_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.external_ms[name] += (time.perf_counter() - started) * 1000
+            stats.external_calls[name] += 1
@@ -0,0 +1,274 @@
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import (
+    LandlordBalance,
+    Lease,
+    LedgerTransaction,
+    Notification,
+    PaymentTransaction,
+    Profile,
+    Property,
+    Tenant,
+    Unit,
+    _overdue_notice_defaults,
+    rebuild_rent_period_balances,
+    rebuild_revenue_rollups,
+    sync_property_access,
+)
+from .payments import LANDLORD_HOLD_DAYS, WALLET_CREDIT_HOLD_DAYS
+
+SEED_PASSWORD = "krib-seed"
+RENT_CHOICES = [Decimal(amount) for amount in ["6500.00", "8000.00", "12000.00", "15000.00", "22000.00", "35000.00"]]
+
+
+@contextmanager
+def _historical_timestamps(*models):
+    # auto_now_add would stamp every bulk-created row with the current time.
+    fields = [field for model in models for field in model._meta.concrete_fields if getattr(field, "auto_now_add", False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _chunked_create(model, rows, batch_size):
+    created = []
+    for start in range(0, len(rows), batch_size):
+        created.extend(model.objects.bulk_create(rows[start : start + batch_size]))
+    return created
+
+
+def _history_months(months, today):
+    first = date(today.year, today.month, 1)
+    periods = []
+    for offset in range(months - 1, -1, -1):
+        year, month = divmod(first.year * 12 + first.month - 1 - offset, 12)
+        periods.append(date(year, month + 1, 1))
+    return periods
+
+
+class _Allocator:
+    def __init__(self, landlord_by_lease, now):
+        self.landlord_by_lease = landlord_by_lease
+        self.now = now
+        self.landlord_balances = {}
+        self.wallets = {}
+
+    def _credit(self, balances, user_id, amount, available_at):
+        available, locked = balances.get(user_id, (Decimal("0.00"), Decimal("0.00")))
+        if available_at <= self.now:
+            available += amount
+        else:
+            locked += amount
+        balances[user_id] = (available, locked)
+        return LedgerTransaction.STATUS_AVAILABLE if available_at <= self.now else LedgerTransaction.STATUS_LOCKED
+
+    def ledger_rows(self, payment, rent_due):
+        rows = []
+        rent_applied = min(payment.amount, rent_due)
+        overpayment = payment.amount - rent_applied
+        reference = f"payment:{payment.id};lease:{payment.lease_id}"
+        landlord_id = self.landlord_by_lease[payment.lease_id]
+        if rent_applied > 0:
+            available_at = payment.created_at + timedelta(days=LANDLORD_HOLD_DAYS)
+            rows.append(
+                LedgerTransaction(
+                    user_id=landlord_id,
+                    kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+                    amount=rent_applied,
+                    status=self._credit(self.landlord_balances, landlord_id, rent_applied, available_at),
+                    available_at=available_at,
+                    reference_text=reference,
+                    created_at=payment.created_at,
+                )
+            )
+        if overpayment > 0:
+            available_at = payment.created_at + timedelta(days=WALLET_CREDIT_HOLD_DAYS)
+            rows.append(
+                LedgerTransaction(
+                    user_id=payment.tenant_id,
+                    kind=LedgerTransaction.KIND_WALLET_CREDIT,
+                    amount=overpayment,
+                    status=self._credit(self.wallets, payment.tenant_id, overpayment, available_at),
+                    available_at=available_at,
+                    reference_text=reference,
+                    created_at=payment.created_at,
+                )
+            )
+        return rows
+
+
+def seed_portfolio(
+    landlords=10,
+    properties_per_landlord=2,
+    units_per_property=20,
+    occupancy=0.9,
+    months=12,
+    success_rate=0.9,
+    overpayment_rate=0.05,
+    notifications=True,
+    batch_size=5000,
+    prefix="seed",
+    password=SEED_PASSWORD,
+    seed=None,
+    progress=None,
+):
+    if User.objects.filter(username__startswith=f"{prefix}_").exists():
+        raise ValueError(f"Users with the prefix '{prefix}_' already exist; pick another prefix.")
+
+    rng = random.Random(seed)
+    progress = progress or (lambda message: None)
+    now = timezone.now()
+    today = timezone.localdate()
+    periods = _history_months(months, today)
+    password_hash = make_password(password)
+    counts = {}
+
+    landlord_users = _chunked_create(
+        User,
+        [User(username=f"{prefix}_landlord_{index}", password=password_hash) for index in range(landlords)],
+        batch_size,
+    )
+    _chunked_create(Profile, [Profile(user=user, role=Profile.ROLE_LANDLORD) for user in landlord_users], batch_size)
+    landlord_balances = _chunked_create(LandlordBalance, [LandlordBalance(landlord=user) for user in landlord_users], batch_size)
+
+    properties = _chunked_create(
+        Property,
+        [
+            Property(landlord=landlord, name=f"{prefix.title()} Court {landlord_index}-{index}", location=rng.choice(["Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret"]))
+            for landlord_index, landlord in enumerate(landlord_users)
+            for index in range(properties_per_landlord)
+        ],
+        batch_size,
+    )
+    units = _chunked_create(
+        Unit,
+        [
+            Unit(
+                property=prop,
+                unit_number=f"U{index + 1}",
+                unit_type=rng.choice([choice for choice, _ in Unit.UNIT_TYPE_CHOICES]),
+                rent_amount=rng.choice(RENT_CHOICES),
+                status=Unit.STATUS_OCCUPIED if rng.random() < occupancy else Unit.STATUS_VACANT,
+            )
+            for prop in properties
+            for index in range(units_per_property)
+        ],
+        batch_size,
+    )
+    occupied = [unit for unit in units if unit.status == Unit.STATUS_OCCUPIED]
+    progress(f"Created {len(landlord_users)} landlords, {len(properties)} properties and {len(units)} units.")
+
+    tenant_users = _chunked_create(
+        User,
+        [User(username=f"{prefix}_tenant_{index}", password=password_hash) for index in range(len(occupied))],
+        batch_size,
+    )
+    tenant_profiles = _chunked_create(
+        Profile,
+        [Profile(user=user, role=Profile.ROLE_TENANT, phone_number=f"2547{index:08d}") for index, user in enumerate(tenant_users)],
+        batch_size,
+    )
+    _chunked_create(Tenant, [Tenant(user=user, phone=f"2547{index:08d}") for index, user in enumerate(tenant_users)], batch_size)
+    leases = _chunked_create(
+        Lease,
+        [
+            Lease(unit=unit, tenant=tenant, rent_amount=unit.rent_amount, start_date=periods[0], due_day=rng.randint(1, 28))
+            for unit, tenant in zip(occupied, tenant_users)
+        ],
+        batch_size,
+    )
+    progress(f"Created {len(tenant_users)} tenants and {len(leases)} leases.")
+
+    landlord_by_property = {prop.id: prop.landlord_id for prop in properties}
+    allocator = _Allocator({lease.id: landlord_by_property[lease.unit.property_id] for lease in leases}, now)
+    counts.update(payments=0, ledger_rows=0, notifications=0)
+    payments, notices = [], []
+
+    def flush():
+        with _historical_timestamps(PaymentTransaction, LedgerTransaction, Notification):
+            created = PaymentTransaction.objects.bulk_create(payments)
+            ledger = [
+                row
+                for payment in created
+                if payment.status == PaymentTransaction.STATUS_SUCCESS
+                for row in allocator.ledger_rows(payment, payment.lease.rent_amount)
+            ]
+            LedgerTransaction.objects.bulk_create(ledger)
+            Notification.objects.bulk_create(notices, ignore_conflicts=True)
+        counts["payments"] += len(created)
+        counts["ledger_rows"] += len(ledger)
+        counts["notifications"] += len(notices)
+        payments.clear()
+        notices.clear()
+        progress(f"Wrote {counts['payments']} payments.")
+
+    tz = timezone.get_current_timezone()
+    for month in periods:
+        period = month.strftime("%Y-%m")
+        for lease in leases:
+            due_date = month.replace(day=lease.due_day)
+            paid_on = due_date + timedelta(days=rng.randint(-5, 3))
+            if paid_on > today:
+                continue
+            created_at = timezone.make_aware(datetime.combine(paid_on, time(rng.randint(6, 21), rng.randint(0, 59))), tz)
+            succeeded = rng.random() < success_rate
+            amount = lease.rent_amount
+            if succeeded and rng.random() < overpayment_rate:
+                amount = (amount * Decimal(str(round(1 + rng.uniform(0.05, 0.5), 2)))).quantize(Decimal("1.00"))
+            payments.append(
+                PaymentTransaction(
+                    lease=lease,
+                    tenant_id=lease.tenant_id,
+                    period=period,
+                    phone_number=f"2547{lease.tenant_id % 10**8:08d}",
+                    amount=amount,
+                    status=PaymentTransaction.STATUS_SUCCESS if succeeded else PaymentTransaction.STATUS_FAILED,
+                    mpesa_receipt=f"S{rng.getrandbits(40):010X}" if succeeded else None,
+                    result_code=0 if succeeded else 1032,
+                    result_desc="The service request is processed successfully." if succeeded else "Request cancelled by user",
+                    transaction_date=created_at,
+                    allocation_done=succeeded,
+                    created_at=created_at,
+                )
+            )
+            if not succeeded and notifications and due_date < today:
+                notices.append(
+                    Notification(
+                        user_id=lease.tenant_id,
+                        type=Notification.TYPE_OVERDUE,
+                        lease_id=lease.id,
+                        period=period,
+                        created_at=timezone.make_aware(datetime.combine(due_date + timedelta(days=1), time(9)), tz),
+                        **_overdue_notice_defaults(due_date),
+                    )
+                )
+            if len(payments) >= batch_size:
+                flush()
+    if payments or notices:
+        flush()
+
+    for profile in tenant_profiles:
+        profile.wallet_available, profile.wallet_locked = allocator.wallets.get(profile.user_id, (Decimal("0.00"), Decimal("0.00")))
+    Profile.objects.bulk_update(tenant_profiles, ["wallet_available", "wallet_locked"], batch_size=batch_size)
+    for balance in landlord_balances:
+        balance.available_balance, balance.locked_balance = allocator.landlord_balances.get(balance.landlord_id, (Decimal("0.00"), Decimal("0.00")))
+    LandlordBalance.objects.bulk_update(landlord_balances, ["available_balance", "locked_balance"], batch_size=batch_size)
+
+    sync_property_access([prop.id for prop in properties])
+    counts["rent_balances"] = rebuild_rent_period_balances(
+        Lease.objects.filter(unit__property__landlord__username__startswith=f"{prefix}_"), batch_size=batch_size
+    )
+    counts["revenue_rollups"] = rebuild_revenue_rollups([user.id for user in landlord_users], batch_size=batch_size)
+    counts.update(landlords=len(landlord_users), properties=len(properties), units=len(units), leases=len(leases))
+    return counts
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
 from .models import (
     LandlordPayout,
@@ -18,9 +22,120 @@ from .models import (
     Unit,
     ManagerInvite,
     compute_lease_rent_status,
+    compute_lease_rent_statuses,
+    rent_status_from_annotation,
 )
 
 
+def _rent_status_period(context):
+    return (context or {}).get("period") or timezone.localdate().strftime("%Y-%m")
+
+
+def prime_rent_status_cache(context, leases):
+    cache = context.get("rent_status_cache")
+    if cache is None or context.get("include_rent_status") is False:
+        return
+    period = _rent_status_period(context)
+    missing = {lease.pk for lease in leases if lease is not None and (lease.pk, period) not in cache}
+    if missing:
+        for lease, row in compute_lease_rent_statuses(Lease.objects.filter(pk__in=missing), period=period):
+            cache[(lease.pk, period)] = row
+
+
+def _split_field_paths(values):
+    names, nested = [], {}
+    for value in values or []:
+        for path in value.split(","):
+            head, _, rest = path.strip().partition(".")
+            if not head:
+                continue
+            if head not in names:
+                names.append(head)
+            if rest:
+                nested.setdefault(head, []).append(rest)
+    return names, nested
+
+
+def expanded_relations(serializer_class, expand, prefix=""):
+    names, nested = _split_field_paths(expand)
+    relations = []
+    for name in names:
+        if name not in getattr(serializer_class, "expandable_fields", {}):
+            continue
+        nested_class, _ = serializer_class.expandable_fields[name]
+        relations.append(f"{prefix}{name}")
+        relations.extend(expanded_relations(nested_class, nested.get(name), prefix=f"{prefix}{name}__"))
+    return relations
+
+
+class ExpandableFieldsMixin:
+    expandable_fields = {}
+    deferred_fields = []
+
+    def __init__(self, *args, **kwargs):
+        self._fields_option = kwargs.pop("fields", None)
+        self._expand_option = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self._fields_option, self._expand_option
+        request = self.context.get("request")
+        if request is not None and self._is_root_serializer():
+            if requested is None and "fields" in request.query_params:
+                requested = request.query_params.getlist("fields")
+            if expand is None:
+                expand = request.query_params.getlist("expand")
+
+        expand_names, nested_expand = _split_field_paths(expand)
+        field_names, nested_fields = _split_field_paths(requested)
+        for name in expand_names:
+            if name in self.expandable_fields:
+                serializer_class, options = self.expandable_fields[name]
+                fields[name] = serializer_class(
+                    read_only=True,
+                    fields=nested_fields.get(name),
+                    expand=nested_expand.get(name, []),
+                    **options,
+                )
+
+        if requested is not None:
+            return {name: field for name, field in fields.items() if name in field_names or field.write_only}
+        for name in self.deferred_fields:
+            fields.pop(name, None)
+        return fields
+
+
+def _add_role_claims(token, user):
+    profile, _ = Profile.objects.get_or_create(user=user)
+    token["role"] = profile.role
+    token["scope_id"] = user.id if profile.role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER] else None
+    token["username"] = user.username
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    return token
+
+
+class KribTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return _add_role_claims(super().get_token(user), user)
+
+
+class KribTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"])
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: access[jwt_settings.USER_ID_CLAIM]}).first()
+        if user is not None:
+            data["access"] = str(_add_role_claims(access, user))
+        return data
+
+
 class LandlordSignupSerializer(serializers.Serializer):
     business_name = serializers.CharField(max_length=200)
     username = serializers.CharField(max_length=150)
@@ -45,6 +160,24 @@ class LandlordRevenueSerializer(serializers.Serializer):
     lifetime = serializers.DictField()
 
 
+class RevenuePeriodSerializer(serializers.Serializer):
+    period = serializers.CharField()
+    gross_collected = serializers.DecimalField(max_digits=14, decimal_places=2)
+    wallet_applied = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    expected_rent = serializers.DecimalField(max_digits=14, decimal_places=2)
+    payment_count = serializers.IntegerField()
+
+
+class LandlordRevenueRangeSerializer(serializers.Serializer):
+    gross_collected = serializers.DecimalField(max_digits=14, decimal_places=2)
+    wallet_applied = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    expected_rent = serializers.DecimalField(max_digits=14, decimal_places=2)
+    payment_count = serializers.IntegerField()
+    periods = RevenuePeriodSerializer(many=True)
+
+
 class LandlordReceiptSerializer(serializers.ModelSerializer):
     tenant = serializers.SerializerMethodField()
     unit = serializers.SerializerMethodField()
@@ -59,6 +192,7 @@ class LandlordReceiptSerializer(serializers.ModelSerializer):
             "amount",
             "period",
             "status",
+            "receipt_pending",
             "created_at",
         ]
 
@@ -81,7 +215,7 @@ class LandlordFollowupSerializer(serializers.Serializer):
     period = serializers.CharField()
 
 
-class UserLiteSerializer(serializers.ModelSerializer):
+class UserLiteSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "is_staff"]
@@ -134,9 +268,9 @@ class ManagerInviteAcceptSerializer(serializers.Serializer):
         return value
 
 
-class PropertySerializer(serializers.ModelSerializer):
-    landlord = UserLiteSerializer(read_only=True)
-    manager = UserLiteSerializer(read_only=True)
+class PropertySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    landlord = serializers.PrimaryKeyRelatedField(read_only=True)
+    manager = serializers.PrimaryKeyRelatedField(read_only=True)
     manager_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), source="manager", write_only=True, required=False, allow_null=True
     )
@@ -145,28 +279,37 @@ class PropertySerializer(serializers.ModelSerializer):
         model = Property
         fields = ["id", "landlord", "manager", "manager_id", "name", "location", "description"]
 
+    expandable_fields = {
+        "landlord": (UserLiteSerializer, {}),
+        "manager": (UserLiteSerializer, {}),
+    }
 
-class UnitSerializer(serializers.ModelSerializer):
-    property = PropertySerializer(read_only=True)
+
+class UnitSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    property = serializers.PrimaryKeyRelatedField(read_only=True)
     property_id = serializers.PrimaryKeyRelatedField(queryset=Property.objects.all(), source="property", write_only=True)
 
     class Meta:
         model = Unit
         fields = ["id", "property", "property_id", "unit_number", "unit_type", "rent_amount", "deposit", "status"]
 
+    expandable_fields = {"property": (PropertySerializer, {})}
 
-class TenantSerializer(serializers.ModelSerializer):
-    user = UserLiteSerializer(read_only=True)
+
+class TenantSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Tenant
         fields = ["id", "user", "phone"]
 
+    expandable_fields = {"user": (UserLiteSerializer, {})}
+
 
-class LeaseSerializer(serializers.ModelSerializer):
-    unit = UnitSerializer(read_only=True)
+class LeaseSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    unit = serializers.PrimaryKeyRelatedField(read_only=True)
     unit_id = serializers.PrimaryKeyRelatedField(queryset=Unit.objects.all(), source="unit", write_only=True)
-    tenant = UserLiteSerializer(read_only=True)
+    tenant = serializers.PrimaryKeyRelatedField(read_only=True)
     tenant_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), source="tenant", write_only=True)
     rent_status = serializers.SerializerMethodField()
 
@@ -185,13 +328,37 @@ class LeaseSerializer(serializers.ModelSerializer):
             "rent_status",
         ]
 
-    def get_rent_status(self, obj):
-        period = self.context.get("period") if self.context else None
-        return compute_lease_rent_status(obj, period=period)
+    expandable_fields = {
+        "unit": (UnitSerializer, {}),
+        "tenant": (UserLiteSerializer, {}),
+    }
+
+    def __init__(self, *args, include_rent_status=True, **kwargs):
+        self.include_rent_status = include_rent_status
+        super().__init__(*args, **kwargs)
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.include_rent_status or self.context.get("include_rent_status") is False:
+            fields.pop("rent_status", None)
+        return fields
 
-class TenantInviteSerializer(serializers.ModelSerializer):
-    invited_by = UserLiteSerializer(read_only=True)
+    def get_rent_status(self, obj):
+        period = _rent_status_period(self.context)
+        cache = self.context.get("rent_status_cache")
+        if cache is not None and (obj.pk, period) in cache:
+            return cache[(obj.pk, period)]
+        if getattr(obj, "rent_paid_period", None) == period:
+            row = rent_status_from_annotation(obj)
+        else:
+            row = compute_lease_rent_status(obj, period=period)
+        if cache is not None:
+            cache[(obj.pk, period)] = row
+        return row
+
+
+class TenantInviteSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    invited_by = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = TenantInvite
@@ -211,16 +378,18 @@ class TenantInviteSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["token", "status"]
 
+    expandable_fields = {"invited_by": (UserLiteSerializer, {})}
+
 
 class InviteAcceptSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True, min_length=6)
     username = serializers.CharField(required=False)
 
 
-class PaymentTransactionSerializer(serializers.ModelSerializer):
-    lease = LeaseSerializer(read_only=True)
+class PaymentTransactionSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    lease = serializers.PrimaryKeyRelatedField(read_only=True)
     lease_id = serializers.PrimaryKeyRelatedField(queryset=Lease.objects.all(), source="lease", write_only=True, required=False)
-    tenant = UserLiteSerializer(read_only=True)
+    tenant = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = PaymentTransaction
@@ -236,6 +405,7 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
             "checkout_request_id",
             "status",
             "mpesa_receipt",
+            "receipt_pending",
             "result_code",
             "result_desc",
             "transaction_date",
@@ -247,6 +417,7 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
             "checkout_request_id",
             "status",
             "mpesa_receipt",
+            "receipt_pending",
             "result_code",
             "result_desc",
             "transaction_date",
@@ -254,6 +425,12 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
+    expandable_fields = {
+        "lease": (LeaseSerializer, {}),
+        "tenant": (UserLiteSerializer, {}),
+    }
+    deferred_fields = ["raw_callback"]
+
 
 class STKInitiateSerializer(serializers.Serializer):
     lease_id = serializers.PrimaryKeyRelatedField(queryset=Lease.objects.filter(status=Lease.STATUS_ACTIVE), source="lease")
@@ -261,17 +438,22 @@ class STKInitiateSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=12, decimal_places=2)
 
 
-class MaintenanceRequestSerializer(serializers.ModelSerializer):
-    tenant = UserLiteSerializer(read_only=True)
-    lease = LeaseSerializer(read_only=True)
+class MaintenanceRequestSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    tenant = serializers.PrimaryKeyRelatedField(read_only=True)
+    lease = serializers.PrimaryKeyRelatedField(read_only=True)
     lease_id = serializers.PrimaryKeyRelatedField(queryset=Lease.objects.filter(status=Lease.STATUS_ACTIVE), source="lease", write_only=True)
 
     class Meta:
         model = MaintenanceRequest
         fields = ["id", "tenant", "lease", "lease_id", "issue", "status", "created_at", "updated_at"]
 
+    expandable_fields = {
+        "tenant": (UserLiteSerializer, {}),
+        "lease": (LeaseSerializer, {}),
+    }
+
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = "__all__"
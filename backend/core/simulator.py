@@ -0,0 +1,240 @@
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+from urllib.error import URLError
+
+FAILURE_RESULT = (1032, "Request cancelled by user")
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    simulator = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/oauth/v1/generate"):
+            self._reply(200, {"access_token": f"sim-{uuid.uuid4().hex}", "expires_in": "3599"})
+        elif self.path.startswith("/simulator/stats"):
+            self._reply(200, self.simulator.summary())
+        else:
+            self._reply(404, {"errorMessage": "Unknown simulator path"})
+
+    def do_POST(self):
+        if self.path.startswith("/mpesa/stkpush/v1/processrequest"):
+            self._reply(200, self.simulator.accept_push(self._json_body()))
+        elif self.path.startswith("/mpesa/stkpushquery/v1/query"):
+            status, payload = self.simulator.query(self._json_body().get("CheckoutRequestID"))
+            self._reply(status, payload)
+        else:
+            self._reply(404, {"errorMessage": "Unknown simulator path"})
+
+
+class DarajaSimulator:
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8099,
+        callback_url=None,
+        push_latency_ms=0,
+        callback_latency_ms=500,
+        jitter_ms=0,
+        failure_rate=0.0,
+        duplicate_rate=0.0,
+        burst_size=1,
+        burst_wait_ms=1000,
+        callback_concurrency=8,
+        seed=None,
+    ):
+        self.callback_url = callback_url
+        self.push_latency_ms = push_latency_ms
+        self.callback_latency_ms = callback_latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.burst_size = max(1, burst_size)
+        self.burst_wait_ms = burst_wait_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.results = {}
+        self.ready = []
+        self.stats = {"pushes": 0, "callbacks_sent": 0, "duplicates_sent": 0, "failures": 0, "callback_errors": 0}
+        self.ack_ms = []
+        self.end_to_end_ms = []
+        self.pool = ThreadPoolExecutor(max_workers=max(1, callback_concurrency))
+        self.stopped = threading.Event()
+        handler = type("DarajaSimulatorHandler", (_SimulatorHandler,), {"simulator": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        self.server.serve_forever()
+
+    def stop(self):
+        self.stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self._flush()
+        self.pool.shutdown(wait=True)
+
+    def accept_push(self, payload):
+        received_at = time.monotonic()
+        if self.push_latency_ms:
+            time.sleep(self.push_latency_ms / 1000)
+        checkout_request_id = f"ws_CO_{uuid.uuid4().hex[:20]}"
+        merchant_request_id = f"sim-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.stats["pushes"] += 1
+            failed = self.random.random() < self.failure_rate
+            duplicate = self.random.random() < self.duplicate_rate
+            delay = self.callback_latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+
+        callback = self._callback_payload(payload, merchant_request_id, checkout_request_id, failed)
+        callback_url = self.callback_url or payload.get("CallBackURL")
+        timer = threading.Timer(
+            max(delay, 0) / 1000,
+            self._mark_ready,
+            args=(callback_url, callback, duplicate, received_at),
+        )
+        timer.daemon = True
+        timer.start()
+        return {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResponseCode": "0",
+            "ResponseDescription": "Success. Request accepted for processing",
+            "CustomerMessage": "Success. Request accepted for processing",
+        }
+
+    def query(self, checkout_request_id):
+        with self.lock:
+            result = self.results.get(checkout_request_id)
+        if result is None:
+            return 500, {"errorCode": "500.001.1001", "errorMessage": "The transaction is being processed"}
+        result_code, result_desc = result
+        return 200, {
+            "ResponseCode": "0",
+            "ResponseDescription": "The service request has been accepted successsfully",
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": str(result_code),
+            "ResultDesc": result_desc,
+        }
+
+    def _callback_payload(self, payload, merchant_request_id, checkout_request_id, failed):
+        callback = {"MerchantRequestID": merchant_request_id, "CheckoutRequestID": checkout_request_id}
+        if failed:
+            callback["ResultCode"], callback["ResultDesc"] = FAILURE_RESULT
+        else:
+            callback["ResultCode"] = 0
+            callback["ResultDesc"] = "The service request is processed successfully."
+            callback["CallbackMetadata"] = {
+                "Item": [
+                    {"Name": "Amount", "Value": payload.get("Amount")},
+                    {"Name": "MpesaReceiptNumber", "Value": f"SIM{uuid.uuid4().hex[:7].upper()}"},
+                    {"Name": "TransactionDate", "Value": int(datetime.now().strftime("%Y%m%d%H%M%S"))},
+                    {"Name": "PhoneNumber", "Value": payload.get("PhoneNumber")},
+                ]
+            }
+        return {"Body": {"stkCallback": callback}}
+
+    def _mark_ready(self, callback_url, callback, duplicate, received_at):
+        with self.lock:
+            self.ready.append((callback_url, callback, duplicate, received_at, time.monotonic()))
+            full = len(self.ready) >= self.burst_size
+        if full:
+            self._flush()
+
+    def _flush_loop(self):
+        while not self.stopped.wait(0.05):
+            with self.lock:
+                due = self.ready and (time.monotonic() - self.ready[0][4]) * 1000 >= self.burst_wait_ms
+            if due:
+                self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.ready = self.ready, []
+        for item in batch:
+            self.pool.submit(self._deliver, *item[:4])
+
+    def _post_callback(self, callback_url, callback):
+        started = time.monotonic()
+        req = urllib_request.Request(
+            callback_url,
+            data=json.dumps(callback).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib_request.urlopen(req, timeout=30) as resp:
+                resp.read()
+        except (URLError, OSError):
+            with self.lock:
+                self.stats["callback_errors"] += 1
+            return False
+        with self.lock:
+            self.ack_ms.append((time.monotonic() - started) * 1000)
+        return True
+
+    def _deliver(self, callback_url, callback, duplicate, received_at):
+        stk_callback = callback["Body"]["stkCallback"]
+        delivered = self._post_callback(callback_url, callback)
+        with self.lock:
+            self.stats["callbacks_sent"] += 1
+            self.results[stk_callback["CheckoutRequestID"]] = (stk_callback["ResultCode"], stk_callback["ResultDesc"])
+            if stk_callback["ResultCode"] != 0:
+                self.stats["failures"] += 1
+            if delivered:
+                self.end_to_end_ms.append((time.monotonic() - received_at) * 1000)
+        if duplicate:
+            self._post_callback(callback_url, callback)
+            with self.lock:
+                self.stats["duplicates_sent"] += 1
+
+    def summary(self):
+        with self.lock:
+            summary = dict(self.stats)
+            for name, samples in [("callback_ack_ms", self.ack_ms), ("end_to_end_ms", self.end_to_end_ms)]:
+                summary[name] = _percentiles(samples)
+        return summary
+
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max": round(ordered[-1], 1),
+    }
@@ -0,0 +1,68 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.models import Lease, PaymentTransaction, Profile, Property, Unit
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_fields", password="x")
+        self.landlord.profile.role = Profile.ROLE_LANDLORD
+        self.landlord.profile.save(update_fields=["role"])
+        prop = Property.objects.create(landlord=self.landlord, name="Palm Court", location="NBO")
+        for index in range(3):
+            tenant = User.objects.create_user(username=f"tenant_fields_{index}", password="x")
+            unit = Unit.objects.create(property=prop, unit_number=f"U{index}", rent_amount=Decimal("10000.00"))
+            lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+            PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=tenant,
+                period="2024-03",
+                phone_number="254700000001",
+                amount=Decimal("100.00"),
+                raw_callback={"Body": {"stkCallback": {"ResultCode": 1}}},
+                status=PaymentTransaction.STATUS_FAILED,
+            )
+        self.client.force_authenticate(self.landlord)
+
+    def test_payments_default_to_flat_ids_without_raw_callback(self):
+        response = self.client.get(reverse("payments-list"))
+        self.assertEqual(response.status_code, 200)
+        row = response.data["results"][0]
+        self.assertIsInstance(row["lease"], int)
+        self.assertIsInstance(row["tenant"], int)
+        self.assertNotIn("raw_callback", row)
+
+    def test_fields_param_limits_output(self):
+        response = self.client.get(reverse("payments-list"), {"fields": "id,amount,raw_callback"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "amount", "raw_callback"})
+
+    def test_nested_expand_and_fields(self):
+        response = self.client.get(
+            reverse("payments-list"),
+            {"expand": "lease.unit.property", "fields": "id,lease.unit,lease.id"},
+        )
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "lease"})
+        self.assertEqual(set(row["lease"]), {"id", "unit"})
+        self.assertEqual(row["lease"]["unit"]["property"]["name"], "Palm Court")
+        self.assertIsInstance(row["lease"]["unit"]["property"]["landlord"], int)
+
+    def test_expand_uses_select_related(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("payments-list"), {"expand": "tenant,lease.unit.property,lease.tenant", "rent_status": "0"})
+        self.assertEqual(len(response.data["results"]), 3)
+        payment_queries = [q for q in ctx.captured_queries if "core_paymenttransaction" in q["sql"]]
+        self.assertEqual(len(payment_queries), 1)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_unknown_expand_is_ignored(self):
+        response = self.client.get(reverse("units-list"), {"expand": "property.nope,bogus"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["property"]["name"], "Palm Court")
@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Lease, Profile, Property, Unit
+
+
+@override_settings(SHARED_CACHE=True)
+class RoleClaimTests(APITestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_jwt", password="StrongPass123!")
+        self.landlord.profile.role = Profile.ROLE_LANDLORD
+        self.landlord.profile.save(update_fields=["role"])
+        tenant = User.objects.create_user(username="tenant_jwt", password="x")
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        cache.clear()
+
+    def _login(self):
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "landlord_jwt", "password": "StrongPass123!"},
+            format="json",
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q["sql"] for q in ctx.captured_queries]
+
+    def test_access_token_carries_role_and_scope(self):
+        token = AccessToken(self._login()["access"])
+        self.assertEqual(token["role"], Profile.ROLE_LANDLORD)
+        self.assertEqual(token["scope_id"], self.landlord.id)
+        self.assertFalse(token["is_staff"])
+
+    def test_hot_reads_skip_user_and_profile_queries(self):
+        self._login()
+        for url in [reverse("properties-list"), reverse("leases-list")]:
+            queries = self._queries(url)
+            self.assertFalse([sql for sql in queries if 'FROM "auth_user"' in sql])
+            self.assertFalse([sql for sql in queries if "core_profile" in sql])
+
+    def test_role_change_falls_back_to_database(self):
+        self._login()
+        profile = Profile.objects.get(user=self.landlord)
+        profile.role = Profile.ROLE_TENANT
+        profile.save(update_fields=["role"])
+
+        queries = self._queries(reverse("properties-list"))
+        self.assertTrue([sql for sql in queries if "core_profile" in sql])
+
+    def test_refresh_reissues_current_role(self):
+        tokens = self._login()
+        profile = Profile.objects.get(user=self.landlord)
+        profile.role = Profile.ROLE_MANAGER
+        profile.save(update_fields=["role"])
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(AccessToken(response.data["access"])["role"], Profile.ROLE_MANAGER)
+
+    def test_deleted_user_is_rejected(self):
+        self._login()
+        self.landlord.delete()
+        response = self.client.get(reverse("properties-list"))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_without_a_shared_cache_the_user_is_loaded_from_the_database(self):
+        self._login()
+        User.objects.filter(pk=self.landlord.pk).update(is_active=False)
+        response = self.client.get(reverse("properties-list"))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    LandlordBalance,
+    Lease,
+    LedgerTransaction,
+    PaymentTransaction,
+    Profile,
+    Property,
+    RentPeriodBalance,
+    Unit,
+    adjust_landlord_balance,
+    adjust_wallet,
+    compute_lease_rent_status,
+    landlord_balance_totals,
+)
+from core.payments import allocate_success_payment, apply_wallet_to_current_rent
+
+
+class ConditionalBalanceUpdateTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_atomic", password="x")
+        self.tenant = User.objects.create_user(username="tenant_atomic", password="x")
+        Profile.objects.filter(user=self.tenant).update(wallet_available=Decimal("100.00"))
+
+    def test_debits_never_overdraw(self):
+        self.assertTrue(adjust_wallet(self.tenant.id, "wallet_available", Decimal("-60.00")))
+        self.assertFalse(adjust_wallet(self.tenant.id, "wallet_available", Decimal("-60.00")))
+        self.assertEqual(Profile.objects.get(user=self.tenant).wallet_available, Decimal("40.00"))
+        self.assertFalse(adjust_landlord_balance(self.landlord.id, "available_balance", Decimal("-1.00")))
+
+    def test_credits_create_a_missing_balance_row(self):
+        self.assertTrue(adjust_landlord_balance(self.landlord.id, "locked_balance", Decimal("25.00")))
+        self.assertEqual(LandlordBalance.objects.get(landlord=self.landlord).locked_balance, Decimal("25.00"))
+
+    def test_a_payment_is_allocated_once_from_stale_copies(self):
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("1000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("1000.00"), start_date=date(2024, 1, 1))
+        payment = PaymentTransaction.objects.create(
+            lease=lease,
+            tenant=self.tenant,
+            period="2024-03",
+            phone_number="254700000001",
+            amount=Decimal("1000.00"),
+            status=PaymentTransaction.STATUS_SUCCESS,
+        )
+        stale = PaymentTransaction.objects.get(pk=payment.pk)
+        allocate_success_payment(payment)
+        allocate_success_payment(stale)
+        self.assertEqual(LedgerTransaction.objects.filter(user=self.landlord).count(), 1)
+        self.assertEqual(landlord_balance_totals(self.landlord.id)["locked_balance"], Decimal("1000.00"))
+
+    def test_wallet_debit_rereads_the_due_amount_under_the_period_lock(self):
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("80.00"))
+        lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("80.00"), start_date=date(2024, 1, 1))
+        stale = compute_lease_rent_status(lease)
+        # Both calls see the unpaid status, as two requests racing each other would.
+        with mock.patch("core.payments.compute_lease_rent_status", return_value=stale):
+            self.assertEqual(apply_wallet_to_current_rent(lease), Decimal("80.00"))
+            self.assertEqual(apply_wallet_to_current_rent(lease), Decimal("0.00"))
+
+        period = timezone.localdate().strftime("%Y-%m")
+        self.assertEqual(RentPeriodBalance.objects.get(lease=lease, period=period).paid_sum, Decimal("80.00"))
+        self.assertEqual(Profile.objects.get(user=self.tenant).wallet_available, Decimal("20.00"))
+
+
+class BalanceStressTests(TestCase):
+    # The in-memory test database cannot be shared across processes, so the
+    # stress run gets its own SQLite file in a child process.
+    def _manage(self, env, *args):
+        return subprocess.run(
+            [sys.executable, "manage.py", *args],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+
+    def test_parallel_threads_and_processes_keep_balances_consistent(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, "DATABASE_URL": f"sqlite:///{directory}/stress.sqlite3", "SQLITE_TUNING": "1", "KRIB_BENCHMARKS": "1"}
+            migrated = self._manage(env, "migrate", "-v", "0")
+            self.assertEqual(migrated.returncode, 0, migrated.stderr)
+            result = self._manage(env, "stress_balances", "--threads", "4", "--processes", "3", "--operations", "30", "--seed", "7")
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn("Balances match the ledger", result.stdout)
+        self.assertIn("errors=0", result.stdout)
@@ -0,0 +1,69 @@
+import time
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import LiveServerTestCase
+from django.urls import reverse
+
+from core import daraja
+from core.models import Lease, PaymentTransaction, Property, StkPushOutbox, Unit
+from core.payments import dispatch_stk_outbox
+from core.simulator import DarajaSimulator
+
+
+class DarajaSimulatorTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        landlord = User.objects.create_user(username="landlord_sim", password="x")
+        self.tenant = User.objects.create_user(username="tenant_sim", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        self.lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+
+    def _run(self, count, **options):
+        # The live test server shares one SQLite connection across threads, so deliver callbacks one at a time.
+        simulator = DarajaSimulator(port=0, callback_latency_ms=300, callback_concurrency=1, seed=7, **options).start()
+        self.addCleanup(simulator.stop)
+        env = {
+            "MPESA_BASE_URL": simulator.base_url,
+            "MPESA_CONSUMER_KEY": "key",
+            "MPESA_CONSUMER_SECRET": "secret",
+            "MPESA_SHORTCODE": "174379",
+            "MPESA_PASSKEY": "passkey",
+            "MPESA_CALLBACK_URL": f"{self.live_server_url}{reverse('stk-callback')}",
+        }
+        with patch.dict("os.environ", env):
+            for index in range(count):
+                payment = PaymentTransaction.objects.create(
+                    lease=self.lease,
+                    tenant=self.tenant,
+                    period="2024-03",
+                    phone_number=f"2547000000{index:02d}",
+                    amount=Decimal("100.00"),
+                )
+                StkPushOutbox.objects.create(payment=payment)
+            dispatch_stk_outbox(concurrency=4)
+            self.assertEqual(daraja.token_metrics()["refreshes"], 1)
+
+        expected = count * (2 if options.get("duplicate_rate") else 1)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            summary = simulator.summary()
+            if summary["callbacks_sent"] + summary["duplicates_sent"] >= expected:
+                break
+            time.sleep(0.05)
+        return simulator
+
+    def test_simulated_callbacks_complete_payments(self):
+        simulator = self._run(4, burst_size=2, duplicate_rate=1.0)
+        self.assertFalse(PaymentTransaction.objects.exclude(status=PaymentTransaction.STATUS_SUCCESS).exists())
+        summary = simulator.summary()
+        self.assertEqual((summary["pushes"], summary["callbacks_sent"], summary["duplicates_sent"]), (4, 4, 4))
+        self.assertEqual(summary["end_to_end_ms"]["count"], 4)
+
+    def test_failure_rate_marks_payments_failed(self):
+        self._run(2, failure_rate=1.0)
+        self.assertEqual(PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_FAILED).count(), 2)
@@ -0,0 +1,58 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core import daraja
+from core.checks import shared_cache_check
+
+CREDENTIALS = {"MPESA_CONSUMER_KEY": "key", "MPESA_CONSUMER_SECRET": "secret"}
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "daraja-tests"}})
+@patch.dict("os.environ", CREDENTIALS)
+class DarajaTokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch("core.daraja._fetch_access_token", return_value=("tok-1", 3599))
+    def test_token_is_fetched_once_and_reused(self, fetch):
+        self.assertEqual([daraja.get_access_token() for _ in range(5)], ["tok-1"] * 5)
+        self.assertEqual(fetch.call_count, 1)
+        metrics = daraja.token_metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["refreshes"]), (4, 1, 1))
+        self.assertEqual(metrics["hit_rate"], 0.8)
+
+    @patch("core.daraja._fetch_access_token", side_effect=[("tok-1", 3599), ("tok-2", 3599)])
+    def test_token_refreshes_before_expiry(self, fetch):
+        daraja.get_access_token()
+        with patch("core.daraja.time.time", return_value=time.time() + 3599 - 60):
+            self.assertEqual(daraja.get_access_token(), "tok-2")
+        self.assertEqual(fetch.call_count, 2)
+
+    @patch("core.daraja._fetch_access_token", return_value=("tok-2", 3599))
+    def test_concurrent_refresh_reuses_old_token(self, fetch):
+        now = time.time()
+        cache.set(daraja._token_key("key"), {"token": "tok-1", "refresh_at": now - 1, "expires_at": now + 60})
+        cache.add(f"{daraja._token_key('key')}:lock", 1)
+        self.assertEqual(daraja.get_access_token(), "tok-1")
+        fetch.assert_not_called()
+        self.assertEqual(daraja.token_metrics()["stale_hits"], 1)
+
+    @patch("core.daraja._fetch_access_token", side_effect=OSError("timeout"))
+    def test_failed_refresh_releases_lock(self, fetch):
+        with self.assertRaises(OSError):
+            daraja.get_access_token()
+        self.assertIsNone(cache.get(f"{daraja._token_key('key')}:lock"))
+        self.assertEqual(daraja.token_metrics()["refresh_failures"], 1)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(SHARED_CACHE=False)
+    def test_deploy_check_warns_without_a_shared_cache(self):
+        self.assertEqual([message.id for message in shared_cache_check(None)], ["core.W001"])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_deploy_check_passes_with_a_shared_cache(self):
+        self.assertEqual(shared_cache_check(None), [])
@@ -0,0 +1,48 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.models import Lease, PaymentTransaction, Profile, Property, Unit
+
+
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username="landlord_export", password="x")
+        landlord.profile.role = Profile.ROLE_LANDLORD
+        landlord.profile.save(update_fields=["role"])
+        tenant = User.objects.create_user(username="tenant_export", password="x", email="t@example.com")
+        prop = Property.objects.create(landlord=landlord, name="Export Court", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="E1", rent_amount=Decimal("10000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        for index in range(3):
+            PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=tenant,
+                period="2024-03",
+                phone_number="254700000001",
+                amount=Decimal("100.50"),
+                mpesa_receipt=f"RCP{index}",
+                status=PaymentTransaction.STATUS_SUCCESS,
+            )
+        self.client.force_authenticate(landlord)
+
+    def test_receipts_csv_export_streams_every_row(self):
+        response = self.client.get(reverse("landlord-receipts"), {"format": "csv", "page_size": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "mpesa_receipt", "tenant_username"])
+        self.assertEqual(len(lines), 4)
+        self.assertIn("Export Court", lines[1])
+
+    def test_payments_ndjson_export(self):
+        response = self.client.get(reverse("payments-list"), {"format": "ndjson"})
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["amount"], "100.50")
+        self.assertNotIn("raw_callback", rows[0])
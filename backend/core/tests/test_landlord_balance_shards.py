@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import (
+    LandlordBalance,
+    LandlordBalanceShard,
+    Lease,
+    LedgerTransaction,
+    PaymentTransaction,
+    Property,
+    StkCallbackInbox,
+    Unit,
+    batched_landlord_credits,
+    credit_landlord_locked,
+    fold_landlord_balance_shards,
+    landlord_balance_totals,
+    release_matured_holds,
+)
+from core.payments import process_stk_callbacks
+
+
+@override_settings(LANDLORD_BALANCE_SHARDS=4)
+class LandlordBalanceShardTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_shards", password="x")
+        self.tenant = User.objects.create_user(username="tenant_shards", password="x")
+        LandlordBalance.objects.create(landlord=self.landlord, locked_balance=Decimal("100.00"))
+
+    def test_credits_spread_over_shards_and_sum_on_read(self):
+        for key in range(20):
+            credit_landlord_locked(self.landlord.id, Decimal("10.00"), key)
+
+        self.assertGreater(LandlordBalanceShard.objects.filter(landlord=self.landlord).count(), 1)
+        self.assertEqual(LandlordBalance.objects.get(landlord=self.landlord).locked_balance, Decimal("100.00"))
+        self.assertEqual(landlord_balance_totals(self.landlord.id)["locked_balance"], Decimal("300.00"))
+
+    @override_settings(LANDLORD_BALANCE_SHARDS=0)
+    def test_without_shards_credits_go_to_the_balance_row(self):
+        credit_landlord_locked(self.landlord.id, Decimal("10.00"), 1)
+        self.assertFalse(LandlordBalanceShard.objects.exists())
+        self.assertEqual(LandlordBalance.objects.get(landlord=self.landlord).locked_balance, Decimal("110.00"))
+
+    def test_fold_moves_shard_totals_into_the_balance_row(self):
+        for key in range(6):
+            credit_landlord_locked(self.landlord.id, Decimal("25.00"), key)
+        fold_landlord_balance_shards([self.landlord.id])
+
+        self.assertEqual(LandlordBalance.objects.get(landlord=self.landlord).locked_balance, Decimal("250.00"))
+        self.assertFalse(LandlordBalanceShard.objects.exclude(locked_balance=0).exists())
+        self.assertEqual(landlord_balance_totals(self.landlord.id)["locked_balance"], Decimal("250.00"))
+
+    def test_release_folds_shards_before_drawing_down_locked(self):
+        LandlordBalance.objects.filter(landlord=self.landlord).update(locked_balance=Decimal("0.00"))
+        credit_landlord_locked(self.landlord.id, Decimal("500.00"), "payment")
+        LedgerTransaction.objects.create(
+            user=self.landlord,
+            kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+            amount=Decimal("500.00"),
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at=timezone.now() - timedelta(days=1),
+        )
+        release_matured_holds(user_ids=[self.landlord.id])
+
+        balance = LandlordBalance.objects.get(landlord=self.landlord)
+        self.assertEqual(balance.locked_balance, Decimal("0.00"))
+        self.assertEqual(balance.available_balance, Decimal("500.00"))
+
+    def test_batch_writes_one_update_per_landlord(self):
+        credit_landlord_locked(self.landlord.id, Decimal("1.00"), 0)
+        with CaptureQueriesContext(connection) as ctx:
+            with batched_landlord_credits():
+                for key in range(10):
+                    credit_landlord_locked(self.landlord.id, Decimal("1.00"), key)
+        self.assertEqual(len([query for query in ctx.captured_queries if "core_landlordbalanceshard" in query["sql"]]), 1)
+        self.assertEqual(landlord_balance_totals(self.landlord.id)["locked_balance"], Decimal("111.00"))
+
+    def test_callback_batch_credits_around_a_failed_callback(self):
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("1000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("1000.00"), start_date=date(2024, 1, 1))
+        for index, period in enumerate(["2024-03", "2024-04"]):
+            PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=self.tenant,
+                period=period,
+                phone_number="254700000001",
+                amount=Decimal("1000.00"),
+                checkout_request_id=f"checkout-shard-{index}",
+            )
+            payload = {"Body": {"stkCallback": {"CheckoutRequestID": f"checkout-shard-{index}", "ResultCode": 0, "ResultDesc": "OK"}}}
+            StkCallbackInbox.objects.create(checkout_request_id=f"checkout-shard-{index}", payload=payload)
+        StkCallbackInbox.objects.create(checkout_request_id="checkout-broken", payload={"Body": []})
+
+        with self.assertLogs("core.payments", level="ERROR"):
+            self.assertEqual(process_stk_callbacks(), 3)
+
+        self.assertEqual(landlord_balance_totals(self.landlord.id)["locked_balance"], Decimal("2100.00"))
+        broken = StkCallbackInbox.objects.get(checkout_request_id="checkout-broken")
+        self.assertEqual(broken.status, StkCallbackInbox.STATUS_PENDING)
+        self.assertTrue(broken.last_error)
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.metrics import MetricsRegistry
+from core.models import Lease, PaymentTransaction, Property, Unit
+from core.payments import STK_CALLBACKS
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_text_exposition(self):
+        pushes = self.registry.counter("krib_test_total", "Test counter.", ["outcome"])
+        latency = self.registry.histogram("krib_test_seconds", "Test histogram.", buckets=(0.1, 1))
+        pushes.inc(outcome="sent")
+        pushes.inc(2, outcome="sent")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+        text = self.registry.exposition()
+
+        self.assertIn("# TYPE krib_test_total counter", text)
+        self.assertIn('krib_test_total{outcome="sent"} 3', text)
+        self.assertIn('krib_test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('krib_test_seconds_bucket{le="1"} 2', text)
+        self.assertIn('krib_test_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("krib_test_seconds_sum 0.55", text)
+        self.assertIn("krib_test_seconds_count 2", text)
+
+    def test_worker_snapshots_are_summed(self):
+        pushes = self.registry.counter("krib_test_total", "Test counter.", ["outcome"])
+        latency = self.registry.histogram("krib_test_seconds", "Test histogram.", buckets=(0.1, 1))
+        pushes.inc(outcome="sent")
+        latency.observe(0.05)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            other = MetricsRegistry()
+            other.counter("krib_test_total", "Test counter.", ["outcome"]).inc(4, outcome="sent")
+            other.histogram("krib_test_seconds", "Test histogram.", buckets=(0.1, 1)).observe(0.5)
+            with open(os.path.join(directory, "metrics-999999.json"), "w") as handle:
+                json.dump(other.snapshot(), handle)
+
+            self.registry.maybe_flush(force=True)
+            text = self.registry.exposition()
+
+        self.assertIn('krib_test_total{outcome="sent"} 5', text)
+        self.assertIn('krib_test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn("krib_test_seconds_count 2", text)
+
+
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username="landlord_metrics", password="x")
+        tenant = User.objects.create_user(username="tenant_metrics", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        PaymentTransaction.objects.create(
+            lease=lease,
+            tenant=tenant,
+            period="2024-03",
+            phone_number="254700000001",
+            amount=Decimal("10000.00"),
+            checkout_request_id="checkout-metrics",
+            status=PaymentTransaction.STATUS_SUCCESS,
+        )
+        PaymentTransaction.objects.create(lease=lease, tenant=tenant, period="2024-04", phone_number="254700000001", amount=Decimal("1.00"))
+
+    @override_settings(DEBUG=True)
+    def test_metrics_expose_pipeline_counters_and_backlog(self):
+        before = STK_CALLBACKS.values.get(("duplicate", "success"), 0)
+        payload = {"Body": {"stkCallback": {"CheckoutRequestID": "checkout-metrics", "ResultCode": 0}}}
+        self.client.post(reverse("stk-callback"), payload, format="json")
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn(f'krib_stk_callbacks_total{{outcome="duplicate",result="success"}} {before + 1}', text)
+        self.assertIn('krib_http_requests_total{view="stk-callback",method="POST",status="200"}', text)
+        self.assertIn("krib_pending_payments 1", text)
+        self.assertIn("krib_daraja_token_hits", text)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_token_is_enforced(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_are_hidden_in_production_without_a_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
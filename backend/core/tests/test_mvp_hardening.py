@@ -1,14 +1,25 @@
 from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase
 
-from core.models import Lease, MaintenanceRequest, PaymentTransaction, Profile, Property, TenantInvite, Unit
+from core.models import (
+    Lease,
+    MaintenanceRequest,
+    PaymentTransaction,
+    Profile,
+    Property,
+    RentPeriodBalance,
+    TenantInvite,
+    Unit,
+)
 
 
 class BaseAPITestCase(APITestCase):
@@ -140,8 +151,8 @@ class PaymentCallbackTests(BaseAPITestCase):
             }
         }
 
-    @patch("core.views._daraja_stk_push")
-    @patch("core.views._missing_daraja_env_vars", return_value=[])
+    @patch("core.daraja.stk_push")
+    @patch("core.daraja.missing_env_vars", return_value=[])
     def test_initiate_and_callback_success_is_idempotent(self, _missing, mock_push):
         mock_push.return_value = {"CheckoutRequestID": "checkout-1", "MerchantRequestID": "merchant-1", "ResponseCode": "0"}
         self.auth(self.tenant)
@@ -150,7 +161,8 @@ class PaymentCallbackTests(BaseAPITestCase):
             {"lease_id": self.lease.id, "phone_number": "254700000001", "amount": "10000.00"},
             format="json",
         )
-        self.assertEqual(initiate.status_code, 201)
+        self.assertEqual(initiate.status_code, 202)
+        call_command("run_stk_worker", "--once", stdout=StringIO())
 
         callback_url = reverse("stk-callback")
         first = self.client.post(callback_url, self._callback_payload("checkout-1", result_code=0), format="json")
@@ -163,9 +175,12 @@ class PaymentCallbackTests(BaseAPITestCase):
         payment = PaymentTransaction.objects.get(checkout_request_id="checkout-1")
         self.assertEqual(payment.status, PaymentTransaction.STATUS_SUCCESS)
         self.assertTrue(payment.allocation_done)
+        balance = RentPeriodBalance.objects.get(lease=self.lease, period=payment.period)
+        self.assertEqual(balance.paid_sum, Decimal("10000.00"))
+        self.assertEqual(balance.status, RentPeriodBalance.STATUS_PAID)
 
-    @patch("core.views._daraja_stk_push")
-    @patch("core.views._missing_daraja_env_vars", return_value=[])
+    @patch("core.daraja.stk_push")
+    @patch("core.daraja.missing_env_vars", return_value=[])
     def test_callback_failure_marks_failed(self, _missing, mock_push):
         mock_push.return_value = {"CheckoutRequestID": "checkout-2", "MerchantRequestID": "merchant-2", "ResponseCode": "0"}
         self.auth(self.tenant)
@@ -174,6 +189,7 @@ class PaymentCallbackTests(BaseAPITestCase):
             {"lease_id": self.lease.id, "phone_number": "254700000001", "amount": "10000.00"},
             format="json",
         )
+        call_command("run_stk_worker", "--once", stdout=StringIO())
         response = self.client.post(reverse("stk-callback"), self._callback_payload("checkout-2", result_code=1), format="json")
         self.assertEqual(response.status_code, 200)
         payment = PaymentTransaction.objects.get(checkout_request_id="checkout-2")
@@ -214,5 +230,5 @@ class MaintenanceScopeTests(BaseAPITestCase):
         self.auth(self.manager)
         response = self.client.get(reverse("maintenance-list"))
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.request_obj.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.request_obj.id)
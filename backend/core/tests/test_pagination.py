@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Lease, Notification, PaymentTransaction, Profile, Property, Unit
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.tenant = User.objects.create_user(username="tenant_page", password="x")
+        landlord = User.objects.create_user(username="landlord_page", password="x")
+        landlord.profile.role = Profile.ROLE_LANDLORD
+        landlord.profile.save(update_fields=["role"])
+        self.landlord = landlord
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        PaymentTransaction.objects.bulk_create(
+            [
+                PaymentTransaction(
+                    lease=lease,
+                    tenant=self.tenant,
+                    period="2024-03",
+                    phone_number="254700000001",
+                    amount=Decimal(index),
+                    status=PaymentTransaction.STATUS_SUCCESS,
+                )
+                for index in range(1, 8)
+            ]
+        )
+        created_at = timezone.now()
+        for index, payment in enumerate(PaymentTransaction.objects.order_by("id")):
+            # Pairs of rows share a timestamp so the id tie-breaker is exercised.
+            PaymentTransaction.objects.filter(pk=payment.pk).update(created_at=created_at - timedelta(minutes=index // 2))
+        self.client.force_authenticate(landlord)
+
+    def _walk(self, url, params):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.append([row["id"] for row in response.data["results"]])
+            if not response.data["next"]:
+                return seen, response
+            response = self.client.get(response.data["next"])
+
+    def test_pages_are_stable_and_complete(self):
+        pages, last = self._walk(reverse("payments-list"), {"page_size": 3})
+        ids = [row_id for page in pages for row_id in page]
+        expected = list(PaymentTransaction.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+        previous = self.client.get(last.data["previous"])
+        self.assertEqual([row["id"] for row in previous.data["results"]], pages[1])
+
+    def test_receipts_are_paginated(self):
+        pages, _ = self._walk(reverse("landlord-receipts"), {"page_size": 5})
+        self.assertEqual([len(page) for page in pages], [5, 2])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("payments-list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_notifications_are_paginated(self):
+        Notification.objects.bulk_create([Notification(user=self.landlord, title="t", message=str(i)) for i in range(4)])
+        pages, _ = self._walk(reverse("notifications-list"), {"page_size": 3})
+        self.assertEqual([len(page) for page in pages], [3, 1])
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import override_settings
+from django.urls import path, reverse
+from rest_framework.test import APITestCase
+
+from core import daraja
+from core.models import Notification, Profile
+from core.perf import collect_stats
+
+
+class RequestPerformanceMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="perf_landlord", password="x")
+        self.user.profile.role = Profile.ROLE_LANDLORD
+        self.user.profile.save(update_fields=["role"])
+        self.client.force_authenticate(self.user)
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_header_reports_queries(self):
+        with self.assertLogs("core.perf", level="INFO") as logs:
+            response = self.client.get(reverse("dashboard-summary"))
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r"total;dur=\d+\.\d")
+        self.assertRegex(timing, r'db;dur=\d+\.\d;desc="[1-9]\d* queries"')
+        self.assertIn("cache;desc=", timing)
+        self.assertIn("daraja;dur=0.0", timing)
+        record = logs.records[0]
+        self.assertEqual((record.path, record.status), (reverse("dashboard-summary"), 200))
+        self.assertGreater(record.sql_count, 0)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_header_can_be_disabled(self):
+        response = self.client.get(reverse("dashboard-summary"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_streamed_exports_are_measured_until_the_body_is_sent(self):
+        with self.assertLogs("core.perf", level="INFO") as logs:
+            response = self.client.get(reverse("landlord-receipts"), {"format": "csv"})
+            self.assertFalse(logs.records and logs.records[-1].path == reverse("landlord-receipts"))
+            b"".join(response.streaming_content)
+
+        record = logs.records[-1]
+        self.assertEqual(record.path, reverse("landlord-receipts"))
+        self.assertGreater(record.sql_count, 0)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_cache_lookups_are_counted(self):
+        cache.set("perf-test-key", 1)
+        with collect_stats() as stats:
+            cache.get("perf-test-key")
+            cache.get("perf-test-missing")
+            cache.get_many(["perf-test-key", "perf-test-missing"])
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
+
+    def test_daraja_time_is_tracked(self):
+        class FakeResponse:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def read(self):
+                return b'{"access_token": "tok", "expires_in": "3599"}'
+
+        with collect_stats() as stats, patch("core.daraja.urllib_request.urlopen", return_value=FakeResponse()):
+            daraja._fetch_access_token("key", "secret")
+        self.assertEqual(stats.external_calls["daraja"], 1)
+
+    @override_settings(PERF_DUPLICATE_SQL_THRESHOLD=3, ROOT_URLCONF=__name__)
+    def test_repeated_statements_are_logged(self):
+        Notification.objects.bulk_create([Notification(user=self.user, title="t", message=str(index)) for index in range(4)])
+
+        with self.assertLogs("core.perf", level="WARNING") as logs:
+            self.client.get("/n-plus-one/")
+        self.assertIn("ran the same SQL up to 4 times", logs.output[0])
+
+
+def n_plus_one(request):
+    return JsonResponse({"users": [note.user.username for note in Notification.objects.all()]})
+
+
+urlpatterns = [path("n-plus-one/", n_plus_one)]
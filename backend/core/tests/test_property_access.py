@@ -0,0 +1,65 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import Lease, Profile, Property, PropertyAccess, Unit
+
+
+class PropertyAccessSyncTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_pa", password="x")
+        self.manager = User.objects.create_user(username="manager_pa", password="x")
+        self.tenant = User.objects.create_user(username="tenant_pa", password="x")
+        self.property = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        self.other_property = Property.objects.create(landlord=self.landlord, name="Q", location="MSA")
+        self.unit = Unit.objects.create(property=self.property, unit_number="U1", rent_amount=Decimal("10000.00"))
+
+    def _rows(self):
+        return set(PropertyAccess.objects.values_list("user_id", "property_id", "role"))
+
+    def test_property_and_lease_saves_maintain_access(self):
+        self.property.manager = self.manager
+        self.property.save()
+        lease = Lease.objects.create(unit=self.unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.assertIn((self.manager.id, self.property.id, Profile.ROLE_MANAGER), self._rows())
+        self.assertIn((self.tenant.id, self.property.id, Profile.ROLE_TENANT), self._rows())
+
+        lease.status = Lease.STATUS_INACTIVE
+        lease.save()
+        self.assertNotIn((self.tenant.id, self.property.id, Profile.ROLE_TENANT), self._rows())
+
+        self.property.manager = None
+        self.property.save()
+        self.assertEqual(
+            self._rows(),
+            {
+                (self.landlord.id, self.property.id, Profile.ROLE_LANDLORD),
+                (self.landlord.id, self.other_property.id, Profile.ROLE_LANDLORD),
+            },
+        )
+
+    def test_unit_move_and_lease_delete_update_access(self):
+        lease = Lease.objects.create(unit=self.unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.unit.property = self.other_property
+        self.unit.save()
+        self.assertIn((self.tenant.id, self.other_property.id, Profile.ROLE_TENANT), self._rows())
+        self.assertNotIn((self.tenant.id, self.property.id, Profile.ROLE_TENANT), self._rows())
+
+        lease.delete()
+        self.assertFalse(PropertyAccess.objects.filter(role=Profile.ROLE_TENANT).exists())
+
+    def test_consistency_check_reports_and_repairs_drift(self):
+        Lease.objects.create(unit=self.unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        expected = self._rows()
+        PropertyAccess.objects.filter(role=Profile.ROLE_TENANT).delete()
+        PropertyAccess.objects.create(user=self.tenant, property=self.other_property, role=Profile.ROLE_TENANT)
+
+        with self.assertRaises(CommandError):
+            call_command("check_property_access", stdout=StringIO())
+        call_command("check_property_access", "--fix", stdout=StringIO())
+        self.assertEqual(self._rows(), expected)
+        call_command("check_property_access", stdout=StringIO())
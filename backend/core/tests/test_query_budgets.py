@@ -0,0 +1,175 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import (
+    LandlordBalance,
+    LandlordPayout,
+    Lease,
+    LedgerTransaction,
+    MaintenanceRequest,
+    Notification,
+    PaymentTransaction,
+    Profile,
+    Property,
+    Tenant,
+    Unit,
+    rebuild_rent_period_balances,
+    sync_property_access,
+)
+
+PORTFOLIO_SIZES = [1, 50, 500]
+
+# (report name, url name, query params, query budget)
+LANDLORD_ENDPOINTS = [
+    ("dashboard_summary", "dashboard-summary", {}, 3),
+    ("properties", "properties-list", {}, 2),
+    ("units", "units-list", {"expand": "property"}, 2),
+    ("leases", "leases-list", {"expand": ["unit.property", "tenant"]}, 2),
+    ("tenants", "tenants-list", {"expand": "user"}, 2),
+    ("payments", "payments-list", {"expand": ["lease.unit.property", "tenant"]}, 3),
+    ("maintenance", "maintenance-list", {"expand": ["lease.unit.property", "tenant"]}, 3),
+    ("notifications", "notifications-list", {}, 1),
+    ("landlord_revenue", "landlord-revenue", {}, 2),
+    ("landlord_receipts", "landlord-receipts", {}, 2),
+    ("landlord_followups", "landlord-followups", {}, 2),
+    ("landlord_payouts", "landlord-payouts", {}, 3),
+]
+
+TENANT_ENDPOINTS = [
+    ("tenant_dashboard_summary", "dashboard-summary", {}, 5),
+    ("tenant_leases", "leases-list", {"expand": "unit.property"}, 2),
+    ("tenant_payments", "payments-list", {}, 2),
+    ("tenant_maintenance", "maintenance-list", {}, 2),
+    ("tenant_notifications", "notifications-list", {}, 1),
+    ("wallet", "wallet", {}, 4),
+]
+
+
+def seed_portfolio(name, lease_count):
+    period = timezone.localdate().strftime("%Y-%m")
+    landlord = User.objects.create(username=f"{name}_landlord")
+    Profile.objects.filter(user=landlord).update(role=Profile.ROLE_LANDLORD)
+    prop = Property.objects.create(landlord=landlord, name=f"{name} Court", location="Nairobi")
+
+    User.objects.bulk_create([User(username=f"{name}_tenant_{index}") for index in range(lease_count)])
+    tenants = list(User.objects.filter(username__startswith=f"{name}_tenant_").order_by("id"))
+    Profile.objects.bulk_create([Profile(user=tenant, phone_number=f"2547{index:08d}") for index, tenant in enumerate(tenants)])
+    Tenant.objects.bulk_create([Tenant(user=tenant) for tenant in tenants])
+
+    Unit.objects.bulk_create(
+        [
+            Unit(property=prop, unit_number=f"U{index}", rent_amount=Decimal("10000.00"), status=Unit.STATUS_OCCUPIED)
+            for index in range(lease_count)
+        ]
+    )
+    units = list(prop.units.order_by("id"))
+    Lease.objects.bulk_create(
+        [
+            Lease(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1), due_day=1)
+            for unit, tenant in zip(units, tenants)
+        ]
+    )
+    leases = list(Lease.objects.filter(unit__property=prop).order_by("id"))
+
+    # Every other lease pays half of this period's rent so dashboards and followups see mixed statuses.
+    PaymentTransaction.objects.bulk_create(
+        [
+            PaymentTransaction(
+                lease=lease,
+                tenant=lease.tenant,
+                period=period,
+                phone_number="254700000001",
+                amount=Decimal("5000.00"),
+                status=PaymentTransaction.STATUS_SUCCESS,
+                mpesa_receipt=f"{name.upper()}{index}",
+            )
+            for index, lease in enumerate(leases)
+            if index % 2 == 0
+        ]
+    )
+    MaintenanceRequest.objects.bulk_create([MaintenanceRequest(tenant=lease.tenant, lease=lease, issue="Leaking tap") for lease in leases])
+    Notification.objects.bulk_create([Notification(user=landlord, title="Payment", message=str(index)) for index in range(lease_count)])
+    LandlordBalance.objects.create(landlord=landlord, available_balance=Decimal("1000.00"))
+    LandlordPayout.objects.bulk_create(
+        [LandlordPayout(landlord=landlord, amount=Decimal("10.00"), method=LandlordPayout.METHOD_MPESA, destination="254700000001") for _ in range(lease_count)]
+    )
+
+    # The first tenant carries a history that grows with the portfolio.
+    first = leases[0]
+    PaymentTransaction.objects.bulk_create(
+        [
+            PaymentTransaction(
+                lease=first,
+                tenant=first.tenant,
+                period=(date(2020, 1, 1) + timedelta(days=31 * index)).strftime("%Y-%m"),
+                phone_number="254700000001",
+                amount=Decimal("1.00"),
+                status=PaymentTransaction.STATUS_FAILED,
+            )
+            for index in range(lease_count)
+        ]
+    )
+    Notification.objects.bulk_create([Notification(user=first.tenant, title="Reminder", message=str(index)) for index in range(lease_count)])
+    LedgerTransaction.objects.bulk_create(
+        [
+            LedgerTransaction(user=first.tenant, kind=LedgerTransaction.KIND_WALLET_CREDIT, amount=Decimal("1.00"), status=LedgerTransaction.STATUS_AVAILABLE)
+            for _ in range(lease_count)
+        ]
+    )
+
+    sync_property_access([prop.id])
+    rebuild_rent_period_balances(leases)
+    return landlord, first.tenant
+
+
+class QueryBudgetTests(APITestCase):
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.portfolios = {size: seed_portfolio(f"budget{size}", size) for size in PORTFOLIO_SIZES}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.report:
+            return
+        width = max(len(name) for name in cls.report)
+        lines = ["", "Queries per endpoint at " + " / ".join(f"{size} leases" for size in PORTFOLIO_SIZES) + ":"]
+        for name, counts in sorted(cls.report.items()):
+            lines.append(f"  {name.ljust(width)}  " + " / ".join(f"{counts.get(size, '-'):>3}" for size in PORTFOLIO_SIZES))
+        print("\n".join(lines))
+
+    def setUp(self):
+        # Measure cold caches; cached endpoints like landlord_revenue would otherwise hide their queries.
+        cache.clear()
+
+    def _count_queries(self, user, url_name, params):
+        # A fresh instance per request so nothing memoized on the user (like its role) hides a query.
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return len(queries)
+
+    def _assert_flat(self, endpoints, owner_index):
+        for name, url_name, params, budget in endpoints:
+            with self.subTest(endpoint=name):
+                counts = {size: self._count_queries(self.portfolios[size][owner_index], url_name, params) for size in PORTFOLIO_SIZES}
+                self.report[name] = counts
+                self.assertEqual(len(set(counts.values())), 1, f"{name} query count grows with data: {counts}")
+                self.assertLessEqual(counts[PORTFOLIO_SIZES[-1]], budget, f"{name} is over its budget of {budget} queries")
+
+    def test_landlord_endpoints_run_a_constant_number_of_queries(self):
+        self._assert_flat(LANDLORD_ENDPOINTS, 0)
+
+    def test_tenant_endpoints_run_a_constant_number_of_queries(self):
+        self._assert_flat(TENANT_ENDPOINTS, 1)
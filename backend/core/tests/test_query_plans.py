@@ -0,0 +1,84 @@
+import re
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    Lease,
+    LedgerTransaction,
+    MaintenanceRequest,
+    Notification,
+    PaymentTransaction,
+    Profile,
+    Property,
+    PropertyAccess,
+    Unit,
+)
+
+
+@skipUnless(connection.vendor == "sqlite", "Plan assertions match SQLite EXPLAIN QUERY PLAN output")
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user(username="plan_landlord", password="x")
+        Profile.objects.filter(user=cls.landlord).update(role=Profile.ROLE_LANDLORD)
+        cls.tenant = User.objects.create_user(username="plan_tenant", password="x")
+        prop = Property.objects.create(landlord=cls.landlord, name="Plan Court", location="Nairobi")
+        unit = Unit.objects.create(property=prop, unit_number="P1", rent_amount="1000.00")
+        cls.lease = Lease.objects.create(unit=unit, tenant=cls.tenant, rent_amount="1000.00", due_day=5, start_date=timezone.localdate())
+
+    def assertUsesIndex(self, queryset, table, index_name):
+        plan = queryset.explain()
+        full_scans = re.findall(rf"\bSCAN {table}\b(?! USING (?:COVERING )?INDEX)", plan)
+        self.assertEqual(full_scans, [], f"{table} is fully scanned:\n{plan}")
+        self.assertRegex(plan, rf"SEARCH {table} USING (?:COVERING )?INDEX {index_name}\b")
+
+    def test_rent_status_payment_lookup(self):
+        queryset = PaymentTransaction.objects.filter(lease=self.lease, period="2026-10", status=PaymentTransaction.STATUS_SUCCESS)
+        self.assertUsesIndex(queryset, "core_paymenttransaction", "payment_lease_period_idx")
+
+    def test_stale_pending_payments(self):
+        queryset = PaymentTransaction.objects.filter(
+            status=PaymentTransaction.STATUS_PENDING,
+            created_at__lt=timezone.now() - timedelta(minutes=5),
+        ).order_by("created_at")
+        self.assertUsesIndex(queryset, "core_paymenttransaction", "payment_status_created_idx")
+
+    def test_matured_holds_for_users_use_partial_index(self):
+        queryset = LedgerTransaction.objects.filter(
+            kind=LedgerTransaction.KIND_WALLET_CREDIT,
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at__lte=timezone.now(),
+            user_id__in=[self.tenant.id],
+        ).order_by("id")
+        self.assertUsesIndex(queryset, "core_ledgertransaction", "ledger_user_locked_idx")
+
+    def test_matured_holds_sweep(self):
+        queryset = LedgerTransaction.objects.filter(
+            kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at__lte=timezone.now(),
+        ).order_by("id")
+        self.assertUsesIndex(queryset, "core_ledgertransaction", "ledger_release_idx")
+
+    def test_notification_feed(self):
+        queryset = Notification.objects.filter(user=self.tenant).order_by("-created_at")
+        self.assertUsesIndex(queryset, "core_notification", "notif_user_created_idx")
+
+    def test_landlord_maintenance_list(self):
+        scoped = PropertyAccess.objects.filter(user=self.landlord, role=Profile.ROLE_LANDLORD).values("property_id")
+        queryset = MaintenanceRequest.objects.filter(lease__unit__property_id__in=scoped).order_by("-updated_at")
+        self.assertUsesIndex(queryset, "core_maintenancerequest", "maint_lease_updated_idx")
+
+    def test_landlord_revenue_does_not_scan_payments(self):
+        scoped = PropertyAccess.objects.filter(user=self.landlord, role=Profile.ROLE_LANDLORD).values("property_id")
+        plan = PaymentTransaction.objects.filter(
+            lease__unit__property_id__in=scoped,
+            status=PaymentTransaction.STATUS_SUCCESS,
+            period="2026-10",
+        ).explain()
+        self.assertNotRegex(plan, r"\bSCAN core_paymenttransaction\b(?! USING (?:COVERING )?INDEX)")
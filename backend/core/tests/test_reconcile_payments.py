@@ -0,0 +1,135 @@
+import json
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Lease, PaymentTransaction, Property, Unit
+from core.payments import CALLBACK_DUPLICATE, _callback_from_query, apply_stk_callback
+
+QUERY_RESULTS = {
+    "co-paid": {"ResponseCode": "0", "ResultCode": "0", "ResultDesc": "The service request is processed successfully."},
+    "co-cancelled": {"ResponseCode": "0", "ResultCode": "1032", "ResultDesc": "Request cancelled by user"},
+}
+
+
+class StubDarajaHandler(BaseHTTPRequestHandler):
+    queried = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(200, {"access_token": "stub-token", "expires_in": "3599"})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        checkout_id = payload["CheckoutRequestID"]
+        self.queried.append(checkout_id)
+        if checkout_id in QUERY_RESULTS:
+            self._reply(200, QUERY_RESULTS[checkout_id])
+        else:
+            self._reply(500, {"errorCode": "500.001.1001", "errorMessage": "The transaction is being processed"})
+
+
+class ReconcilePaymentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDarajaHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        StubDarajaHandler.queried = []
+        landlord = User.objects.create_user(username="landlord_rec", password="x")
+        tenant = User.objects.create_user(username="tenant_rec", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.payments = {}
+        for checkout_id in ["co-paid", "co-cancelled", "co-processing", "co-fresh"]:
+            self.payments[checkout_id] = PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=tenant,
+                period="2024-03",
+                phone_number="254700000001",
+                amount=Decimal("10000.00"),
+                checkout_request_id=checkout_id,
+            )
+        PaymentTransaction.objects.exclude(checkout_request_id="co-fresh").update(created_at=timezone.now() - timedelta(minutes=30))
+
+    def _status(self, checkout_id):
+        return PaymentTransaction.objects.get(checkout_request_id=checkout_id).status
+
+    def test_reconcile_applies_query_results_against_stub_server(self):
+        env = {
+            "MPESA_BASE_URL": f"http://127.0.0.1:{self.server.server_address[1]}",
+            "MPESA_CONSUMER_KEY": "key",
+            "MPESA_CONSUMER_SECRET": "secret",
+            "MPESA_SHORTCODE": "174379",
+            "MPESA_PASSKEY": "passkey",
+        }
+        with patch.dict("os.environ", env):
+            out = StringIO()
+            call_command("reconcile_payments", "--concurrency", "3", "--rate", "50", stdout=out)
+
+        self.assertEqual(sorted(StubDarajaHandler.queried), ["co-cancelled", "co-paid", "co-processing"])
+        self.assertEqual(self._status("co-paid"), PaymentTransaction.STATUS_SUCCESS)
+        self.assertEqual(self._status("co-cancelled"), PaymentTransaction.STATUS_FAILED)
+        self.assertEqual(self._status("co-processing"), PaymentTransaction.STATUS_PENDING)
+        self.assertEqual(self._status("co-fresh"), PaymentTransaction.STATUS_PENDING)
+        paid = PaymentTransaction.objects.get(checkout_request_id="co-paid")
+        self.assertTrue(paid.allocation_done)
+        self.assertTrue(paid.receipt_pending)
+        self.assertIsNone(paid.mpesa_receipt)
+        self.assertIsNotNone(paid.transaction_date)
+        self.assertFalse(PaymentTransaction.objects.get(checkout_request_id="co-cancelled").receipt_pending)
+        self.assertIn("1 success, 1 failed, 1 still pending", out.getvalue())
+
+    def test_late_callback_backfills_the_receipt(self):
+        payment = self.payments["co-paid"]
+        apply_stk_callback(_callback_from_query(payment, QUERY_RESULTS["co-paid"]))
+        late = {
+            "Body": {
+                "stkCallback": {
+                    "CheckoutRequestID": "co-paid",
+                    "ResultCode": 0,
+                    "ResultDesc": "OK",
+                    "CallbackMetadata": {
+                        "Item": [
+                            {"Name": "MpesaReceiptNumber", "Value": "RCPLATE"},
+                            {"Name": "TransactionDate", "Value": 20240305101500},
+                        ]
+                    },
+                }
+            }
+        }
+        self.assertEqual(apply_stk_callback(late)[0], CALLBACK_DUPLICATE)
+
+        payment.refresh_from_db()
+        self.assertEqual((payment.mpesa_receipt, payment.receipt_pending), ("RCPLATE", False))
+        self.assertEqual(timezone.localtime(payment.transaction_date).strftime("%Y%m%d%H%M%S"), "20240305101500")
+        self.assertEqual(payment.status, PaymentTransaction.STATUS_SUCCESS)
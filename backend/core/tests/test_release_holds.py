@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import LandlordBalance, Lease, LedgerTransaction, PaymentTransaction, Profile, Property, Unit
+
+
+class ReleaseHoldsTests(APITestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(days=1)
+        future = timezone.now() + timedelta(days=1)
+        self.tenants = []
+        for index in range(3):
+            tenant = User.objects.create_user(username=f"tenant_hold_{index}", password="x")
+            Profile.objects.filter(user=tenant).update(wallet_locked=Decimal("300.00"))
+            for amount, available_at in [(Decimal("100.00"), past), (Decimal("50.00"), past), (Decimal("150.00"), future)]:
+                LedgerTransaction.objects.create(
+                    user=tenant,
+                    kind=LedgerTransaction.KIND_WALLET_CREDIT,
+                    amount=amount,
+                    status=LedgerTransaction.STATUS_LOCKED,
+                    available_at=available_at,
+                )
+            self.tenants.append(tenant)
+
+        self.landlord = User.objects.create_user(username="landlord_hold", password="x")
+        self.landlord.profile.role = Profile.ROLE_LANDLORD
+        self.landlord.profile.save(update_fields=["role"])
+        LandlordBalance.objects.create(landlord=self.landlord, locked_balance=Decimal("900.00"))
+        LedgerTransaction.objects.create(
+            user=self.landlord,
+            kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
+            amount=Decimal("900.00"),
+            status=LedgerTransaction.STATUS_LOCKED,
+            available_at=past,
+        )
+
+    def test_release_moves_matured_holds_in_batches(self):
+        call_command("release_holds", "--batch-size", "2", stdout=StringIO())
+
+        for tenant in self.tenants:
+            profile = Profile.objects.get(user=tenant)
+            self.assertEqual(profile.wallet_available, Decimal("150.00"))
+            self.assertEqual(profile.wallet_locked, Decimal("150.00"))
+        balance = LandlordBalance.objects.get(landlord=self.landlord)
+        self.assertEqual((balance.available_balance, balance.locked_balance), (Decimal("900.00"), Decimal("0.00")))
+        self.assertEqual(LedgerTransaction.objects.filter(status=LedgerTransaction.STATUS_LOCKED).count(), 3)
+
+        call_command("release_holds", stdout=StringIO())
+        self.assertEqual(Profile.objects.get(user=self.tenants[0]).wallet_available, Decimal("150.00"))
+
+    def test_balance_reads_do_not_write(self):
+        self.client.force_authenticate(self.landlord)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("landlord-payouts"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["available_balance"], Decimal("0.00"))
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith(("UPDATE", "INSERT"))])
+
+    def test_tenant_dashboard_is_a_read_and_the_wallet_job_applies_it(self):
+        tenant = self.tenants[0]
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("1000.00"))
+        Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("1000.00"), start_date=date(2024, 1, 1))
+
+        self.client.force_authenticate(tenant)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard-summary"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith(("UPDATE", "INSERT", "SAVEPOINT"))])
+
+        call_command("release_holds", stdout=StringIO())
+        self.assertFalse(PaymentTransaction.objects.exists())
+        self.assertEqual(Profile.objects.get(user=tenant).wallet_available, Decimal("150.00"))
+
+        call_command("apply_wallets", "--user", str(self.tenants[1].id), stdout=StringIO())
+        self.assertFalse(PaymentTransaction.objects.exists())
+
+        with mock.patch("core.payments.release_matured_holds") as release:
+            call_command("apply_wallets", stdout=StringIO())
+        release.assert_not_called()
+        wallet_payment = PaymentTransaction.objects.get(tenant=tenant)
+        self.assertEqual(wallet_payment.amount, Decimal("150.00"))
+        self.assertEqual(Profile.objects.get(user=tenant).wallet_available, Decimal("0.00"))
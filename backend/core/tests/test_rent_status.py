@@ -0,0 +1,196 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.models import (
+    Lease,
+    Notification,
+    PaymentTransaction,
+    Profile,
+    Property,
+    RentPeriodBalance,
+    Unit,
+    compute_lease_rent_status,
+    compute_lease_rent_statuses,
+    rebuild_rent_period_balances,
+    record_rent_payment,
+)
+
+
+class RentStatusBatchTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_rs", password="x")
+        self.property = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        self.leases = []
+        for index, paid in enumerate([None, Decimal("4000.00"), Decimal("10000.00"), Decimal("12500.50")]):
+            tenant = User.objects.create_user(username=f"tenant_rs_{index}", password="x")
+            unit = Unit.objects.create(
+                property=self.property,
+                unit_number=f"U{index}",
+                rent_amount=Decimal("10000.00"),
+            )
+            lease = Lease.objects.create(
+                unit=unit,
+                tenant=tenant,
+                rent_amount=Decimal("10000.00"),
+                start_date=date(2024, 1, 1),
+                due_day=5,
+            )
+            if paid is not None:
+                PaymentTransaction.objects.create(
+                    lease=lease,
+                    tenant=tenant,
+                    period="2024-03",
+                    phone_number="254700000001",
+                    amount=paid,
+                    status=PaymentTransaction.STATUS_SUCCESS,
+                )
+            PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=tenant,
+                period="2024-03",
+                phone_number="254700000001",
+                amount=Decimal("999.00"),
+                status=PaymentTransaction.STATUS_FAILED,
+            )
+            self.leases.append(lease)
+        rebuild_rent_period_balances()
+
+    def test_batch_matches_per_lease_status(self):
+        for today in [date(2024, 3, 2), date(2024, 3, 20)]:
+            expected = {lease.id: compute_lease_rent_status(lease, period="2024-03", today=today) for lease in self.leases}
+            batch = compute_lease_rent_statuses(Lease.objects.all(), period="2024-03", today=today)
+            self.assertEqual({lease.id: row for lease, row in batch}, expected)
+
+    def test_batch_runs_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            compute_lease_rent_statuses(Lease.objects.all(), period="2024-03", today=date(2024, 3, 20))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_status_reads_do_not_write_notices(self):
+        today = date(2024, 3, 20)
+        compute_lease_rent_statuses(Lease.objects.all(), period="2024-03", today=today)
+        for lease in self.leases:
+            compute_lease_rent_status(lease, period="2024-03", today=today)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_overdue_sweep_creates_notices_once(self):
+        Lease.objects.filter(pk=self.leases[0].pk).update(status=Lease.STATUS_INACTIVE)
+        call_command("overdue_sweep", "--date", "2024-03-20", stdout=StringIO())
+        call_command("overdue_sweep", "--date", "2024-03-20", stdout=StringIO())
+        notices = Notification.objects.filter(type=Notification.TYPE_OVERDUE, period="2024-03")
+        self.assertEqual(list(notices.values_list("lease_id", flat=True)), [self.leases[1].id])
+
+    def test_overdue_sweep_skips_leases_before_due_day(self):
+        call_command("overdue_sweep", "--date", "2024-03-05", stdout=StringIO())
+        self.assertFalse(Notification.objects.exists())
+
+
+class RentPeriodBalanceTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username="landlord_rpb", password="x")
+        self.tenant = User.objects.create_user(username="tenant_rpb", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        self.lease = Lease.objects.create(
+            unit=unit,
+            tenant=self.tenant,
+            rent_amount=Decimal("10000.00"),
+            start_date=date(2024, 1, 1),
+            due_day=28,
+        )
+
+    def _pay(self, amount, period="2024-03"):
+        PaymentTransaction.objects.create(
+            lease=self.lease,
+            tenant=self.tenant,
+            period=period,
+            phone_number="254700000001",
+            amount=amount,
+            status=PaymentTransaction.STATUS_SUCCESS,
+        )
+        record_rent_payment(self.lease, period, amount)
+
+    def test_incremental_updates_match_rebuild(self):
+        self._pay(Decimal("4000.00"))
+        self._pay(Decimal("6000.00"))
+        self._pay(Decimal("2500.00"), period="2024-04")
+        incremental = sorted(RentPeriodBalance.objects.values_list("lease_id", "period", "paid_sum", "status"))
+
+        call_command("rebuild_rent_balances", stdout=StringIO())
+        rebuilt = sorted(RentPeriodBalance.objects.values_list("lease_id", "period", "paid_sum", "status"))
+
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(
+            incremental,
+            [
+                (self.lease.id, "2024-03", Decimal("10000.00"), RentPeriodBalance.STATUS_PAID),
+                (self.lease.id, "2024-04", Decimal("2500.00"), RentPeriodBalance.STATUS_PARTIAL),
+            ],
+        )
+
+    def test_status_read_is_single_lookup(self):
+        self._pay(Decimal("4000.00"))
+        with CaptureQueriesContext(connection) as ctx:
+            row = compute_lease_rent_status(self.lease, period="2024-03", today=date(2024, 3, 2))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(row["balance"], Decimal("6000.00"))
+        self.assertEqual(row["status"], "PARTIAL")
+
+
+class SerializerRentStatusTests(APITestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username="landlord_srs", password="x")
+        self.landlord.profile.role = Profile.ROLE_LANDLORD
+        self.landlord.profile.save(update_fields=["role"])
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        for index in range(3):
+            tenant = User.objects.create_user(username=f"tenant_srs_{index}", password="x")
+            unit = Unit.objects.create(property=prop, unit_number=f"U{index}", rent_amount=Decimal("10000.00"))
+            lease = Lease.objects.create(
+                unit=unit,
+                tenant=tenant,
+                rent_amount=Decimal("10000.00"),
+                start_date=date(2024, 1, 1),
+            )
+            for _ in range(5):
+                PaymentTransaction.objects.create(
+                    lease=lease,
+                    tenant=tenant,
+                    period="2024-03",
+                    phone_number="254700000001",
+                    amount=Decimal("100.00"),
+                    status=PaymentTransaction.STATUS_FAILED,
+                )
+        self.client.force_authenticate(self.landlord)
+
+    def _rent_status_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q for q in ctx.captured_queries if "core_rentperiodbalance" in q["sql"]]
+
+    def test_payment_list_computes_rent_status_once_per_page(self):
+        response, queries = self._rent_status_queries(reverse("payments-list") + "?expand=lease")
+        self.assertEqual(len(response.data["results"]), 15)
+        self.assertIn("rent_status", response.data["results"][0]["lease"])
+        self.assertEqual(len(queries), 1)
+
+    def test_payment_list_can_skip_rent_status(self):
+        response, queries = self._rent_status_queries(reverse("payments-list") + "?expand=lease&rent_status=0")
+        self.assertNotIn("rent_status", response.data["results"][0]["lease"])
+        self.assertEqual(queries, [])
+
+    def test_lease_list_uses_annotation(self):
+        response, queries = self._rent_status_queries(reverse("leases-list"))
+        self.assertEqual(len(response.data), 3)
+        self.assertIn(response.data[0]["rent_status"]["status"], ["UNPAID", "OVERDUE"])
+        self.assertEqual(len(queries), 1)
@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.cache import get_or_compute
+from core.models import Lease, PaymentTransaction, Profile, Property, RevenueRollup, Unit, record_rent_payment
+from core.payments import apply_wallet_to_current_rent
+
+
+class LandlordRevenueCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(username="landlord_revenue", password="x")
+        Profile.objects.filter(user=self.landlord).update(role=Profile.ROLE_LANDLORD)
+        self.tenant = User.objects.create_user(username="tenant_revenue", password="x")
+        prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        self.lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.period = timezone.localdate().strftime("%Y-%m")
+        PaymentTransaction.objects.create(
+            lease=self.lease,
+            tenant=self.tenant,
+            period="2024-03",
+            phone_number="254700000001",
+            amount=Decimal("10000.00"),
+            status=PaymentTransaction.STATUS_SUCCESS,
+        )
+        self.client.force_authenticate(self.landlord)
+
+    def _revenue(self, **params):
+        response = self.client.get(reverse("landlord-revenue"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeat_loads_skip_the_aggregates(self):
+        self._revenue(period=self.period)
+        with CaptureQueriesContext(connection) as queries:
+            data = self._revenue(period=self.period)
+        self.assertFalse([query for query in queries if "SUM(" in query["sql"]])
+        self.assertEqual(Decimal(data["lifetime"]["gross_collected"]), Decimal("10000.00"))
+        self.assertEqual(Decimal(data["gross_collected"]), Decimal("0.00"))
+
+    def test_stk_callback_success_invalidates_the_cache(self):
+        self._revenue(period=self.period)
+        PaymentTransaction.objects.create(
+            lease=self.lease,
+            tenant=self.tenant,
+            period=self.period,
+            phone_number="254700000001",
+            amount=Decimal("4000.00"),
+            checkout_request_id="checkout-revenue",
+        )
+        payload = {"Body": {"stkCallback": {"CheckoutRequestID": "checkout-revenue", "ResultCode": 0, "ResultDesc": "OK"}}}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("stk-callback"), payload, format="json")
+
+        data = self._revenue(period=self.period)
+        self.assertEqual(Decimal(data["gross_collected"]), Decimal("4000.00"))
+        self.assertEqual(Decimal(data["lifetime"]["gross_collected"]), Decimal("14000.00"))
+
+    def test_wallet_debit_invalidates_the_cache(self):
+        self._revenue(period=self.period)
+        Profile.objects.filter(user=self.tenant).update(wallet_available=Decimal("2500.00"))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_wallet_to_current_rent(self.lease)
+
+        data = self._revenue(period=self.period)
+        self.assertEqual(Decimal(data["gross_collected"]), Decimal("2500.00"))
+        self.assertEqual(Decimal(data["lifetime"]["gross_collected"]), Decimal("12500.00"))
+
+
+class RevenueInvalidationOrderTests(TransactionTestCase):
+    def test_invalidation_runs_after_the_rollup_write_without_an_outer_transaction(self):
+        landlord = User.objects.create_user(username="landlord_revenue_order", password="x")
+        tenant = User.objects.create_user(username="tenant_revenue_order", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+
+        seen = []
+        collected = RevenueRollup.objects.filter(property=prop, period="2024-03").values_list("gross_collected", flat=True)
+        with mock.patch("core.models.invalidate_landlord_revenue", side_effect=lambda landlord_id: seen.append(collected.first())):
+            record_rent_payment(lease, "2024-03", Decimal("500.00"))
+        self.assertEqual(seen, [Decimal("500.00")])
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return Decimal("42.00")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_or_compute("revenue-test", compute, 60))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [Decimal("42.00")] * 8)
+        self.assertIsNone(cache.get("revenue-test:lock"))
@@ -0,0 +1,132 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Lease, PaymentTransaction, Profile, Property, RevenueRollup, Unit
+from core.payments import apply_wallet_to_current_rent
+
+
+class RevenueRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(username="landlord_rollup", password="x")
+        Profile.objects.filter(user=self.landlord).update(role=Profile.ROLE_LANDLORD)
+        self.tenant = User.objects.create_user(username="tenant_rollup", password="x")
+        other_tenant = User.objects.create_user(username="tenant_rollup_2", password="x")
+        self.prop = Property.objects.create(landlord=self.landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=self.prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        other_unit = Unit.objects.create(property=self.prop, unit_number="U2", rent_amount=Decimal("6000.00"))
+        self.lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        Lease.objects.create(unit=other_unit, tenant=other_tenant, rent_amount=Decimal("6000.00"), start_date=date(2024, 3, 20))
+        self.period = timezone.localdate().strftime("%Y-%m")
+        self.client.force_authenticate(self.landlord)
+
+    def _pay(self, checkout_id, period, amount):
+        PaymentTransaction.objects.create(
+            lease=self.lease,
+            tenant=self.tenant,
+            period=period,
+            phone_number="254700000001",
+            amount=Decimal(amount),
+            checkout_request_id=checkout_id,
+        )
+        payload = {"Body": {"stkCallback": {"CheckoutRequestID": checkout_id, "ResultCode": 0, "ResultDesc": "OK"}}}
+        self.client.post(reverse("stk-callback"), payload, format="json")
+
+    def _snapshot(self):
+        return sorted(
+            RevenueRollup.objects.values_list("landlord_id", "property_id", "period", "gross_collected", "wallet_applied", "payment_count", "expected_rent")
+        )
+
+    def test_payments_update_the_rollup_and_match_a_rebuild(self):
+        self._pay("rollup-1", "2024-02", "4000.00")
+        self._pay("rollup-2", "2024-02", "6000.00")
+        self._pay("rollup-3", self.period, "3000.00")
+        Profile.objects.filter(user=self.tenant).update(wallet_available=Decimal("2000.00"))
+        apply_wallet_to_current_rent(self.lease)
+
+        february = RevenueRollup.objects.get(property=self.prop, period="2024-02")
+        self.assertEqual(february.gross_collected, Decimal("10000.00"))
+        self.assertEqual(february.payment_count, 2)
+        self.assertEqual(february.expected_rent, Decimal("10000.00"))
+        current = RevenueRollup.objects.get(property=self.prop, period=self.period)
+        self.assertEqual(current.gross_collected, Decimal("5000.00"))
+        self.assertEqual(current.wallet_applied, Decimal("2000.00"))
+        self.assertEqual(current.expected_rent, Decimal("16000.00"))
+
+        incremental = {row[:3]: row for row in self._snapshot()}
+        out = StringIO()
+        call_command("rebuild_revenue_rollups", stdout=out)
+        self.assertIn("Rebuilt", out.getvalue())
+        self.assertEqual({row[:3]: row for row in self._snapshot()}, incremental)
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-03").expected_rent, Decimal("16000.00"))
+
+    def test_unpaid_months_and_later_leases_carry_expected_rent(self):
+        response = self.client.get(reverse("landlord-revenue"), {"from": "2024-01", "to": "2024-03"})
+        self.assertEqual([Decimal(row["expected_rent"]) for row in response.data["periods"]], [Decimal("10000.00"), Decimal("10000.00"), Decimal("16000.00")])
+
+        late_tenant = User.objects.create_user(username="tenant_rollup_3", password="x")
+        unit = Unit.objects.create(property=self.prop, unit_number="U3", rent_amount=Decimal("4000.00"))
+        late = Lease.objects.create(unit=unit, tenant=late_tenant, rent_amount=Decimal("4000.00"), start_date=date(2024, 2, 25))
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-02").expected_rent, Decimal("14000.00"))
+
+        late.status = Lease.STATUS_INACTIVE
+        late.save()
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period=self.period).expected_rent, Decimal("16000.00"))
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-02").expected_rent, Decimal("14000.00"))
+
+    def test_lease_changes_leave_closed_months_frozen(self):
+        self.lease.rent_amount = Decimal("12000.00")
+        self.lease.save()
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-01").expected_rent, Decimal("10000.00"))
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period=self.period).expected_rent, Decimal("18000.00"))
+
+        self.lease.status = Lease.STATUS_INACTIVE
+        self.lease.save()
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-03").expected_rent, Decimal("16000.00"))
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period=self.period).expected_rent, Decimal("6000.00"))
+
+        call_command("rebuild_revenue_rollups", stdout=StringIO())
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period="2024-03").expected_rent, Decimal("16000.00"))
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period=self.period).expected_rent, Decimal("6000.00"))
+
+    def test_saving_an_unchanged_lease_does_not_touch_the_rollup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.lease.save()
+        self.assertFalse([query for query in queries if "core_revenuerollup" in query["sql"]])
+
+    def test_seed_command_creates_the_current_month(self):
+        RevenueRollup.objects.all().delete()
+        call_command("overdue_sweep", stdout=StringIO())
+        self.assertFalse(RevenueRollup.objects.exists())
+        out = StringIO()
+        call_command("seed_revenue_rollups", stdout=out)
+        self.assertIn("Seeded 1", out.getvalue())
+        self.assertEqual(RevenueRollup.objects.get(property=self.prop, period=self.period).expected_rent, Decimal("16000.00"))
+
+    def test_range_is_served_from_the_rollup(self):
+        self._pay("rollup-1", "2024-02", "4000.00")
+        self._pay("rollup-2", "2024-04", "10000.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("landlord-revenue"), {"from": "2024-01", "to": "2024-04"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "core_paymenttransaction" in query["sql"]])
+        self.assertEqual([row["period"] for row in response.data["periods"]], ["2024-01", "2024-02", "2024-03", "2024-04"])
+        self.assertEqual(Decimal(response.data["gross_collected"]), Decimal("14000.00"))
+        self.assertEqual(response.data["payment_count"], 2)
+        self.assertEqual(Decimal(response.data["periods"][0]["gross_collected"]), Decimal("0.00"))
+
+    def test_invalid_ranges_are_rejected(self):
+        for params in [{"from": "2024-13"}, {"to": "2024-01"}, {"from": "2024-05", "to": "2024-01"}, {"from": "2000-01", "to": "2024-01"}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse("landlord-revenue"), params).status_code, 400)
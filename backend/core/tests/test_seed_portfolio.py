@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.contrib.auth import authenticate
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    LandlordBalance,
+    Lease,
+    LedgerTransaction,
+    PaymentTransaction,
+    Profile,
+    RentPeriodBalance,
+    RevenueRollup,
+    diff_property_access,
+)
+from core.seeding import SEED_PASSWORD
+
+
+class SeedPortfolioTests(TestCase):
+    def _seed(self, *args):
+        out = StringIO()
+        call_command(
+            "seed_portfolio",
+            "--landlords", "2",
+            "--properties-per-landlord", "2",
+            "--units-per-property", "5",
+            "--months", "6",
+            "--overpayment-rate", "0.3",
+            "--seed", "11",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_generated_history_is_consistent(self):
+        output = self._seed()
+
+        self.assertIn("Seeded", output)
+        leases = Lease.objects.filter(tenant__username__startswith="seed_")
+        self.assertTrue(leases.exists())
+        missing, stale = diff_property_access()
+        self.assertFalse(missing or stale)
+        self.assertLess(PaymentTransaction.objects.order_by("created_at").first().created_at, timezone.now() - timezone.timedelta(days=60))
+
+        landlord_total = LandlordBalance.objects.aggregate(total=Sum("available_balance") + Sum("locked_balance"))["total"]
+        landlord_ledger = LedgerTransaction.objects.filter(kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT).aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(landlord_total, landlord_ledger)
+
+        wallet_total = Profile.objects.aggregate(total=Sum("wallet_available") + Sum("wallet_locked"))["total"]
+        success = PaymentTransaction.objects.filter(status=PaymentTransaction.STATUS_SUCCESS)
+        self.assertEqual(wallet_total + landlord_ledger, success.aggregate(total=Sum("amount"))["total"])
+        self.assertEqual(
+            RentPeriodBalance.objects.aggregate(total=Sum("paid_sum"))["total"],
+            success.aggregate(total=Sum("amount"))["total"],
+        )
+        self.assertEqual(
+            RevenueRollup.objects.aggregate(total=Sum("gross_collected"))["total"],
+            success.aggregate(total=Sum("amount"))["total"],
+        )
+
+        self.assertIsNotNone(authenticate(username="seed_landlord_0", password=SEED_PASSWORD))
+
+    def test_existing_prefix_is_rejected(self):
+        self._seed()
+        with self.assertRaises(CommandError):
+            self._seed()
+        self._seed("--prefix", "second")
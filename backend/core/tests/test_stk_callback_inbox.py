@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Lease, PaymentTransaction, Property, RentPeriodBalance, StkCallbackInbox, Unit
+from core.payments import STK_CALLBACK_MAX_ATTEMPTS, process_stk_callbacks
+
+
+@override_settings(STK_CALLBACK_MODE="deferred")
+class DeferredCallbackTests(APITestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username="landlord_inbox", password="x")
+        tenant = User.objects.create_user(username="tenant_inbox", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        self.lease = Lease.objects.create(unit=unit, tenant=tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.payment = PaymentTransaction.objects.create(
+            lease=self.lease,
+            tenant=tenant,
+            period="2024-03",
+            phone_number="254700000001",
+            amount=Decimal("10000.00"),
+            checkout_request_id="checkout-inbox",
+        )
+
+    def _payload(self, checkout_id="checkout-inbox", result_code=0):
+        return {
+            "Body": {
+                "stkCallback": {
+                    "CheckoutRequestID": checkout_id,
+                    "ResultCode": result_code,
+                    "ResultDesc": "OK",
+                    "CallbackMetadata": {"Item": [{"Name": "MpesaReceiptNumber", "Value": "RCPINBOX"}]},
+                }
+            }
+        }
+
+    def test_callback_is_acked_with_one_insert_and_deduplicated(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("stk-callback"), self._payload(), format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.client.post(reverse("stk-callback"), self._payload(), format="json")
+        self.assertEqual(StkCallbackInbox.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.STATUS_PENDING)
+
+    def test_worker_applies_stored_callbacks(self):
+        self.client.post(reverse("stk-callback"), self._payload(), format="json")
+        call_command("process_stk_callbacks", "--once", stdout=StringIO())
+
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.mpesa_receipt), (PaymentTransaction.STATUS_SUCCESS, "RCPINBOX"))
+        self.assertTrue(self.payment.allocation_done)
+        self.assertEqual(RentPeriodBalance.objects.get(lease=self.lease, period="2024-03").paid_sum, Decimal("10000.00"))
+        self.assertEqual(StkCallbackInbox.objects.get().status, StkCallbackInbox.STATUS_DONE)
+
+    def test_unmatched_callbacks_retry_before_giving_up(self):
+        self.client.post(reverse("stk-callback"), self._payload("checkout-unknown"), format="json")
+        for _ in range(STK_CALLBACK_MAX_ATTEMPTS):
+            StkCallbackInbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            process_stk_callbacks()
+        row = StkCallbackInbox.objects.get()
+        self.assertEqual((row.status, row.attempts), (StkCallbackInbox.STATUS_UNMATCHED, STK_CALLBACK_MAX_ATTEMPTS))
@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from urllib.error import URLError
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Lease, PaymentTransaction, Property, StkPushOutbox, Unit
+from core.payments import (
+    STK_PUSH_MAX_ATTEMPTS,
+    STK_PUSH_SEND_TIMEOUT,
+    STK_PUSH_UNKNOWN_WINDOW,
+    dispatch_stk_outbox,
+    expire_stuck_stk_pushes,
+    reconcile_pending_payments,
+)
+
+
+@patch("core.daraja.missing_env_vars", return_value=[])
+class StkOutboxTests(APITestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username="landlord_outbox", password="x")
+        self.tenant = User.objects.create_user(username="tenant_outbox", password="x")
+        prop = Property.objects.create(landlord=landlord, name="P", location="NBO")
+        unit = Unit.objects.create(property=prop, unit_number="U1", rent_amount=Decimal("10000.00"))
+        self.lease = Lease.objects.create(unit=unit, tenant=self.tenant, rent_amount=Decimal("10000.00"), start_date=date(2024, 1, 1))
+        self.client.force_authenticate(self.tenant)
+
+    def _initiate(self):
+        response = self.client.post(
+            reverse("stk-initiate"),
+            {"lease_id": self.lease.id, "phone_number": "254700000001", "amount": "10000.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 202)
+        return response
+
+    @patch("core.daraja.stk_push")
+    def test_initiate_queues_without_calling_daraja(self, mock_push, _missing):
+        response = self._initiate()
+        mock_push.assert_not_called()
+        outbox = StkPushOutbox.objects.get(payment_id=response.data["payment"]["id"])
+        self.assertEqual(outbox.status, StkPushOutbox.STATUS_PENDING)
+
+        poll = self.client.get(response.data["status_url"])
+        self.assertEqual((poll.data["status"], poll.data["push_status"]), ("pending", "pending"))
+        self.assertEqual(poll["Retry-After"], "2")
+
+    @patch("core.daraja.stk_push")
+    def test_worker_sends_concurrently_and_records_ids(self, mock_push, _missing):
+        mock_push.side_effect = lambda phone, amount, ref: {"CheckoutRequestID": f"co-{phone}", "MerchantRequestID": "m", "ResponseCode": "0"}
+        payments = [
+            PaymentTransaction.objects.create(
+                lease=self.lease,
+                tenant=self.tenant,
+                period="2024-03",
+                phone_number=f"2547000000{index:02d}",
+                amount=Decimal("100.00"),
+            )
+            for index in range(5)
+        ]
+        StkPushOutbox.objects.bulk_create([StkPushOutbox(payment=payment) for payment in payments])
+
+        call_command("run_stk_worker", "--once", "--concurrency", "3", stdout=StringIO())
+
+        self.assertEqual(mock_push.call_count, 5)
+        self.assertFalse(StkPushOutbox.objects.exclude(status=StkPushOutbox.STATUS_SENT).exists())
+        self.assertEqual(PaymentTransaction.objects.get(pk=payments[2].pk).checkout_request_id, "co-254700000002")
+
+    @patch("core.daraja.stk_push", return_value=None)
+    def test_failed_push_retries_then_fails_payment(self, mock_push, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        for _ in range(STK_PUSH_MAX_ATTEMPTS):
+            StkPushOutbox.objects.filter(payment_id=payment_id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            dispatch_stk_outbox()
+
+        outbox = StkPushOutbox.objects.get(payment_id=payment_id)
+        self.assertEqual((outbox.status, outbox.attempts), (StkPushOutbox.STATUS_FAILED, STK_PUSH_MAX_ATTEMPTS))
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_FAILED)
+        self.assertEqual(mock_push.call_count, STK_PUSH_MAX_ATTEMPTS)
+
+    @patch("core.daraja.stk_push", side_effect=URLError("Connection refused"))
+    def test_connect_failure_is_retried(self, mock_push, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        dispatch_stk_outbox()
+
+        outbox = StkPushOutbox.objects.get(payment_id=payment_id)
+        self.assertEqual((outbox.status, outbox.attempts), (StkPushOutbox.STATUS_PENDING, 1))
+
+    @patch("core.daraja.stk_push", side_effect=TimeoutError("The read operation timed out"))
+    def test_read_timeout_is_not_pushed_again(self, mock_push, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        dispatch_stk_outbox()
+        StkPushOutbox.objects.filter(payment_id=payment_id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        dispatch_stk_outbox()
+
+        self.assertEqual(mock_push.call_count, 1)
+        self.assertEqual(StkPushOutbox.objects.get(payment_id=payment_id).status, StkPushOutbox.STATUS_UNKNOWN)
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_PENDING)
+
+    @patch("core.daraja.stk_push", side_effect=TimeoutError("The read operation timed out"))
+    def test_callback_settles_a_push_with_unknown_outcome(self, mock_push, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        dispatch_stk_outbox()
+        payload = {
+            "Body": {
+                "stkCallback": {
+                    "MerchantRequestID": "m-late",
+                    "CheckoutRequestID": "co-late",
+                    "ResultCode": 0,
+                    "ResultDesc": "OK",
+                    "CallbackMetadata": {
+                        "Item": [
+                            {"Name": "Amount", "Value": 10000},
+                            {"Name": "MpesaReceiptNumber", "Value": "RCPLATE"},
+                            {"Name": "PhoneNumber", "Value": 254700000001},
+                        ]
+                    },
+                }
+            }
+        }
+        self.assertEqual(self.client.post(reverse("stk-callback"), payload, format="json").status_code, 200)
+
+        payment = PaymentTransaction.objects.get(pk=payment_id)
+        self.assertEqual((payment.status, payment.checkout_request_id, payment.mpesa_receipt), (PaymentTransaction.STATUS_SUCCESS, "co-late", "RCPLATE"))
+        self.assertEqual(StkPushOutbox.objects.get(payment_id=payment_id).status, StkPushOutbox.STATUS_SENT)
+
+    @patch("core.daraja.stk_push", side_effect=TimeoutError("The read operation timed out"))
+    def test_unconfirmed_push_is_failed_by_reconcile(self, mock_push, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        dispatch_stk_outbox()
+        reconcile_pending_payments()
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_PENDING)
+
+        StkPushOutbox.objects.filter(payment_id=payment_id).update(updated_at=timezone.now() - STK_PUSH_UNKNOWN_WINDOW)
+        self.assertEqual(reconcile_pending_payments()["failed"], 1)
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_FAILED)
+        self.assertEqual(StkPushOutbox.objects.get(payment_id=payment_id).status, StkPushOutbox.STATUS_FAILED)
+
+    def test_push_stuck_in_sending_leaves_the_payment_pending(self, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        StkPushOutbox.objects.filter(payment_id=payment_id).update(
+            status=StkPushOutbox.STATUS_SENDING,
+            claimed_at=timezone.now() - STK_PUSH_SEND_TIMEOUT - timedelta(seconds=1),
+        )
+        with self.assertLogs("core.payments", level="WARNING"):
+            self.assertEqual(expire_stuck_stk_pushes(), 1)
+
+        self.assertEqual(StkPushOutbox.objects.get(payment_id=payment_id).status, StkPushOutbox.STATUS_UNKNOWN)
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_PENDING)
+
+    def test_expired_push_is_settled_by_reconcile(self, _missing):
+        payment_id = self._initiate().data["payment"]["id"]
+        StkPushOutbox.objects.filter(payment_id=payment_id).update(
+            status=StkPushOutbox.STATUS_SENDING,
+            claimed_at=timezone.now() - STK_PUSH_SEND_TIMEOUT - timedelta(seconds=1),
+        )
+        later = timezone.now() + STK_PUSH_UNKNOWN_WINDOW + timedelta(seconds=1)
+        with self.assertLogs("core.payments", level="WARNING"):
+            expire_stuck_stk_pushes()
+            with patch("core.payments.timezone.now", return_value=later):
+                summary = reconcile_pending_payments()
+
+        self.assertEqual((summary["checked"], summary["failed"]), (1, 1))
+        self.assertEqual(PaymentTransaction.objects.get(pk=payment_id).status, PaymentTransaction.STATUS_FAILED)
+        self.assertEqual(StkPushOutbox.objects.get(payment_id=payment_id).status, StkPushOutbox.STATUS_FAILED)
+        poll = self.client.get(reverse("payments-push-status", args=[payment_id]))
+        self.assertEqual(poll.data["status"], "failed")
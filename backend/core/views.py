@@ -1,28 +1,27 @@
-import base64
-import json
+import hmac
 import logging
-import os
 import random
-from datetime import datetime, timedelta
+import re
+from datetime import timedelta
 from decimal import Decimal
-from urllib import request as urllib_request
-from urllib.error import HTTPError
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
 from django.db import transaction
 from django.db.models import Q, Sum
+from django.http import HttpResponse
+from django.urls import reverse
 from django.utils import timezone
 from rest_framework import mixins, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from . import daraja, metrics
 from .models import (
-    LandlordBalance,
     LandlordSettings,
     LandlordPayout,
     Lease,
@@ -33,15 +32,31 @@ from .models import (
     PaymentTransaction,
     Profile,
     Property,
+    PropertyAccess,
+    RevenueRollup,
+    StkCallbackInbox,
+    StkPushOutbox,
     Tenant,
     TenantInvite,
     Unit,
+    adjust_landlord_balance,
+    adjust_wallet,
+    annotate_rent_paid_sum,
     compute_lease_rent_status,
+    compute_lease_rent_statuses,
+    landlord_balance_totals,
+    period_range,
+    release_matured_holds,
 )
+from .cache import get_or_compute, landlord_revenue_key
+from .exports import EXPORT_FORMATS, EXPORT_RENDERER_CLASSES, stream_export
+from .pagination import CreatedAtKeysetPagination, IdKeysetPagination, UpdatedAtKeysetPagination
+from .payments import CALLBACK_DUPLICATE, CALLBACK_UNMATCHED, apply_stk_callback, apply_wallet_to_current_rent
 from .serializers import (
     ChangePasswordSerializer,
     LandlordFollowupSerializer,
     LandlordReceiptSerializer,
+    LandlordRevenueRangeSerializer,
     LandlordRevenueSerializer,
     LandlordSignupSerializer,
     InviteAcceptSerializer,
@@ -60,218 +75,31 @@ from .serializers import (
     TenantSerializer,
     UnitSerializer,
     WalletWithdrawSerializer,
+    expanded_relations,
+    prime_rent_status_cache,
 )
 
 logger = logging.getLogger(__name__)
-LANDLORD_HOLD_DAYS = 2
 WALLET_WITHDRAW_HOLD_DAYS = 7
-WALLET_CREDIT_HOLD_DAYS = 7
+REVENUE_CACHE_SECONDS = 300
+REVENUE_RANGE_MAX_MONTHS = 120
+PERIOD_PATTERN = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
 
 
 def _get_role(user):
-    profile, _ = Profile.objects.get_or_create(user=user)
-    return profile.role
-
-
-def _scoped_properties(user):
-    role = _get_role(user)
-    if role == Profile.ROLE_LANDLORD:
-        return Property.objects.filter(landlord=user)
-    if role == Profile.ROLE_MANAGER:
-        return Property.objects.filter(manager=user)
-    if role == Profile.ROLE_TENANT:
-        return Property.objects.filter(units__leases__tenant=user, units__leases__status=Lease.STATUS_ACTIVE).distinct()
-    return Property.objects.none()
-
-
-def _unlock_wallet(profile):
-    now = timezone.now()
-    rows = LedgerTransaction.objects.filter(
-        user=profile.user,
-        kind=LedgerTransaction.KIND_WALLET_CREDIT,
-        status=LedgerTransaction.STATUS_LOCKED,
-        available_at__lte=now,
-    )
-    amount = sum((row.amount for row in rows), Decimal("0.00"))
-    if amount > 0:
-        rows.update(status=LedgerTransaction.STATUS_AVAILABLE)
-        profile.wallet_locked = max(profile.wallet_locked - amount, Decimal("0.00"))
-        profile.wallet_available += amount
-        profile.save(update_fields=["wallet_locked", "wallet_available", "updated_at"])
-
-
-def _unlock_landlord(balance):
-    now = timezone.now()
-    rows = LedgerTransaction.objects.filter(
-        user=balance.landlord,
-        kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
-        status=LedgerTransaction.STATUS_LOCKED,
-        available_at__lte=now,
-    )
-    amount = sum((row.amount for row in rows), Decimal("0.00"))
-    if amount > 0:
-        rows.update(status=LedgerTransaction.STATUS_AVAILABLE)
-        balance.locked_balance = max(balance.locked_balance - amount, Decimal("0.00"))
-        balance.available_balance += amount
-        balance.save(update_fields=["locked_balance", "available_balance", "updated_at"])
-
-
-def _apply_wallet_to_current_rent(lease):
-    profile, _ = Profile.objects.get_or_create(user=lease.tenant)
-    _unlock_wallet(profile)
-    rent_status = compute_lease_rent_status(lease)
-    due = max(rent_status["balance"], Decimal("0.00"))
-    if due <= 0 or profile.wallet_available <= 0:
-        return Decimal("0.00")
-    debit = min(profile.wallet_available, due)
-    if debit <= 0:
-        return Decimal("0.00")
-
-    period = timezone.localdate().strftime("%Y-%m")
-    PaymentTransaction.objects.create(
-        lease=lease,
-        tenant=lease.tenant,
-        period=period,
-        phone_number=profile.phone_number or "WALLET",
-        amount=debit,
-        status=PaymentTransaction.STATUS_SUCCESS,
-        result_desc="Auto wallet rent debit",
-        transaction_date=timezone.now(),
-        allocation_done=True,
-    )
-    profile.wallet_available -= debit
-    profile.save(update_fields=["wallet_available", "updated_at"])
-    LedgerTransaction.objects.create(
-        user=lease.tenant,
-        kind=LedgerTransaction.KIND_WALLET_DEBIT_RENT,
-        amount=debit,
-        status=LedgerTransaction.STATUS_PAID,
-        reference_text=f"lease:{lease.id};period:{period}",
-    )
-    landlord = lease.unit.property.landlord
-    lb, _ = LandlordBalance.objects.get_or_create(landlord=landlord)
-    lb.locked_balance += debit
-    lb.save(update_fields=["locked_balance", "updated_at"])
-    LedgerTransaction.objects.create(
-        user=landlord,
-        kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
-        amount=debit,
-        status=LedgerTransaction.STATUS_LOCKED,
-        available_at=timezone.now() + timedelta(days=LANDLORD_HOLD_DAYS),
-        reference_text=f"wallet_debit_lease:{lease.id}",
-    )
-    return debit
-
-
-def _allocate_success_payment(payment):
-    if payment.allocation_done or payment.status != PaymentTransaction.STATUS_SUCCESS:
-        return
-
-    lease = payment.lease
-    landlord = lease.unit.property.landlord
-    profile, _ = Profile.objects.get_or_create(user=payment.tenant)
-    landlord_balance, _ = LandlordBalance.objects.get_or_create(landlord=landlord)
-
-    with transaction.atomic():
-        rent_status = compute_lease_rent_status(lease, period=payment.period)
-        due_before = max(rent_status["balance"] + payment.amount, Decimal("0.00"))
-        rent_applied = min(payment.amount, due_before)
-        overpayment = payment.amount - rent_applied
-
-        if rent_applied > 0:
-            landlord_balance.locked_balance += rent_applied
-            landlord_balance.save(update_fields=["locked_balance", "updated_at"])
-            LedgerTransaction.objects.create(
-                user=landlord,
-                kind=LedgerTransaction.KIND_LANDLORD_CREDIT_RENT,
-                amount=rent_applied,
-                status=LedgerTransaction.STATUS_LOCKED,
-                available_at=timezone.now() + timedelta(days=LANDLORD_HOLD_DAYS),
-                reference_text=f"payment:{payment.id};lease:{lease.id}",
-            )
-
-        if overpayment > 0:
-            profile.wallet_locked += overpayment
-            profile.save(update_fields=["wallet_locked", "updated_at"])
-            LedgerTransaction.objects.create(
-                user=payment.tenant,
-                kind=LedgerTransaction.KIND_WALLET_CREDIT,
-                amount=overpayment,
-                status=LedgerTransaction.STATUS_LOCKED,
-                available_at=timezone.now() + timedelta(days=WALLET_CREDIT_HOLD_DAYS),
-                reference_text=f"payment:{payment.id};lease:{lease.id}",
-            )
-
-        payment.allocation_done = True
-        payment.save(update_fields=["allocation_done"])
-
-
-def _daraja_access_token():
-    key = os.getenv("MPESA_CONSUMER_KEY", "")
-    secret = os.getenv("MPESA_CONSUMER_SECRET", "")
-    if not key or not secret:
-        return None
-    auth = base64.b64encode(f"{key}:{secret}".encode()).decode()
-    req = urllib_request.Request(
-        os.getenv("MPESA_OAUTH_URL", "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"),
-        headers={"Authorization": f"Basic {auth}"},
-    )
-    with urllib_request.urlopen(req, timeout=15) as resp:
-        payload = json.loads(resp.read().decode())
-        return payload.get("access_token")
-
-
-def _missing_daraja_env_vars():
-    required_vars = [
-        "MPESA_CONSUMER_KEY",
-        "MPESA_CONSUMER_SECRET",
-        "MPESA_SHORTCODE",
-        "MPESA_PASSKEY",
-        "MPESA_CALLBACK_URL",
-    ]
-    return [name for name in required_vars if not os.getenv(name)]
-
-
-def _daraja_stk_push(phone_number, amount, reference):
-    shortcode = os.getenv("MPESA_SHORTCODE", "")
-    passkey = os.getenv("MPESA_PASSKEY", "")
-    callback_url = os.getenv("MPESA_CALLBACK_URL", "")
-    if not shortcode or not passkey or not callback_url:
-        return None
+    role = getattr(user, "krib_role", None)
+    if role is None:
+        profile, _ = Profile.objects.get_or_create(user=user)
+        role = user.krib_role = profile.role
+    return role
 
-    token = _daraja_access_token()
-    if not token:
-        return None
 
-    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
-    password = base64.b64encode(f"{shortcode}{passkey}{timestamp}".encode()).decode()
+def _scoped_property_ids(user):
+    return PropertyAccess.objects.filter(user=user, role=_get_role(user)).values("property_id")
 
-    payload = {
-        "BusinessShortCode": shortcode,
-        "Password": password,
-        "Timestamp": timestamp,
-        "TransactionType": "CustomerPayBillOnline",
-        "Amount": int(Decimal(amount)),
-        "PartyA": phone_number,
-        "PartyB": shortcode,
-        "PhoneNumber": phone_number,
-        "CallBackURL": callback_url,
-        "AccountReference": reference,
-        "TransactionDesc": "KRIB rent payment",
-    }
 
-    req = urllib_request.Request(
-        os.getenv("MPESA_STK_PUSH_URL", "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest"),
-        data=json.dumps(payload).encode(),
-        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib_request.urlopen(req, timeout=20) as resp:
-            return json.loads(resp.read().decode())
-    except HTTPError as exc:
-        logger.warning("Daraja STK push failed: %s", exc.read().decode())
-        return None
+def _scoped_properties(user):
+    return Property.objects.filter(id__in=_scoped_property_ids(user))
 
 
 @api_view(["GET", "PATCH"])
@@ -416,18 +244,43 @@ class ManagerInviteAcceptView(APIView):
         return Response({"detail": "Manager invite accepted.", "created": created})
 
 
+class ExpandableViewMixin:
+    def expanded_relations(self):
+        return expanded_relations(self.get_serializer_class(), self.request.query_params.getlist("expand"))
+
+
+class RentStatusCacheMixin:
+    rent_status_lease_attr = "lease"
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["rent_status_cache"] = {}
+        if self.request.query_params.get("rent_status", "").lower() in ["0", "false"]:
+            context["include_rent_status"] = False
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if args and kwargs.get("many") and self.rent_status_lease_attr:
+            lease_field = serializer.child.fields.get(self.rent_status_lease_attr)
+            if isinstance(lease_field, LeaseSerializer) and "rent_status" in lease_field.fields:
+                prime_rent_status_cache(serializer.context, [getattr(obj, self.rent_status_lease_attr) for obj in args[0]])
+        return serializer
+
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all().order_by("id")
     serializer_class = TenantSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdKeysetPagination
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(ExpandableViewMixin, viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return _scoped_properties(self.request.user).order_by("id")
+        return _scoped_properties(self.request.user).select_related(*self.expanded_relations()).order_by("id")
 
     def perform_create(self, serializer):
         role = _get_role(self.request.user)
@@ -436,13 +289,12 @@ class PropertyViewSet(viewsets.ModelViewSet):
         serializer.save(landlord=self.request.user)
 
 
-class UnitViewSet(viewsets.ModelViewSet):
+class UnitViewSet(ExpandableViewMixin, viewsets.ModelViewSet):
     serializer_class = UnitSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        props = _scoped_properties(self.request.user)
-        return Unit.objects.filter(property__in=props).select_related("property").order_by("id")
+        return Unit.objects.filter(property_id__in=_scoped_property_ids(self.request.user)).select_related(*self.expanded_relations()).order_by("id")
 
     def perform_create(self, serializer):
         role = _get_role(self.request.user)
@@ -450,22 +302,26 @@ class UnitViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Only landlord/manager can create units")
 
         unit_property = serializer.validated_data["property"]
-        if unit_property not in _scoped_properties(self.request.user):
+        if not _scoped_properties(self.request.user).filter(pk=unit_property.pk).exists():
             raise PermissionDenied("Cannot create units outside your assigned properties")
 
         serializer.save()
 
 
-class LeaseViewSet(viewsets.ModelViewSet):
+class LeaseViewSet(ExpandableViewMixin, RentStatusCacheMixin, viewsets.ModelViewSet):
     serializer_class = LeaseSerializer
     permission_classes = [IsAuthenticated]
+    rent_status_lease_attr = None
 
     def get_queryset(self):
         user = self.request.user
         role = _get_role(user)
         if role == Profile.ROLE_TENANT:
-            return Lease.objects.filter(tenant=user).select_related("unit", "unit__property", "tenant")
-        return Lease.objects.filter(unit__property__in=_scoped_properties(user)).select_related("unit", "unit__property", "tenant")
+            qs = Lease.objects.filter(tenant=user)
+        else:
+            qs = Lease.objects.filter(unit__property_id__in=_scoped_property_ids(user))
+        qs = qs.select_related(*self.expanded_relations())
+        return annotate_rent_paid_sum(qs, timezone.localdate().strftime("%Y-%m"))
 
     def perform_create(self, serializer):
         role = _get_role(self.request.user)
@@ -473,13 +329,13 @@ class LeaseViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Only landlord/manager can create leases")
 
         lease_unit = serializer.validated_data["unit"]
-        if lease_unit.property not in _scoped_properties(self.request.user):
+        if not _scoped_properties(self.request.user).filter(pk=lease_unit.property_id).exists():
             raise PermissionDenied("Cannot create leases outside your assigned properties")
 
         serializer.save()
 
 
-class InviteViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+class InviteViewSet(ExpandableViewMixin, mixins.ListModelMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = TenantInvite.objects.all().order_by("-id")
     serializer_class = TenantInviteSerializer
 
@@ -492,11 +348,12 @@ class InviteViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.Retri
         if self.action in ["retrieve", "verify_otp", "accept"]:
             return TenantInvite.objects.all()
         role = _get_role(self.request.user)
+        qs = TenantInvite.objects.select_related(*self.expanded_relations())
         if role == Profile.ROLE_LANDLORD:
-            return TenantInvite.objects.filter(invited_by=self.request.user)
+            return qs.filter(invited_by=self.request.user)
         if role == Profile.ROLE_MANAGER:
-            return TenantInvite.objects.filter(property__manager=self.request.user)
-        return TenantInvite.objects.none()
+            return qs.filter(property_id__in=_scoped_property_ids(self.request.user))
+        return qs.none()
 
     def create(self, request, *args, **kwargs):
         role = _get_role(request.user)
@@ -562,7 +419,7 @@ class STKInitiateView(APIView):
         if _get_role(request.user) != Profile.ROLE_TENANT:
             return Response({"detail": "Only tenants can initiate payment."}, status=403)
 
-        missing_env_vars = _missing_daraja_env_vars()
+        missing_env_vars = daraja.missing_env_vars()
         if missing_env_vars:
             return Response(
                 {
@@ -578,26 +435,27 @@ class STKInitiateView(APIView):
         if lease.tenant != request.user or lease.status != Lease.STATUS_ACTIVE:
             return Response({"detail": "You can only pay your active lease."}, status=403)
 
-        _apply_wallet_to_current_rent(lease)
+        apply_wallet_to_current_rent(lease)
         period = timezone.localdate().strftime("%Y-%m")
-        payment = PaymentTransaction.objects.create(
-            lease=lease,
-            tenant=request.user,
-            period=period,
-            phone_number=serializer.validated_data["phone_number"],
-            amount=serializer.validated_data["amount"],
-            status=PaymentTransaction.STATUS_PENDING,
-        )
-
-        result = _daraja_stk_push(payment.phone_number, payment.amount, f"LEASE-{lease.id}")
-        if result:
-            payment.merchant_request_id = result.get("MerchantRequestID")
-            payment.checkout_request_id = result.get("CheckoutRequestID")
-            payment.result_code = result.get("ResponseCode")
-            payment.result_desc = result.get("ResponseDescription")
-            payment.save(update_fields=["merchant_request_id", "checkout_request_id", "result_code", "result_desc"])
+        with transaction.atomic():
+            payment = PaymentTransaction.objects.create(
+                lease=lease,
+                tenant=request.user,
+                period=period,
+                phone_number=serializer.validated_data["phone_number"],
+                amount=serializer.validated_data["amount"],
+                status=PaymentTransaction.STATUS_PENDING,
+            )
+            StkPushOutbox.objects.create(payment=payment)
 
-        return Response({"detail": "STK push initiated.", "payment": PaymentTransactionSerializer(payment).data}, status=201)
+        return Response(
+            {
+                "detail": "STK push queued.",
+                "payment": PaymentTransactionSerializer(payment).data,
+                "status_url": reverse("payments-push-status", args=[payment.id]),
+            },
+            status=202,
+        )
 
 
 class STKCallbackView(APIView):
@@ -605,76 +463,54 @@ class STKCallbackView(APIView):
     authentication_classes = []
 
     def post(self, request):
-        body = request.data.get("Body", {})
-        callback = body.get("stkCallback", {})
-        checkout_request_id = callback.get("CheckoutRequestID")
-        result_code = callback.get("ResultCode")
-        result_desc = callback.get("ResultDesc")
-        items = callback.get("CallbackMetadata", {}).get("Item", [])
-
-        metadata = {item.get("Name"): item.get("Value") for item in items if "Name" in item}
-        mpesa_receipt = metadata.get("MpesaReceiptNumber")
-        transaction_date = metadata.get("TransactionDate")
-
-        payment = PaymentTransaction.objects.filter(checkout_request_id=checkout_request_id).first()
-        if not payment:
-            logger.warning("Unmatched STK callback received", extra={"checkout_request_id": checkout_request_id})
-            return Response({"detail": "No matching payment."}, status=404)
-
-        if payment.status != PaymentTransaction.STATUS_PENDING:
-            logger.info(
-                "Duplicate STK callback ignored",
-                extra={
-                    "payment_id": payment.id,
-                    "checkout_request_id": checkout_request_id,
-                    "current_status": payment.status,
-                    "incoming_result_code": result_code,
-                },
+        if settings.STK_CALLBACK_MODE == "deferred":
+            checkout_request_id = request.data.get("Body", {}).get("stkCallback", {}).get("CheckoutRequestID")
+            if not checkout_request_id:
+                return Response({"detail": "Missing CheckoutRequestID."}, status=400)
+            StkCallbackInbox.objects.bulk_create(
+                [StkCallbackInbox(checkout_request_id=checkout_request_id, payload=request.data)],
+                ignore_conflicts=True,
             )
-            return Response({"detail": "Duplicate callback ignored."})
+            return Response({"detail": "Callback accepted."})
 
-        payment.raw_callback = request.data
-        payment.result_code = result_code
-        payment.result_desc = result_desc
-        payment.mpesa_receipt = mpesa_receipt
-        if transaction_date:
-            try:
-                parsed = datetime.strptime(str(transaction_date), "%Y%m%d%H%M%S")
-                payment.transaction_date = timezone.make_aware(parsed, timezone.get_current_timezone())
-            except ValueError:
-                payment.transaction_date = timezone.now()
-
-        payment.status = PaymentTransaction.STATUS_SUCCESS if result_code == 0 else PaymentTransaction.STATUS_FAILED
-        payment.save(
-            update_fields=["raw_callback", "result_code", "result_desc", "mpesa_receipt", "transaction_date", "status"]
-        )
-        logger.info(
-            "STK callback transition processed",
-            extra={
-                "payment_id": payment.id,
-                "checkout_request_id": checkout_request_id,
-                "status": payment.status,
-                "result_code": result_code,
-            },
-        )
-        if payment.status == PaymentTransaction.STATUS_SUCCESS:
-            _allocate_success_payment(payment)
+        outcome, _ = apply_stk_callback(request.data)
+        if outcome == CALLBACK_UNMATCHED:
+            return Response({"detail": "No matching payment."}, status=404)
+        if outcome == CALLBACK_DUPLICATE:
+            return Response({"detail": "Duplicate callback ignored."})
         return Response({"detail": "Callback processed."})
 
 
-class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
+class PaymentViewSet(ExpandableViewMixin, RentStatusCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PaymentTransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
+    renderer_classes = EXPORT_RENDERER_CLASSES
+    export_columns = [
+        ("id", "id"),
+        ("lease_id", "lease_id"),
+        ("tenant_id", "tenant_id"),
+        ("period", "period"),
+        ("phone_number", "phone_number"),
+        ("amount", "amount"),
+        ("merchant_request_id", "merchant_request_id"),
+        ("checkout_request_id", "checkout_request_id"),
+        ("status", "status"),
+        ("mpesa_receipt", "mpesa_receipt"),
+        ("receipt_pending", "receipt_pending"),
+        ("result_code", "result_code"),
+        ("result_desc", "result_desc"),
+        ("transaction_date", "transaction_date"),
+        ("created_at", "created_at"),
+    ]
 
     def get_queryset(self):
         role = _get_role(self.request.user)
-        qs = PaymentTransaction.objects.select_related("lease", "lease__unit", "lease__unit__property", "tenant")
+        qs = PaymentTransaction.objects.select_related(*self.expanded_relations())
         if role == Profile.ROLE_TENANT:
             qs = qs.filter(tenant=self.request.user)
-        elif role == Profile.ROLE_MANAGER:
-            qs = qs.filter(lease__unit__property__manager=self.request.user)
-        elif role == Profile.ROLE_LANDLORD:
-            qs = qs.filter(lease__unit__property__landlord=self.request.user)
+        elif role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER]:
+            qs = qs.filter(lease__unit__property_id__in=_scoped_property_ids(self.request.user))
         else:
             return qs.none()
 
@@ -688,20 +524,43 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
 
         return qs.order_by("-created_at")
 
+    @action(detail=True, methods=["get"], url_path="status")
+    def push_status(self, request, pk=None):
+        payment = self.get_object()
+        outbox = StkPushOutbox.objects.filter(payment=payment).first()
+        response = Response(
+            {
+                "id": payment.id,
+                "status": payment.status,
+                "push_status": outbox.status if outbox else None,
+                "checkout_request_id": payment.checkout_request_id,
+                "mpesa_receipt": payment.mpesa_receipt,
+                "result_desc": payment.result_desc,
+            }
+        )
+        if payment.status == PaymentTransaction.STATUS_PENDING:
+            response["Retry-After"] = "2"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format in EXPORT_FORMATS:
+            queryset = self.filter_queryset(self.get_queryset()).select_related(None).order_by("-created_at", "-id")
+            return stream_export(queryset, self.export_columns, request.accepted_renderer.format, "payments")
+        return super().list(request, *args, **kwargs)
 
-class MaintenanceViewSet(viewsets.ModelViewSet):
+
+class MaintenanceViewSet(ExpandableViewMixin, RentStatusCacheMixin, viewsets.ModelViewSet):
     serializer_class = MaintenanceRequestSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UpdatedAtKeysetPagination
 
     def get_queryset(self):
         role = _get_role(self.request.user)
-        qs = MaintenanceRequest.objects.select_related("tenant", "lease", "lease__unit", "lease__unit__property")
+        qs = MaintenanceRequest.objects.select_related(*self.expanded_relations())
         if role == Profile.ROLE_TENANT:
             return qs.filter(tenant=self.request.user).order_by("-updated_at")
-        if role == Profile.ROLE_MANAGER:
-            return qs.filter(lease__unit__property__manager=self.request.user).order_by("-updated_at")
-        if role == Profile.ROLE_LANDLORD:
-            return qs.filter(lease__unit__property__landlord=self.request.user).order_by("-updated_at")
+        if role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER]:
+            return qs.filter(lease__unit__property_id__in=_scoped_property_ids(self.request.user)).order_by("-updated_at")
         return qs.none()
 
     def perform_create(self, serializer):
@@ -714,22 +573,23 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
         serializer.save(tenant=self.request.user)
 
 
-class TenantViewSet(viewsets.ReadOnlyModelViewSet):
+class TenantViewSet(ExpandableViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TenantSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         role = _get_role(self.request.user)
-        if role == Profile.ROLE_LANDLORD:
-            return Tenant.objects.filter(user__leases__unit__property__landlord=self.request.user).distinct()
-        if role == Profile.ROLE_MANAGER:
-            return Tenant.objects.filter(user__leases__unit__property__manager=self.request.user).distinct()
-        return Tenant.objects.filter(user=self.request.user)
+        qs = Tenant.objects.select_related(*self.expanded_relations())
+        if role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER]:
+            tenant_ids = Lease.objects.filter(unit__property_id__in=_scoped_property_ids(self.request.user)).values("tenant_id")
+            return qs.filter(user_id__in=tenant_ids)
+        return qs.filter(user=self.request.user)
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by("-created_at")
@@ -749,14 +609,17 @@ def dashboard_summary(request):
         )
         if not lease:
             return Response({"active_lease": None, "rent": {}, "payments": [], "maintenance": [], "show_overdue_banner": False})
-        _apply_wallet_to_current_rent(lease)
         rent = compute_lease_rent_status(lease, period=period)
         payments = PaymentTransaction.objects.filter(tenant=request.user).order_by("-created_at")[:10]
         maintenance = MaintenanceRequest.objects.filter(tenant=request.user).order_by("-updated_at")[:10]
         return Response(
             {
                 "period": period,
-                "active_lease": LeaseSerializer(lease, context={"period": period}).data,
+                "active_lease": LeaseSerializer(
+                    lease,
+                    expand=["unit.property"],
+                    context={"period": period, "rent_status_cache": {(lease.id, period): rent}},
+                ).data,
                 "rent": rent,
                 "payments": PaymentTransactionSerializer(payments, many=True).data,
                 "maintenance": MaintenanceRequestSerializer(maintenance, many=True).data,
@@ -765,18 +628,17 @@ def dashboard_summary(request):
         )
 
     leases = Lease.objects.filter(status=Lease.STATUS_ACTIVE)
-    if role == Profile.ROLE_MANAGER:
-        leases = leases.filter(unit__property__manager=request.user)
-    elif role == Profile.ROLE_LANDLORD:
-        leases = leases.filter(unit__property__landlord=request.user)
+    if role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER]:
+        leases = leases.filter(unit__property_id__in=_scoped_property_ids(request.user))
 
     lists = {"PAID": [], "PARTIAL": [], "UNPAID": [], "OVERDUE": []}
     expected = Decimal("0.00")
     collected = Decimal("0.00")
     outstanding = Decimal("0.00")
 
-    for lease in leases.select_related("tenant", "unit", "unit__property"):
-        status_row = compute_lease_rent_status(lease, period=period)
+    rent_status_cache = {}
+    for lease, status_row in compute_lease_rent_statuses(leases.select_related("tenant", "unit", "unit__property"), period=period):
+        rent_status_cache[(lease.id, period)] = status_row
         expected += status_row["rent_due"]
         collected += status_row["paid_sum"]
         outstanding += max(status_row["balance"], Decimal("0.00"))
@@ -793,17 +655,23 @@ def dashboard_summary(request):
         )
 
     maintenance_qs = MaintenanceRequest.objects.select_related("tenant", "lease", "lease__unit", "lease__unit__property")
-    if role == Profile.ROLE_MANAGER:
-        maintenance_qs = maintenance_qs.filter(lease__unit__property__manager=request.user)
-    elif role == Profile.ROLE_LANDLORD:
-        maintenance_qs = maintenance_qs.filter(lease__unit__property__landlord=request.user)
+    if role in [Profile.ROLE_LANDLORD, Profile.ROLE_MANAGER]:
+        maintenance_qs = maintenance_qs.filter(lease__unit__property_id__in=_scoped_property_ids(request.user))
+    maintenance = list(maintenance_qs.order_by("-updated_at")[:20])
+    maintenance_serializer = MaintenanceRequestSerializer(
+        maintenance,
+        many=True,
+        expand=["tenant", "lease.unit.property"],
+        context={"rent_status_cache": rent_status_cache},
+    )
+    prime_rent_status_cache(maintenance_serializer.context, [row.lease for row in maintenance])
 
     return Response(
         {
             "period": period,
             "totals": {"expected": expected, "collected": collected, "outstanding": outstanding},
             "lists": lists,
-            "maintenance": MaintenanceRequestSerializer(maintenance_qs.order_by("-updated_at")[:20], many=True).data,
+            "maintenance": maintenance_serializer.data,
         }
     )
 
@@ -815,19 +683,20 @@ class WalletView(APIView):
         if _get_role(request.user) != Profile.ROLE_TENANT:
             return Response({"detail": "Tenant only endpoint"}, status=403)
         profile, _ = Profile.objects.get_or_create(user=request.user)
-        _unlock_wallet(profile)
         recent = LedgerTransaction.objects.filter(user=request.user, kind__startswith="WALLET").order_by("-created_at")[:20]
         pending_withdrawals = LedgerTransaction.objects.filter(
             user=request.user,
             kind=LedgerTransaction.KIND_WALLET_WITHDRAW_REQUEST,
             status=LedgerTransaction.STATUS_PENDING,
-        ).order_by("-created_at")
+        )
+        paginator = CreatedAtKeysetPagination()
+        page = paginator.paginate_queryset(pending_withdrawals, request, view=self)
         return Response(
             {
                 "wallet_available": profile.wallet_available,
                 "wallet_locked": profile.wallet_locked,
                 "recent": LedgerTransactionSerializer(recent, many=True).data,
-                "pending_withdrawals": LedgerTransactionSerializer(pending_withdrawals, many=True).data,
+                "pending_withdrawals": paginator.get_page_payload(LedgerTransactionSerializer(page, many=True).data),
             }
         )
 
@@ -843,21 +712,18 @@ class WalletWithdrawView(APIView):
         amount = serializer.validated_data["amount"]
         if amount <= 0:
             return Response({"detail": "Amount must be greater than zero"}, status=400)
-        profile, _ = Profile.objects.get_or_create(user=request.user)
-        _unlock_wallet(profile)
-        if amount > profile.wallet_available:
-            return Response({"detail": "Insufficient wallet balance"}, status=400)
-
-        profile.wallet_available -= amount
-        profile.save(update_fields=["wallet_available", "updated_at"])
-        row = LedgerTransaction.objects.create(
-            user=request.user,
-            kind=LedgerTransaction.KIND_WALLET_WITHDRAW_REQUEST,
-            amount=amount,
-            status=LedgerTransaction.STATUS_PENDING,
-            available_at=timezone.now() + timedelta(days=WALLET_WITHDRAW_HOLD_DAYS),
-            reference_text="Withdrawals are processed after 7 days",
-        )
+        release_matured_holds(user_ids=[request.user.id])
+        with transaction.atomic():
+            if not adjust_wallet(request.user.id, "wallet_available", -amount):
+                return Response({"detail": "Insufficient wallet balance"}, status=400)
+            row = LedgerTransaction.objects.create(
+                user=request.user,
+                kind=LedgerTransaction.KIND_WALLET_WITHDRAW_REQUEST,
+                amount=amount,
+                status=LedgerTransaction.STATUS_PENDING,
+                available_at=timezone.now() + timedelta(days=WALLET_WITHDRAW_HOLD_DAYS),
+                reference_text="Withdrawals are processed after 7 days",
+            )
         return Response(LedgerTransactionSerializer(row).data, status=201)
 
 
@@ -891,14 +757,14 @@ class LandlordPayoutsView(APIView):
     def get(self, request):
         if _get_role(request.user) != Profile.ROLE_LANDLORD:
             return Response({"detail": "Landlord only endpoint"}, status=403)
-        balance, _ = LandlordBalance.objects.get_or_create(landlord=request.user)
-        _unlock_landlord(balance)
-        payouts = LandlordPayout.objects.filter(landlord=request.user).order_by("-created_at")
+        balance = landlord_balance_totals(request.user.id)
+        paginator = CreatedAtKeysetPagination()
+        page = paginator.paginate_queryset(LandlordPayout.objects.filter(landlord=request.user), request, view=self)
         return Response(
             {
-                "available_balance": balance.available_balance,
-                "locked_balance": balance.locked_balance,
-                "payout_requests": LandlordPayoutSerializer(payouts, many=True).data,
+                "available_balance": balance["available_balance"],
+                "locked_balance": balance["locked_balance"],
+                "payout_requests": paginator.get_page_payload(LandlordPayoutSerializer(page, many=True).data),
             }
         )
 
@@ -915,27 +781,24 @@ class LandlordPayoutRequestView(APIView):
         if amount <= 0:
             return Response({"detail": "Amount must be greater than zero"}, status=400)
 
-        balance, _ = LandlordBalance.objects.get_or_create(landlord=request.user)
-        _unlock_landlord(balance)
-        if amount > balance.available_balance:
-            return Response({"detail": "Insufficient available balance"}, status=400)
-
-        balance.available_balance -= amount
-        balance.save(update_fields=["available_balance", "updated_at"])
-        payout = LandlordPayout.objects.create(
-            landlord=request.user,
-            amount=amount,
-            method=serializer.validated_data["method"],
-            destination=serializer.validated_data["destination"],
-            status=LandlordPayout.STATUS_PENDING,
-        )
-        LedgerTransaction.objects.create(
-            user=request.user,
-            kind=LedgerTransaction.KIND_LANDLORD_PAYOUT_REQUEST,
-            amount=amount,
-            status=LedgerTransaction.STATUS_PENDING,
-            reference_text=f"payout:{payout.id}",
-        )
+        release_matured_holds(user_ids=[request.user.id])
+        with transaction.atomic():
+            if not adjust_landlord_balance(request.user.id, "available_balance", -amount):
+                return Response({"detail": "Insufficient available balance"}, status=400)
+            payout = LandlordPayout.objects.create(
+                landlord=request.user,
+                amount=amount,
+                method=serializer.validated_data["method"],
+                destination=serializer.validated_data["destination"],
+                status=LandlordPayout.STATUS_PENDING,
+            )
+            LedgerTransaction.objects.create(
+                user=request.user,
+                kind=LedgerTransaction.KIND_LANDLORD_PAYOUT_REQUEST,
+                amount=amount,
+                status=LedgerTransaction.STATUS_PENDING,
+                reference_text=f"payout:{payout.id}",
+            )
         return Response(LandlordPayoutSerializer(payout).data, status=201)
 
 
@@ -965,54 +828,116 @@ class LandlordPayoutMarkPaidView(APIView):
         return Response({"detail": "Payout marked paid"})
 
 
+def _landlord_revenue_total(user, period=None):
+    def compute():
+        payments = PaymentTransaction.objects.filter(
+            lease__unit__property_id__in=_scoped_property_ids(user),
+            status=PaymentTransaction.STATUS_SUCCESS,
+        )
+        if period:
+            payments = payments.filter(period=period)
+        return payments.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+
+    return get_or_compute(landlord_revenue_key(user.id, period), compute, REVENUE_CACHE_SECONDS)
+
+
+def _landlord_revenue_range(user, start, end):
+    zero = Decimal("0.00")
+    rollups = (
+        RevenueRollup.objects.filter(landlord=user, period__gte=start, period__lte=end)
+        .values("period")
+        .annotate(
+            gross_collected=Sum("gross_collected"),
+            wallet_applied=Sum("wallet_applied"),
+            expected_rent=Sum("expected_rent"),
+            payment_count=Sum("payment_count"),
+        )
+    )
+    by_period = {row["period"]: row for row in rollups}
+    periods = [
+        by_period.get(period, {"period": period, "gross_collected": zero, "wallet_applied": zero, "expected_rent": zero, "payment_count": 0})
+        for period in period_range(start, end)
+    ]
+    for row in periods:
+        row["net_amount"] = row["gross_collected"]
+    totals = {
+        name: sum((row[name] for row in periods), zero)
+        for name in ["gross_collected", "wallet_applied", "net_amount", "expected_rent"]
+    }
+    return {**totals, "payment_count": sum(row["payment_count"] for row in periods), "periods": periods}
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def landlord_revenue(request):
     if _get_role(request.user) != Profile.ROLE_LANDLORD:
         return Response({"detail": "Landlord only endpoint"}, status=403)
 
-    period = request.GET.get("period")
-    payments = PaymentTransaction.objects.filter(
-        lease__unit__property__landlord=request.user,
-        status=PaymentTransaction.STATUS_SUCCESS,
-    )
-    if period:
-        payments = payments.filter(period=period)
+    start = request.GET.get("from")
+    end = request.GET.get("to") or timezone.localdate().strftime("%Y-%m")
+    if start or request.GET.get("to"):
+        if not start or not PERIOD_PATTERN.fullmatch(start) or not PERIOD_PATTERN.fullmatch(end):
+            return Response({"detail": "Provide from (and optionally to) as YYYY-MM."}, status=400)
+        months = len(period_range(start, end))
+        if not 0 < months <= REVENUE_RANGE_MAX_MONTHS:
+            return Response({"detail": f"from must not be after to, and the range is limited to {REVENUE_RANGE_MAX_MONTHS} months."}, status=400)
+        payload = LandlordRevenueRangeSerializer(_landlord_revenue_range(request.user, start, end)).data
+        return Response({"from": start, "to": end, **payload})
 
-    gross = payments.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    period = request.GET.get("period")
+    lifetime_gross = _landlord_revenue_total(request.user)
+    gross = _landlord_revenue_total(request.user, period) if period else lifetime_gross
     payload = {
         "period": period,
         "gross_collected": gross,
         "net_amount": gross,
+        "lifetime": {
+            "gross_collected": lifetime_gross,
+            "net_amount": lifetime_gross,
+        },
     }
+    return Response(LandlordRevenueSerializer(payload).data)
 
-    all_payments = PaymentTransaction.objects.filter(
-        lease__unit__property__landlord=request.user,
-        status=PaymentTransaction.STATUS_SUCCESS,
-    )
-    lifetime_gross = all_payments.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
-    payload["lifetime"] = {
-        "gross_collected": lifetime_gross,
-        "net_amount": lifetime_gross,
-    }
 
-    return Response(LandlordRevenueSerializer(payload).data)
+LANDLORD_RECEIPT_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("mpesa_receipt", "mpesa_receipt"),
+    ("tenant_username", "tenant__username"),
+    ("tenant_email", "tenant__email"),
+    ("property_name", "lease__unit__property__name"),
+    ("unit_number", "lease__unit__unit_number"),
+    ("amount", "amount"),
+    ("period", "period"),
+    ("status", "status"),
+    ("receipt_pending", "receipt_pending"),
+    ("created_at", "created_at"),
+]
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@renderer_classes(EXPORT_RENDERER_CLASSES)
 def landlord_receipts(request):
     if _get_role(request.user) != Profile.ROLE_LANDLORD:
         return Response({"detail": "Landlord only endpoint"}, status=403)
 
     period = request.GET.get("period")
     receipts = PaymentTransaction.objects.filter(
-        lease__unit__property__landlord=request.user,
+        lease__unit__property_id__in=_scoped_property_ids(request.user),
         status=PaymentTransaction.STATUS_SUCCESS,
     ).select_related("tenant", "lease", "lease__unit", "lease__unit__property").order_by("-created_at")
     if period:
         receipts = receipts.filter(period=period)
-    return Response(LandlordReceiptSerializer(receipts, many=True).data)
+    if request.accepted_renderer.format in EXPORT_FORMATS:
+        return stream_export(
+            receipts.select_related(None).order_by("-created_at", "-id"),
+            LANDLORD_RECEIPT_EXPORT_COLUMNS,
+            request.accepted_renderer.format,
+            f"receipts-{period or 'all'}",
+        )
+    paginator = CreatedAtKeysetPagination()
+    page = paginator.paginate_queryset(receipts, request)
+    return paginator.get_paginated_response(LandlordReceiptSerializer(page, many=True).data)
 
 
 @api_view(["GET"])
@@ -1024,12 +949,11 @@ def landlord_followups(request):
     period = request.GET.get("period") or timezone.localdate().strftime("%Y-%m")
     leases = Lease.objects.filter(
         status=Lease.STATUS_ACTIVE,
-        unit__property__landlord=request.user,
+        unit__property_id__in=_scoped_property_ids(request.user),
     ).select_related("tenant", "unit", "unit__property", "tenant__profile")
 
     rows = []
-    for lease in leases:
-        rent_row = compute_lease_rent_status(lease, period=period)
+    for lease, rent_row in compute_lease_rent_statuses(leases, period=period):
         if rent_row["status"] not in ["UNPAID", "PARTIAL", "OVERDUE"]:
             continue
         tenant_profile = getattr(lease.tenant, "profile", None)
@@ -1052,3 +976,12 @@ def landlord_followups(request):
         )
 
     return Response(LandlordFollowupSerializer(rows, many=True).data)
+
+
+def metrics_endpoint(request):
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse("Not found", status=404, content_type="text/plain")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(metrics.REGISTRY.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,35 @@
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+POSTGRES_SCHEMES = {"postgres", "postgresql", "pgsql"}
+
+
+def database_config(url, default_sqlite_path, conn_max_age=60, pool=False, pool_min_size=2, pool_max_size=10, sqlite_tuning=True):
+    sqlite_options = {"transaction_mode": "IMMEDIATE"} if sqlite_tuning else {}
+    if not url:
+        return {"ENGINE": "django.db.backends.sqlite3", "NAME": default_sqlite_path, "OPTIONS": sqlite_options}
+
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        # sqlite:///relative/path or sqlite:////absolute/path
+        path = unquote(parts.path)[1:]
+        return {"ENGINE": "django.db.backends.sqlite3", "NAME": path or default_sqlite_path, "OPTIONS": sqlite_options}
+
+    if parts.scheme not in POSTGRES_SCHEMES:
+        raise ValueError(f"Unsupported DATABASE_URL scheme: {parts.scheme}")
+
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": unquote(parts.path.lstrip("/")),
+        "USER": unquote(parts.username or ""),
+        "PASSWORD": unquote(parts.password or ""),
+        "HOST": parts.hostname or "",
+        "PORT": str(parts.port or ""),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": dict(parse_qsl(parts.query)),
+    }
+    if pool:
+        # Django hands pooled connections back on close, so persistent connections must be off.
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {"min_size": pool_min_size, "max_size": pool_max_size}
+    return config
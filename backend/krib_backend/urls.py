@@ -5,9 +5,12 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from core.views import metrics_endpoint
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/', include('core.urls')),  # your app routes
+    path('metrics', metrics_endpoint, name='metrics'),
 ]
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { Save, UserPlus } from "lucide-react";
-import api from "../services/api";
+import api, { getAllPages } from "../services/api";
 
 export default function AddProperty() {
   const [name, setName] = useState("");
@@ -15,11 +15,11 @@ export default function AddProperty() {
   const loadData = async () => {
     try {
       const [propRes, managersRes] = await Promise.all([
-        api.get("/api/properties/"),
-        api.get("/api/users/?role=manager"),
+        api.get("/api/properties/", { params: { expand: "manager" } }),
+        getAllPages("/api/users/", { params: { role: "manager" } }),
       ]);
       setProperties(propRes.data || []);
-      setManagers(managersRes.data || []);
+      setManagers(managersRes);
     } catch {
       setError("Failed to load properties/managers");
     }
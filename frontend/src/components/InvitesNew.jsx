@@ -10,7 +10,7 @@ export default function InvitesNew() {
   const [error, setError] = useState("");
 
   const load = async () => {
-    const [pRes, uRes, iRes] = await Promise.all([api.get('/api/properties/'), api.get('/api/units/'), api.get('/api/invites/')]);
+    const [pRes, uRes, iRes] = await Promise.all([api.get('/api/properties/'), api.get('/api/units/', { params: { expand: 'property' } }), api.get('/api/invites/')]);
     setProperties(pRes.data || []);
     setUnits(uRes.data || []);
     setInvites(iRes.data || []);
@@ -1,21 +1,34 @@
 import React, { useEffect, useState } from "react";
-import api from "../services/api";
+import { getPage } from "../services/api";
 import GlassCard from "./GlassCard";
 import StatusBadge from "./StatusBadge";
 import { formatKES } from "../utils/format";
 
 export default function LandlordReceipts() {
   const [rows, setRows] = useState([]);
+  const [next, setNext] = useState(null);
   const [period, setPeriod] = useState("");
 
   useEffect(() => {
+    let current = true;
     const load = async () => {
-      const res = await api.get("/api/landlord/receipts/", { params: period ? { period } : {} });
-      setRows(res.data);
+      const page = await getPage("/api/landlord/receipts/", { params: period ? { period } : {} });
+      if (!current) return;
+      setRows(page.rows);
+      setNext(page.next);
     };
     load();
+    return () => {
+      current = false;
+    };
   }, [period]);
 
+  const loadMore = async () => {
+    const page = await getPage(next);
+    setRows((previous) => [...previous, ...page.rows]);
+    setNext(page.next);
+  };
+
   return (
     <div className="dashboard-container">
       <GlassCard title="Receipts" actions={<input type="month" value={period} onChange={(e) => setPeriod(e.target.value)} />}>
@@ -45,6 +58,11 @@ export default function LandlordReceipts() {
             ))}
           </tbody>
         </table>
+        {next ? (
+          <button className="btn btn-glass" type="button" onClick={loadMore}>
+            Load more
+          </button>
+        ) : null}
       </GlassCard>
     </div>
   );
@@ -19,9 +19,9 @@ export default function LeasesNew() {
     setLoading(true);
     try {
       const [uRes, tRes, lRes] = await Promise.all([
-        api.get("/api/units/"),
-        api.get("/api/tenants/"),
-        api.get("/api/leases/"),
+        api.get("/api/units/", { params: { expand: "property" } }),
+        api.get("/api/tenants/", { params: { expand: "user" } }),
+        api.get("/api/leases/", { params: { expand: "tenant,unit.property" } }),
       ]);
       setUnits(uRes.data || []);
       setTenants(tRes.data || []);
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import { CircleDollarSign, FilePlus2, Landmark, Send, ShieldAlert } from "lucide-react";
-import api from "../services/api";
+import api, { getPage } from "../services/api";
 import { formatKES } from "../utils/format";
 import GradientCard from "./GradientCard";
 import GlassCard from "./GlassCard";
@@ -17,9 +17,9 @@ export default function ManagerDashboard() {
 
   const load = async () => {
     try {
-      const [sRes, mRes] = await Promise.all([api.get("/api/dashboard/summary/"), api.get("/api/maintenance/")]);
+      const [sRes, mRes] = await Promise.all([api.get("/api/dashboard/summary/"), getPage("/api/maintenance/", { params: { expand: "tenant,lease.unit.property", rent_status: 0, page_size: 5 } })]);
       setSummary(sRes.data);
-      setMaintenance(mRes.data || []);
+      setMaintenance(mRes.rows);
     } catch {
       setError("Failed to load manager data");
       setSummary({ period: "-", totals: { expected: 0, collected: 0, outstanding: 0 } });
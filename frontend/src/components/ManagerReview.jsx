@@ -1,23 +1,36 @@
 import React, { useEffect, useState } from "react";
-import api from "../services/api";
+import { getPage } from "../services/api";
 import GlassCard from "./GlassCard";
 import StatusBadge from "./StatusBadge";
 import { formatKES } from "../utils/format";
 
 export default function ManagerReview() {
   const [rows, setRows] = useState([]);
+  const [next, setNext] = useState(null);
   const [period, setPeriod] = useState("");
 
   useEffect(() => {
+    let current = true;
     const load = async () => {
-      const params = { status: "SUCCESS" };
+      const params = { status: "SUCCESS", expand: "tenant,lease.unit.property", rent_status: 0 };
       if (period) params.period = period;
-      const res = await api.get("/api/payments/", { params });
-      setRows(res.data || []);
+      const page = await getPage("/api/payments/", { params });
+      if (!current) return;
+      setRows(page.rows);
+      setNext(page.next);
     };
     load();
+    return () => {
+      current = false;
+    };
   }, [period]);
 
+  const loadMore = async () => {
+    const page = await getPage(next);
+    setRows((previous) => [...previous, ...page.rows]);
+    setNext(page.next);
+  };
+
   return (
     <div className="dashboard-container">
       <GlassCard title="Payments Review" actions={<input type="month" value={period} onChange={(e) => setPeriod(e.target.value)} />}>
@@ -47,6 +60,11 @@ export default function ManagerReview() {
             ))}
           </tbody>
         </table>
+        {next ? (
+          <button className="btn btn-glass" type="button" onClick={loadMore}>
+            Load more
+          </button>
+        ) : null}
       </GlassCard>
     </div>
   );
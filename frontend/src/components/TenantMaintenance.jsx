@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { Send } from "lucide-react";
-import api from "../services/api";
+import api, { getPage } from "../services/api";
 import GlassCard from "./GlassCard";
 import StatusBadge from "./StatusBadge";
 
@@ -8,13 +8,25 @@ export default function TenantMaintenance() {
   const [leaseId, setLeaseId] = useState(null);
   const [issue, setIssue] = useState("");
   const [maintenance, setMaintenance] = useState([]);
+  const [next, setNext] = useState(null);
   const [error, setError] = useState("");
 
   const load = async () => {
     try {
-      const [summaryRes, maintRes] = await Promise.all([api.get("/api/dashboard/summary/"), api.get("/api/maintenance/")]);
+      const [summaryRes, page] = await Promise.all([api.get("/api/dashboard/summary/"), getPage("/api/maintenance/")]);
       setLeaseId(summaryRes.data?.active_lease?.id || null);
-      setMaintenance(maintRes.data || []);
+      setMaintenance(page.rows);
+      setNext(page.next);
+    } catch {
+      setError("Failed to load maintenance");
+    }
+  };
+
+  const loadMore = async () => {
+    try {
+      const page = await getPage(next);
+      setMaintenance((previous) => [...previous, ...page.rows]);
+      setNext(page.next);
     } catch {
       setError("Failed to load maintenance");
     }
@@ -74,6 +86,11 @@ export default function TenantMaintenance() {
             </tbody>
           </table>
         )}
+        {next ? (
+          <button className="btn btn-glass" type="button" onClick={loadMore}>
+            Load more
+          </button>
+        ) : null}
       </GlassCard>
     </div>
   );
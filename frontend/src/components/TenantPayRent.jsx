@@ -33,18 +33,46 @@ export default function TenantPayRent() {
     }
 
     try {
-      await api.post("/api/payments/stk/initiate/", {
+      const res = await api.post("/api/payments/stk/initiate/", {
         lease_id: leaseId,
         phone_number: phone,
         amount,
       });
-      setMessage("STK push initiated. Complete payment on your phone.");
+      setMessage("Payment request queued. Waiting for M-Pesa...");
       setPhone("");
+      watchPayment(res.data?.status_url);
     } catch (err) {
       setError(JSON.stringify(err.response?.data || "Failed to initiate payment"));
     }
   };
 
+  const watchPayment = async (statusUrl) => {
+    if (!statusUrl) return;
+    for (let attempt = 0; attempt < 60; attempt += 1) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      try {
+        const res = await api.get(statusUrl);
+        if (res.data?.status === "success") {
+          setMessage(`Payment received${res.data.mpesa_receipt ? ` (${res.data.mpesa_receipt})` : ""}.`);
+          return;
+        }
+        if (res.data?.status === "failed") {
+          setMessage("");
+          setError(res.data.result_desc || "Payment failed.");
+          return;
+        }
+        if (res.data?.push_status === "sent") {
+          setMessage("STK push sent. Complete payment on your phone.");
+        }
+        if (res.data?.push_status === "unknown") {
+          setMessage("Waiting for M-Pesa to confirm. If you got a prompt, complete it on your phone.");
+        }
+      } catch {
+        return;
+      }
+    }
+  };
+
   return (
     <div className="dashboard-container">
       <GlassCard title="Pay Rent via STK Push">
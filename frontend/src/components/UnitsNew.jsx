@@ -8,7 +8,7 @@ export default function UnitsNew() {
   const [error, setError] = useState("");
 
   const load = async () => {
-    const [pRes, uRes] = await Promise.all([api.get('/api/properties/'), api.get('/api/units/')]);
+    const [pRes, uRes] = await Promise.all([api.get('/api/properties/'), api.get('/api/units/', { params: { expand: 'property' } })]);
     setProperties(pRes.data || []);
     setUnits(uRes.data || []);
   };
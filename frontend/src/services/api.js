@@ -12,3 +12,19 @@ api.interceptors.request.use((config) => {
 });
 
 export default api;
+
+export async function getPage(url, config = {}) {
+  const res = await api.get(url, config);
+  return { rows: res.data?.results || [], next: res.data?.next || null };
+}
+
+// Only for small sets such as dropdown options; long lists render a page at a time with getPage.
+export async function getAllPages(url, config = {}) {
+  let res = await api.get(url, config);
+  const rows = [...(res.data?.results || [])];
+  while (res.data?.next) {
+    res = await api.get(res.data.next);
+    rows.push(...(res.data?.results || []));
+  }
+  return rows;
+}